@@ -1,23 +1,25 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from fpdf import FPDF, XPos, YPos
-import tempfile
-import zipfile
 import os
+import pandas as pd
+import time
 import traceback
-import base64
-from PIL import Image
-import requests
-from io import BytesIO
-import openpyxl
-from openpyxl.styles import PatternFill, Font, Alignment
 
-# Configurar matplotlib para usar backend não-interativo
-import matplotlib
-matplotlib.use('Agg')
+from corretor import METODO_RANKING_PADRAO, METODOS_RANKING
+from corretor.cache import CacheResultados
+from corretor.boletins import (
+    FORMATO_GRAFICOS_PADRAO,
+    FORMATOS_GRAFICOS,
+    SAIDA_BOLETINS_PADRAO,
+    SAIDAS_BOLETINS,
+    BoletinsSobDemanda,
+    perfilar_boletim,
+    processos_padrao,
+)
+from corretor.cronometro import configurar_log
+from corretor.logos import assinatura_logos, caminhos_logos, logo_base64, preparar_logos_pdf
+from corretor.pipeline import contexto_boletins
+from corretor.template import NOME_TEMPLATE, template_excel
+from corretor.trabalhos import BOLETINS_POR_PARTE, CONCLUIDO, ERRO, ESTADOS, NA_FILA, FilaTrabalhos
 
 # --------------------------
 # CONFIGURAÇÕES INICIAIS
@@ -34,193 +36,17 @@ if 'processamento_concluido' not in st.session_state:
     st.session_state.processamento_concluido = False
 if 'dados_processados' not in st.session_state:
     st.session_state.dados_processados = None
-if 'logos_carregadas' not in st.session_state:
-    st.session_state.logos_carregadas = False
-
-# --------------------------
-# FUNÇÕES PARA LOGOS
-# --------------------------
-
-@st.cache_data
-def carregar_logos():
-    """Carrega as logos do repositório GitHub"""
-    logos = {}
-    
-    # URLs das logos no GitHub
-    urls_logos = {
-        'acafe': 'https://raw.githubusercontent.com/JulioFloripa/CorretorACAFE/main/logo-acafe.png',
-        'fleming': 'https://raw.githubusercontent.com/JulioFloripa/CorretorACAFE/main/logo_fleming.png'
-    }
-    
-    for nome, url in urls_logos.items():
-        try:
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                # Salvar logo localmente
-                logo_path = f"/tmp/logo_{nome}.png"
-                with open(logo_path, 'wb') as f:
-                    f.write(response.content)
-                logos[nome] = logo_path
-                
-                # Converter para base64 para uso na interface
-                logos[f'{nome}_b64'] = base64.b64encode(response.content).decode()
-            else:
-                logos[nome] = None
-        except Exception as e:
-            logos[nome] = None
-    
-    return logos
-
-# Carregar logos
-if not st.session_state.logos_carregadas:
-    with st.spinner("🔄 Carregando logos oficiais..."):
-        st.session_state.logos = carregar_logos()
-        st.session_state.logos_carregadas = True
-
-logos = st.session_state.logos
+if 'trabalho' not in st.session_state:
+    # Reconexão: o id do trabalho em andamento fica na URL (?trabalho=...)
+    st.session_state.trabalho = st.experimental_get_query_params().get('trabalho', [None])[0]
 
 # --------------------------
-# FUNÇÃO PARA CRIAR TEMPLATE EXCEL - VERSÃO SIMPLIFICADA
+# LOGOS
 # --------------------------
 
-@st.cache_data
-def criar_template_excel():
-    """Cria template Excel com formatação ACAFE - VERSÃO COMPATÍVEL COM RENDER"""
-    
-    # Criar workbook
-    wb = openpyxl.Workbook()
-    
-    # Cores tema ACAFE
-    cor_verde_acafe = "2D5A3D"
-    cor_verde_claro = "E8F5F3"
-    cor_branco = "FFFFFF"
-    
-    # ===== ABA RESPOSTAS =====
-    ws_respostas = wb.active
-    ws_respostas.title = "RESPOSTAS"
-    
-    # Cabeçalhos da aba RESPOSTAS
-    headers_respostas = ["ID", "Nome", "Sede"] + [f"Questão {i:02d}" for i in range(1, 71)]
-    
-    # Aplicar cabeçalhos
-    for col, header in enumerate(headers_respostas, 1):
-        cell = ws_respostas.cell(row=1, column=col, value=header)
-        cell.fill = PatternFill(start_color=cor_verde_acafe, end_color=cor_verde_acafe, fill_type="solid")
-        cell.font = Font(color=cor_branco, bold=True)
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Dados de exemplo
-    exemplos_respostas = [
-        [1, "João Silva Santos", "CRICIÚMA"] + ["A"] * 70,
-        [2, "Maria Oliveira Costa", "TUBARÃO"] + ["B"] * 70,
-        [3, "Pedro Souza Lima", "ARARANGUÁ"] + ["C"] * 70
-    ]
-    
-    for row_idx, exemplo in enumerate(exemplos_respostas, 2):
-        for col_idx, valor in enumerate(exemplo, 1):
-            cell = ws_respostas.cell(row=row_idx, column=col_idx, value=valor)
-            if row_idx % 2 == 0:
-                cell.fill = PatternFill(start_color=cor_verde_claro, end_color=cor_verde_claro, fill_type="solid")
-    
-    # Ajustar largura das colunas
-    ws_respostas.column_dimensions['A'].width = 8   # ID
-    ws_respostas.column_dimensions['B'].width = 25  # Nome
-    ws_respostas.column_dimensions['C'].width = 15  # Sede
-    for col in range(4, 74):
-        ws_respostas.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 4
-    
-    # ===== ABA GABARITO =====
-    ws_gabarito = wb.create_sheet("GABARITO")
-    
-    # Cabeçalhos da aba GABARITO
-    headers_gabarito = ["Questão", "Resposta", "Disciplina"]
-    
-    for col, header in enumerate(headers_gabarito, 1):
-        cell = ws_gabarito.cell(row=1, column=col, value=header)
-        cell.fill = PatternFill(start_color=cor_verde_acafe, end_color=cor_verde_acafe, fill_type="solid")
-        cell.font = Font(color=cor_branco, bold=True)
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Exemplo de gabarito
-    disciplinas = ["Matemática", "Português", "História", "Geografia", "Biologia", "Física", "Química", "Inglês", "Espanhol"]
-    exemplos_gabarito = []
-    
-    for i in range(1, 71):
-        if i <= 56:
-            disciplina = disciplinas[(i-1) % 7]  # Distribui entre as primeiras 7 disciplinas
-        else:
-            # Questões 57-70 são de línguas (Inglês e Espanhol)
-            if i % 2 == 1:
-                disciplina = "Inglês"
-            else:
-                disciplina = "Espanhol"
-        
-        resposta = ["A", "B", "C", "D", "E"][(i-1) % 5]
-        exemplos_gabarito.append([i, resposta, disciplina])
-    
-    for row_idx, exemplo in enumerate(exemplos_gabarito, 2):
-        for col_idx, valor in enumerate(exemplo, 1):
-            cell = ws_gabarito.cell(row=row_idx, column=col_idx, value=valor)
-            if row_idx % 2 == 0:
-                cell.fill = PatternFill(start_color=cor_verde_claro, end_color=cor_verde_claro, fill_type="solid")
-    
-    # Ajustar largura das colunas
-    ws_gabarito.column_dimensions['A'].width = 12  # Questão
-    ws_gabarito.column_dimensions['B'].width = 12  # Resposta
-    ws_gabarito.column_dimensions['C'].width = 20  # Disciplina
-    
-    # ===== ABA INSTRUÇÕES =====
-    ws_instrucoes = wb.create_sheet("INSTRUÇÕES")
-    
-    instrucoes_texto = [
-        ["TEMPLATE SIMULADO ACAFE - COLÉGIO FLEMING", ""],
-        ["", ""],
-        ["INSTRUÇÕES DE USO:", ""],
-        ["", ""],
-        ["1. ABA RESPOSTAS:", ""],
-        ["   • Preencha o ID único de cada aluno", ""],
-        ["   • Insira o nome completo do aluno", ""],
-        ["   • Indique a sede (CRICIÚMA, TUBARÃO, etc.)", ""],
-        ["   • Preencha as respostas nas colunas Questão 01 a 70", ""],
-        ["   • Use apenas as letras: A, B, C, D, E", ""],
-        ["", ""],
-        ["2. ABA GABARITO:", ""],
-        ["   • Questão: Número da questão (1 a 70)", ""],
-        ["   • Resposta: Resposta correta (A, B, C, D, E)", ""],
-        ["   • Disciplina: Nome da matéria", ""],
-        ["", ""],
-        ["3. QUESTÕES DE LÍNGUAS:", ""],
-        ["   • Questões 57-70 podem ser Inglês OU Espanhol", ""],
-        ["   • O sistema permite questões com mesmo número", ""],
-        ["   • para disciplinas diferentes", ""],
-        ["", ""],
-        ["4. IMPORTANTE:", ""],
-        ["   • Mantenha a estrutura das abas", ""],
-        ["   • Não altere os cabeçalhos", ""],
-        ["   • Use apenas respostas válidas (A-E)", ""],
-        ["", ""],
-        ["DESENVOLVIDO PARA COLÉGIO FLEMING", ""],
-        ["Sistema de Correção ACAFE v4.0", ""]
-    ]
-    
-    for row_idx, (texto, _) in enumerate(instrucoes_texto, 1):
-        cell = ws_instrucoes.cell(row=row_idx, column=1, value=texto)
-        if "TEMPLATE" in texto or "INSTRUÇÕES" in texto or "DESENVOLVIDO" in texto:
-            cell.font = Font(bold=True, size=14, color=cor_verde_acafe)
-        elif texto.startswith(("1.", "2.", "3.", "4.")):
-            cell.font = Font(bold=True, color=cor_verde_acafe)
-        else:
-            cell.font = Font(color="333333")
-    
-    ws_instrucoes.column_dimensions['A'].width = 50
-    
-    # Salvar em bytes
-    from io import BytesIO
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    
-    return buffer.getvalue()
+# Logos do repositório (ou as remotas configuradas, quando já baixadas em segundo plano):
+# nenhum acesso à rede no início da sessão
+logos = caminhos_logos()
 
 # --------------------------
 # CONFIGURAÇÕES DE ESTILO
@@ -339,11 +165,15 @@ def show_header():
     logo_acafe_html = ""
     logo_fleming_html = ""
     
-    if logos.get('acafe_b64'):
-        logo_acafe_html = f'<div class="logo-header"><img src="data:image/png;base64,{logos["acafe_b64"]}" alt="ACAFE"></div>'
+    # Reduzidas ao tamanho do cabeçalho uma vez por processo
+    logo_acafe_b64 = logo_base64(logos.get('acafe'))
+    logo_fleming_b64 = logo_base64(logos.get('fleming'))
     
-    if logos.get('fleming_b64'):
-        logo_fleming_html = f'<div class="logo-header"><img src="data:image/png;base64,{logos["fleming_b64"]}" alt="Fleming"></div>'
+    if logo_acafe_b64:
+        logo_acafe_html = f'<div class="logo-header"><img src="data:image/png;base64,{logo_acafe_b64}" alt="ACAFE"></div>'
+    
+    if logo_fleming_b64:
+        logo_fleming_html = f'<div class="logo-header"><img src="data:image/png;base64,{logo_fleming_b64}" alt="Fleming"></div>'
     
     st.markdown(f"""
     <div class="header-acafe">
@@ -356,438 +186,391 @@ def show_header():
     </div>
     """, unsafe_allow_html=True)
 
-# --------------------------
-# FUNÇÕES DE VALIDAÇÃO
-# --------------------------
-
-def validar_arquivo_excel(dados):
-    """Valida se o arquivo Excel tem a estrutura esperada"""
-    erros = []
-    
-    # Verificar se as abas existem
-    if "RESPOSTAS" not in dados:
-        erros.append("❌ Aba 'RESPOSTAS' não encontrada no arquivo")
-    if "GABARITO" not in dados:
-        erros.append("❌ Aba 'GABARITO' não encontrada no arquivo")
-    
-    if erros:
-        return False, erros
-    
-    respostas = dados["RESPOSTAS"]
-    gabarito = dados["GABARITO"]
-    
-    # Verificar colunas obrigatórias na aba RESPOSTAS
-    colunas_obrigatorias_respostas = ["ID", "Nome"]
-    for col in colunas_obrigatorias_respostas:
-        if col not in respostas.columns:
-            erros.append(f"❌ Coluna '{col}' não encontrada na aba RESPOSTAS")
-    
-    # Verificar colunas obrigatórias na aba GABARITO
-    colunas_obrigatorias_gabarito = ["Questão", "Resposta", "Disciplina"]
-    for col in colunas_obrigatorias_gabarito:
-        if col not in gabarito.columns:
-            erros.append(f"❌ Coluna '{col}' não encontrada na aba GABARITO")
-    
-    # Verificar se há dados
-    if len(respostas) == 0:
-        erros.append("❌ Aba RESPOSTAS está vazia")
-    if len(gabarito) == 0:
-        erros.append("❌ Aba GABARITO está vazia")
-    
-    return len(erros) == 0, erros
-
-def validar_dados_gabarito(gabarito):
-    """Valida os dados do gabarito"""
-    erros = []
-    
-    # Verificar questões duplicadas APENAS dentro da mesma disciplina
-    for disciplina in gabarito['Disciplina'].unique():
-        if pd.isna(disciplina):
-            continue
-        
-        gabarito_disciplina = gabarito[gabarito['Disciplina'] == disciplina]
-        questoes_duplicadas = gabarito_disciplina[gabarito_disciplina.duplicated(subset=['Questão'], keep=False)]
-        
-        if len(questoes_duplicadas) > 0:
-            questoes_dup = questoes_duplicadas['Questão'].unique().tolist()
-            erros.append(f"❌ Questões duplicadas em {disciplina}: {questoes_dup}")
-    
-    # Verificar se há valores nulos
-    if gabarito['Questão'].isnull().any():
-        erros.append("❌ Há questões com número vazio no gabarito")
-    if gabarito['Resposta'].isnull().any():
-        erros.append("❌ Há questões sem resposta no gabarito")
-    if gabarito['Disciplina'].isnull().any():
-        erros.append("❌ Há questões sem disciplina no gabarito")
-    
-    # Verificar questões de línguas estrangeiras (informativo)
-    linguas = ['Inglês', 'Espanhol', 'Ingles', 'Espanol']
-    questoes_linguas = gabarito[gabarito['Disciplina'].isin(linguas)]
-    
-    if len(questoes_linguas) > 0:
-        st.info(f"ℹ️ Detectadas {len(questoes_linguas)} questões de línguas estrangeiras. Questões com mesmo número são permitidas para Inglês/Espanhol.")
-    
-    return len(erros) == 0, erros
-
 # --------------------------
 # FUNÇÕES AUXILIARES OTIMIZADAS
 # --------------------------
 
-@st.cache_data
-def corrigir_respostas_otimizado(df_respostas, gabarito, mapa_disciplinas):
-    """Corrige as respostas dos alunos baseado no gabarito - VERSÃO OTIMIZADA"""
-    respostas = df_respostas.copy()
+@st.cache_resource
+def cache_resultados():
+    """Cache em disco compartilhado por todas as sessões"""
+    return CacheResultados()
+
+@st.cache_resource
+def fila_trabalhos():
+    """Fila de trabalhos em segundo plano compartilhada por todas as sessões"""
+    # Uma vez por processo: tempos das etapas em JSON no stderr do servidor
+    configurar_log()
+    return FilaTrabalhos(cache=cache_resultados())
+
+@st.cache_resource(max_entries=8)
+def turma_do_trabalho(id_trabalho):
+    """Turma de um trabalho concluído, lida do disco uma vez e compartilhada pelas sessões"""
+    return fila_trabalhos().turma(id_trabalho)
+
+@st.cache_data(max_entries=8)
+def analise_itens_do_trabalho(id_trabalho):
+    """Planilha de análise de itens de um trabalho concluído (gravada pelo trabalho ao terminar)"""
+    return fila_trabalhos().analise_itens(id_trabalho)
+
+@st.cache_resource(max_entries=8)
+def contexto_do_trabalho(id_trabalho):
+    """Turma e contexto dos boletins de um trabalho concluído, para gerar boletins avulsos"""
+    trabalho = fila_trabalhos().obter(id_trabalho)
+    turma = turma_do_trabalho(id_trabalho)
+    contexto = contexto_boletins(
+        turma,
+        logos=preparar_logos_pdf(trabalho.parametros.get('logos', {})),
+        formato_graficos=trabalho.opcoes.get('formato_graficos', FORMATO_GRAFICOS_PADRAO)
+    )
+    return turma, contexto
+
+@st.cache_resource(max_entries=8)
+def boletins_sob_demanda(id_trabalho):
+    """Gerador sob demanda de um trabalho, com seu LRU, compartilhado pelas sessões"""
+    turma, contexto = contexto_do_trabalho(id_trabalho)
+    return BoletinsSobDemanda(contexto, turma.tarefas())
+
+def mostrar_estatisticas(turma):
+    """Cartões com os números principais do simulado"""
+    st.markdown("### 📊 **Estatísticas do Simulado**")
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.markdown(f"""
+        <div class="metric-container">
+            <h3 style="color: #2d5a3d; margin: 0;">👥 {turma.total_alunos}</h3>
+            <p style="margin: 0; color: #666;">Alunos</p>
+        </div>
+        """, unsafe_allow_html=True)
     
-    # Criar dicionário de gabarito para acesso rápido
-    gabarito_dict = {}
-    for _, row in gabarito.iterrows():
-        questao = int(row["Questão"])
-        resposta_correta = str(row["Resposta"]).strip().upper()
-        gabarito_dict[questao] = resposta_correta
+    with col2:
+        st.markdown(f"""
+        <div class="metric-container">
+            <h3 style="color: #2d5a3d; margin: 0;">❓ {turma.total_questoes}</h3>
+            <p style="margin: 0; color: #666;">Questões</p>
+        </div>
+        """, unsafe_allow_html=True)
     
-    # Processar todas as questões de uma vez (vetorizado)
-    for questao, resposta_correta in gabarito_dict.items():
-        col = f"Questão {questao:02d}"
-        col_ok = f"Q{questao}_OK"
-        
-        if col in respostas.columns:
-            # Comparação vetorizada
-            respostas[col_ok] = (
-                respostas[col].astype(str).str.strip().str.upper() == resposta_correta
-            )
-        else:
-            respostas[col_ok] = False
+    with col3:
+        st.markdown(f"""
+        <div class="metric-container">
+            <h3 style="color: #2d5a3d; margin: 0;">📚 {turma.total_disciplinas}</h3>
+            <p style="margin: 0; color: #666;">Disciplinas</p>
+        </div>
+        """, unsafe_allow_html=True)
     
-    return respostas
-
-def resultados_disciplina_otimizado(linha, mapa_disciplinas):
-    """Calcula os resultados por disciplina para um aluno - OTIMIZADO"""
-    resultados = []
-    for disc, questoes in mapa_disciplinas.items():
-        # Usar list comprehension para melhor performance
-        acertos = sum(linha.get(f"Q{int(q)}_OK", False) for q in questoes)
-        total = len(questoes)
-        perc = round(100 * acertos / total, 1) if total > 0 else 0
-        resultados.append((disc, acertos, total, perc))
-    return resultados
-
-def gerar_graficos_otimizado(nome, posicao, percentual, df_boletim, media_df, ranking_df, pasta):
-    """Gera os gráficos para o boletim individual - VERSÃO OTIMIZADA"""
-    try:
-        labels = df_boletim["Disciplina"].tolist()
-        aluno_vals = df_boletim["%"].values
-        media_vals = media_df["%"].values
+    with col4:
+        st.markdown(f"""
+        <div class="metric-container">
+            <h3 style="color: #2d5a3d; margin: 0;">📈 {turma.media_turma:.1f}%</h3>
+            <p style="margin: 0; color: #666;">Média Geral</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # Salvar estatísticas
+    st.session_state.stats = {
+        'total_alunos': turma.total_alunos,
+        'total_questoes': turma.total_questoes,
+        'total_disciplinas': turma.total_disciplinas,
+        'media_geral': turma.media_turma
+    }
 
-        # Configurar cores tema ACAFE
-        cor_principal = '#2d5a3d'
-        cor_secundaria = '#4a8c6a'
-        cor_destaque = '#6bb77b'
-        
-        # Configurar estilo dos gráficos uma vez
-        plt.style.use('default')
-        plt.rcParams.update({
-            'font.size': 10,
-            'axes.titlesize': 14,
-            'axes.labelsize': 12,
-            'xtick.labelsize': 10,
-            'ytick.labelsize': 10,
-            'legend.fontsize': 12
-        })
-        
-        graficos_paths = []
-        
-        # Gráfico de Barras (mais importante)
-        if len(labels) > 0:
-            x = np.arange(len(labels))
-            bar_width = 0.35
-            fig, ax = plt.subplots(figsize=(14, 8))
-            
-            bars1 = ax.bar(x - bar_width/2, aluno_vals, bar_width, label=nome, 
-                          color=cor_principal, alpha=0.8, edgecolor='white', linewidth=1)
-            bars2 = ax.bar(x + bar_width/2, media_vals, bar_width, label="Média Turma", 
-                          color=cor_secundaria, alpha=0.7, edgecolor='white', linewidth=1)
-            
-            # Adicionar valores nas barras
-            for i, v in enumerate(aluno_vals):
-                ax.text(i - bar_width/2, v + 1.5, f"{v:.1f}%", ha="center", fontsize=10, 
-                       fontweight='bold', color=cor_principal)
-            for i, v in enumerate(media_vals):
-                ax.text(i + bar_width/2, v + 1.5, f"{v:.1f}%", ha="center", fontsize=10, 
-                       color=cor_secundaria)
-                
-            ax.set_xticks(x)
-            ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=11)
-            ax.set_ylabel("Percentual de Acertos (%)", fontsize=12, fontweight='bold')
-            ax.set_title(f"Desempenho por Disciplina - {nome}", fontsize=16, fontweight='bold', 
-                        color=cor_principal, pad=20)
-            ax.legend(fontsize=12)
-            ax.grid(axis='y', alpha=0.3)
-            ax.set_ylim(0, 105)
-            
-            barras_path = os.path.join(pasta, f"{nome}_barras.png")
-            plt.savefig(barras_path, bbox_inches="tight", dpi=150, facecolor='white')
-            plt.close()
-            graficos_paths.append(barras_path)
-        else:
-            graficos_paths.append(None)
+def escolher_e_baixar(rotulo, opcoes, obter, nome_arquivo, mime, chave, format_func=str):
+    """Um seletor (com busca) e um único botão: só o arquivo escolhido vai para a memória"""
+    if not opcoes:
+        return
+    col_escolha, col_botao = st.columns([3, 1])
+    with col_escolha:
+        escolha = st.selectbox(rotulo, opcoes, format_func=format_func, key=f"{chave}_escolha")
+    with col_botao:
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.download_button("📥 Baixar", obter(escolha), nome_arquivo(escolha), mime,
+                           key=f"{chave}_botao", use_container_width=True)
+
+@st.cache_resource(max_entries=2)
+def arquivo_final(id_trabalho):
+    """Bytes do ZIP/PDF final de um trabalho, lidos do disco uma vez para todas as sessões"""
+    with open(fila_trabalhos().caminho_boletins(id_trabalho), "rb") as arquivo:
+        return arquivo.read()
+
+def baixar_arquivo_final(rotulo, trabalho, caminho, nome_arquivo, mime, ajuda):
+    """Só lê o arquivo final quando pedido; depois do pedido, o botão de download na mesma sessão"""
+    chave = f"pronto_{trabalho.id}"
+    if not st.session_state.get(chave):
+        tamanho_mb = os.path.getsize(caminho) / (1024 * 1024)
+        if st.button(f"{rotulo} ({tamanho_mb:.1f} MB)", key=f"preparar_{trabalho.id}", help=ajuda,
+                     use_container_width=True):
+            st.session_state[chave] = True
+            st.rerun()
+        return
+    st.download_button(rotulo, arquivo_final(trabalho.id), nome_arquivo, mime, help=ajuda,
+                       use_container_width=True)
+
+def nome_boletim(arquivo):
+    """'CRICIÚMA/Boletim_Ana_Souza.pdf' -> 'Ana Souza (CRICIÚMA)'"""
+    pasta, _, nome = arquivo.rpartition("/")
+    nome = os.path.splitext(nome)[0].replace("Boletim_", "", 1).replace("_", " ")
+    return f"{nome} ({pasta})" if pasta else nome
+
+def mostrar_downloads_parciais(fila, id_trabalho, prefixo_chave):
+    """Sedes e boletins que já podem ser baixados, um de cada vez, direto do disco"""
+    sedes = fila.sedes_prontas(id_trabalho)
+    if sedes:
+        escolher_e_baixar(
+            f"🏫 Sedes prontas ({len(sedes)})", sedes,
+            lambda sede: fila.zip_sede(id_trabalho, sede),
+            lambda sede: f"boletins_{sede.replace(' ', '_')}.zip",
+            "application/zip", f"{prefixo_chave}_sede"
+        )
+    boletins = fila.boletins_prontos(id_trabalho)
+    if boletins:
+        escolher_e_baixar(
+            f"🔎 Boletins prontos ({len(boletins)}) — digite para buscar o aluno", boletins,
+            lambda arquivo: fila.boletim(id_trabalho, arquivo),
+            lambda arquivo: arquivo.rpartition("/")[2],
+            "application/pdf", f"{prefixo_chave}_aluno", format_func=nome_boletim
+        )
 
-        # Gráfico Radar (se houver disciplinas suficientes)
-        if len(labels) >= 3:
-            angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
-            aluno_circ = np.concatenate((aluno_vals, [aluno_vals[0]]))
-            media_circ = np.concatenate((media_vals, [media_vals[0]]))
-            angles += [angles[0]]
+def tabela_alunos(turma):
+    """Uma linha por aluno (índice = linha da correção), na ordem do ranking"""
+    tabela = turma.alunos[[col for col in ["ID", "Nome", "Sede", "Posição na Sede"]
+                           if col in turma.alunos.columns]].copy()
+    tabela.insert(0, "Posição", turma.posicoes)
+    tabela["Nota (%)"] = (turma.alunos["Percentual"] * 100).round(1)
+    return tabela.sort_values("Posição", kind="stable")
+
+def mostrar_boletins_sob_demanda(fila, trabalho):
+    """Tabela de alunos com busca; o boletim só é gerado para o aluno escolhido"""
+    turma = turma_do_trabalho(trabalho.id)
+    tabela = tabela_alunos(turma)
+
+    st.markdown("### 🔎 **Boletins sob demanda**")
+    busca = st.text_input("Buscar aluno por nome, ID ou sede", key="busca_aluno")
+    if busca:
+        texto = tabela.drop(columns=["Posição", "Nota (%)"]).astype(str).agg(" ".join, axis=1)
+        tabela = tabela[texto.str.contains(busca, case=False, regex=False)]
+    st.caption(f"{len(tabela)} de {turma.total_alunos} alunos")
+    st.dataframe(tabela, use_container_width=True, hide_index=True, height=300)
+
+    indice = st.selectbox(
+        "📄 Abrir o boletim do aluno",
+        tabela.index.tolist(),
+        index=None,
+        format_func=lambda i: f"{tabela.at[i, 'Posição']}º — {tabela.at[i, 'Nome']}",
+        placeholder="Escolha um aluno da tabela",
+        key="aluno_sob_demanda"
+    )
+    if indice is not None:
+        with st.spinner("Gerando boletim..."):
+            resultado = boletins_sob_demanda(trabalho.id)(indice)
+        for aviso in resultado.avisos:
+            st.warning(aviso)
+        if resultado.pdf:
+            st.download_button(
+                f"📥 **Baixar boletim de {resultado.nome}**",
+                resultado.pdf,
+                resultado.arquivo,
+                "application/pdf",
+                key="baixar_sob_demanda",
+                use_container_width=True
+            )
 
-            fig = plt.figure(figsize=(8, 8))
-            ax = plt.subplot(111, polar=True)
-            ax.plot(angles, aluno_circ, "o-", label=nome, linewidth=3, color=cor_principal, markersize=8)
-            ax.fill(angles, aluno_circ, alpha=0.3, color=cor_principal)
-            ax.plot(angles, media_circ, "s--", label="Média da Turma", color=cor_secundaria, linewidth=2, markersize=6)
-            ax.fill(angles, media_circ, alpha=0.1, color=cor_secundaria)
-            ax.set_thetagrids(np.degrees(angles[:-1]), labels, fontsize=10)
-            ax.legend(loc="upper right", bbox_to_anchor=(1.3, 1.1), fontsize=12)
-            ax.set_ylim(0, 100)
-            ax.grid(True, alpha=0.3)
-            plt.title(f"Desempenho Radar - {nome}", fontsize=14, fontweight='bold', color=cor_principal, pad=20)
-            radar_path = os.path.join(pasta, f"{nome}_radar.png")
-            plt.savefig(radar_path, bbox_inches="tight", dpi=150, facecolor='white')
-            plt.close()
-            graficos_paths.append(radar_path)
+    # Exportação completa: vira um trabalho da fila, como um envio normal
+    st.markdown("#### 📦 **Todos os boletins**")
+    col_zip, col_pdf = st.columns(2)
+    for coluna, saida, rotulo in ((col_zip, "zip", "📦 Gerar ZIP com todos"),
+                                  (col_pdf, "pdf_unico", "🖨️ Gerar PDF único")):
+        with coluna:
+            if st.button(rotulo, key=f"exportar_{saida}", use_container_width=True):
+                abrir_trabalho(fila.exportar(trabalho.id, saida))
+
+def mostrar_downloads(fila, trabalho):
+    """Downloads de um trabalho concluído, lidos do disco sob demanda"""
+    caminho = fila.caminho_boletins(trabalho.id)
+    if caminho is None:
+        return
+    total_alunos = trabalho.total
+
+    if trabalho.sob_demanda:
+        mostrar_boletins_sob_demanda(fila, trabalho)
+    elif not trabalho.em_zip:
+        st.markdown("### 🎉 **Boletins Prontos!**")
+        baixar_arquivo_final(
+            "📥 **Baixar PDF Único para Impressão**",
+            trabalho, caminho,
+            "boletins_acafe_fleming.pdf",
+            "application/pdf",
+            f"Arquivo contém os {total_alunos} boletins em sequência, agrupados por sede"
+        )
+    else:
+        st.markdown("### 🎉 **Boletins Prontos!**")
+        if fila.download_inteiro(trabalho.id):
+            baixar_arquivo_final(
+                "📥 **Baixar Todos os Boletins (ZIP)**",
+                trabalho, caminho,
+                "boletins_acafe_fleming.zip",
+                "application/zip",
+                f"Arquivo contém {total_alunos} boletins individuais em PDF com logos oficiais"
+            )
         else:
-            graficos_paths.append(None)
+            # ZIP grande: em partes, para não carregar o arquivo inteiro na memória do servidor
+            escolher_e_baixar(
+                f"📦 ZIP grande: baixe em partes de até {BOLETINS_POR_PARTE} boletins",
+                list(range(fila.partes(trabalho.id))),
+                lambda k: fila.parte(trabalho.id, k),
+                lambda k: f"boletins_acafe_fleming_parte{k + 1:02d}.zip",
+                "application/zip", "parte", format_func=lambda k: f"Parte {k + 1}"
+            )
+        mostrar_downloads_parciais(fila, trabalho.id, "final")
+
+    st.download_button(
+        "📈 **Baixar Análise de Itens (Excel)**",
+        analise_itens_do_trabalho(trabalho.id),
+        "analise_itens_acafe_fleming.xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        help="Dificuldade, discriminação e distribuição das alternativas de cada questão",
+        use_container_width=True
+    )
 
-        # Distribuição das notas
-        fig, ax = plt.subplots(figsize=(12, 7))
-        n, bins, patches = ax.hist(ranking_df["Percentual"]*100, bins=min(12, len(ranking_df)), 
-                                  color=cor_destaque, edgecolor=cor_principal, alpha=0.7, linewidth=1.5)
-        
-        # Colorir a barra onde o aluno está
-        for i, patch in enumerate(patches):
-            if bins[i] <= percentual <= bins[i+1]:
-                patch.set_color(cor_principal)
-                patch.set_alpha(0.9)
-        
-        ax.axvline(percentual, color='red', linewidth=4, 
-                  label=f"{nome} ({percentual:.1f}%)", linestyle='--', alpha=0.8)
-        ax.set_xlabel("Percentual de Acertos (%)", fontsize=12, fontweight='bold')
-        ax.set_ylabel("Número de Estudantes", fontsize=12, fontweight='bold')
-        ax.set_title("Distribuição das Notas da Turma", fontsize=16, fontweight='bold', 
-                    color=cor_principal, pad=20)
-        ax.legend(fontsize=12)
-        ax.grid(alpha=0.3)
-        
-        dist_path = os.path.join(pasta, f"{nome}_dist.png")
-        plt.savefig(dist_path, bbox_inches="tight", dpi=150, facecolor='white')
-        plt.close()
-        graficos_paths.append(dist_path)
+def tabela_tempos(medidas, boletins=False):
+    """DataFrame de {etapa: {parede, cpu, memoria_mb, vezes, cpu_processos}} (Cronometro.como_dict)"""
+    tabela = pd.DataFrame.from_dict(medidas, orient="index")
+    tabela.index.name = "Fase do boletim" if boletins else "Etapa"
+    tabela = tabela.reset_index().rename(columns={
+        "parede": "Tempo (s)", "cpu": "CPU da thread (s)", "memoria_mb": "Memória (MB)", "vezes": "Vezes",
+        "cpu_processos": "CPU dos processos (s)"})
+    # Só aparece quando os boletins rodaram no pool (trabalhos antigos não têm a coluna)
+    if "CPU dos processos (s)" in tabela and tabela["CPU dos processos (s)"].fillna(0).any():
+        tabela["CPU dos processos (s)"] = tabela["CPU dos processos (s)"].fillna(0)
+    else:
+        tabela = tabela.drop(columns="CPU dos processos (s)", errors="ignore")
+    if boletins:
+        tabela["Por boletim (ms)"] = tabela["Tempo (s)"] / tabela["Vezes"].clip(lower=1) * 1000
+    else:
+        tabela = tabela.drop(columns="Vezes")
+    return tabela.round({"Tempo (s)": 2, "CPU da thread (s)": 2, "CPU dos processos (s)": 2,
+                         "Memória (MB)": 0, "Por boletim (ms)": 1})
+
+def mostrar_tempos(trabalho):
+    """Quanto cada etapa levou (parede, CPU, memória) e, opcionalmente, o cProfile de um boletim"""
+    tempos = trabalho.tempos
+    if not tempos.get("etapas"):
+        # Resultado saído do cache: nada foi processado neste trabalho
+        return
+
+    total = sum(medida["parede"] for medida in tempos["etapas"].values())
+    with st.expander(f"⏱️ **Tempo de cada etapa** ({total:.1f} s no total)"):
+        st.dataframe(tabela_tempos(tempos["etapas"]), use_container_width=True, hide_index=True)
+        if tempos.get("boletins"):
+            st.caption("Dentro dos boletins, somando todos os alunos (com vários processos em paralelo, "
+                       "a soma passa do tempo da etapa Boletins):")
+            st.dataframe(tabela_tempos(tempos["boletins"], boletins=True),
+                         use_container_width=True, hide_index=True)
+
+        # cProfile de um boletim só quando pedido: roda no servidor, na hora
+        if st.button("🔬 Gerar perfil (cProfile) de um boletim", key="perfil_boletim"):
+            turma, contexto = contexto_do_trabalho(trabalho.id)
+            with st.spinner("Gerando boletim com o profiler..."):
+                _, dados, texto = perfilar_boletim(contexto, turma.tarefas()[0])
+            st.session_state.perfil = (trabalho.id, dados, texto)
+
+        perfil = st.session_state.get('perfil')
+        if perfil and perfil[0] == trabalho.id:
+            st.code(perfil[2])
+            st.download_button(
+                "📥 **Baixar perfil (.prof)**",
+                perfil[1],
+                f"perfil_boletim_{trabalho.id}.prof",
+                "application/octet-stream",
+                help="Abra com snakeviz ou python -m pstats",
+                key="baixar_perfil"
+            )
 
-        # Ranking
-        fig, ax = plt.subplots(figsize=(12, 7))
-        ax.plot(ranking_df["Posição"], ranking_df["Percentual"]*100, "o-", 
-               color=cor_secundaria, markersize=8, linewidth=3, alpha=0.7, label="Outros alunos")
-        ax.scatter(posicao, percentual, color='red', s=200, 
-                  label=f"{nome} - {posicao}º lugar", zorder=5, edgecolor='darkred', linewidth=2)
-        
-        # Destacar top 3
-        top3 = ranking_df.head(3)
-        ax.scatter(top3["Posição"], top3["Percentual"]*100, color='gold', s=150, 
-                  zorder=4, edgecolor='orange', linewidth=2, alpha=0.8, label="Top 3")
-        
-        ax.set_xlabel("Posição no Ranking", fontsize=12, fontweight='bold')
-        ax.set_ylabel("Percentual de Acertos (%)", fontsize=12, fontweight='bold')
-        ax.set_title("Ranking da Turma", fontsize=16, fontweight='bold', color=cor_principal, pad=20)
-        ax.legend(fontsize=12)
-        ax.grid(alpha=0.3)
-        
-        rank_path = os.path.join(pasta, f"{nome}_rank.png")
-        plt.savefig(rank_path, bbox_inches="tight", dpi=150, facecolor='white')
-        plt.close()
-        graficos_paths.append(rank_path)
+def mostrar_resultado(turma, sob_demanda=False):
+    """Estatísticas de uma turma pronta e marca o processamento como concluído"""
+    mostrar_estatisticas(turma)
 
-        return graficos_paths
-    
-    except Exception as e:
-        st.error(f"Erro ao gerar gráficos para {nome}: {str(e)}")
-        return [None, None, None, None]
+    # Salvar dados processados
+    st.session_state.dados_processados = {
+        'ranking_df': turma.ranking_df,
+        'media_df': turma.media_df,
+        'itens_df': turma.itens.tabela(),
+        'sedes_df': turma.sedes.tabela() if turma.varias_sedes else None
+    }
 
-class BoletimPDF(FPDF):
-    def __init__(self):
-        super().__init__()
-        self.logo_acafe_path = logos.get('acafe')
-        self.logo_fleming_path = logos.get('fleming')
-    
-    def header(self):
-        """Header melhorado com logos oficiais - SEM WARNINGS"""
-        # Fundo verde no header
-        self.set_fill_color(45, 90, 61)  # Verde ACAFE
-        self.rect(0, 0, 210, 45, 'F')
-        
-        # Logo ACAFE (esquerda)
-        if self.logo_acafe_path and os.path.exists(self.logo_acafe_path):
-            try:
-                self.image(self.logo_acafe_path, 15, 8, 30)
-            except Exception:
-                pass
-        
-        # Logo Fleming (direita)
-        if self.logo_fleming_path and os.path.exists(self.logo_fleming_path):
-            try:
-                self.image(self.logo_fleming_path, 165, 8, 30)
-            except Exception:
-                pass
-        
-        # Título central
-        self.set_font("Helvetica", "B", 20)
-        self.set_text_color(255, 255, 255)  # Branco
-        self.set_y(15)
-        self.cell(0, 8, "SIMULADO ACAFE", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
-        
-        self.set_font("Helvetica", "B", 16)
-        self.cell(0, 8, "COLEGIO FLEMING", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
-        
-        self.set_font("Helvetica", "", 12)
-        self.cell(0, 6, "Relatorio Individual de Desempenho", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
-        
-        # Linha decorativa
-        self.set_draw_color(255, 255, 255)
-        self.set_line_width(1)
-        self.line(20, 42, 190, 42)
-        
-        self.set_text_color(0, 0, 0)  # Voltar para preto
-        self.ln(18)
+    # Marcar como concluído
+    st.session_state.processamento_concluido = True
+    st.balloons()
+    if sob_demanda:
+        st.success(f"🎊 **Notas e ranking de {turma.total_alunos} alunos prontos!** Abra cada boletim abaixo.")
+    else:
+        st.success(f"🎊 **{turma.total_alunos} boletins gerados com sucesso!**")
+
+def acompanhar_trabalho(id_trabalho):
+    """Mostra o andamento de um trabalho da fila e, quando termina, o resultado
+
+    Enquanto o trabalho roda, a página se atualiza sozinha a cada segundo.
+    Fechar a aba não interrompe nada: o link com ?trabalho=... retoma daqui.
+    """
+    fila = fila_trabalhos()
+    trabalho = fila.obter(id_trabalho)
+    if trabalho is None:
+        st.warning("⚠️ Trabalho não encontrado (pode ter sido apagado depois de alguns dias). Envie a planilha de novo.")
+        esquecer_trabalho()
+        return
+
+    st.markdown(f"### 📎 **{trabalho.nome}**")
+    for informacao in trabalho.informacoes:
+        st.info(informacao)
+
+    if trabalho.estado == ERRO:
+        st.error(f"**{trabalho.mensagem}**")
+        for erro in trabalho.erros:
+            if "Traceback" in erro:
+                with st.expander("🔍 **Detalhes técnicos do erro**"):
+                    st.code(erro)
+            else:
+                st.error(erro)
+        if st.button("🔄 **Enviar Outro Arquivo**", type="primary"):
+            esquecer_trabalho()
+            st.rerun()
+        return
+
+    for aviso in trabalho.avisos:
+        st.warning(aviso)
+
+    if trabalho.estado == CONCLUIDO:
+        if trabalho.mensagem.startswith("♻️"):
+            st.success(trabalho.mensagem)
+        mostrar_resultado(turma_do_trabalho(id_trabalho), trabalho.sob_demanda)
+        mostrar_downloads(fila, trabalho)
+        return
+
+    st.progress(trabalho.progresso)
+    if trabalho.estado == NA_FILA:
+        posicao = fila.posicao_na_fila(id_trabalho)
+        st.success(f"⏳ Na fila ({posicao} trabalho(s) à frente)" if posicao else "⏳ Na fila")
+    else:
+        st.success(trabalho.mensagem)
+    st.caption("Pode fechar esta página: o processamento continua no servidor e este link traz o resultado.")
 
-    def add_aluno_info(self, nome, posicao, percentual, media_turma, aluno_data=None):
-        """Informações do aluno com design melhorado - SEM WARNINGS"""
-        # Caixa principal
-        self.set_fill_color(240, 248, 245)  # Verde muito claro
-        self.set_draw_color(45, 90, 61)  # Verde escuro
-        self.set_line_width(1)
-        self.rect(10, self.get_y(), 190, 50, 'DF')
-        
-        # Título da seção
-        self.set_font("Helvetica", "B", 16)
-        self.set_text_color(45, 90, 61)
-        self.set_y(self.get_y() + 8)
-        self.cell(0, 8, "INFORMACOES DO ESTUDANTE", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
-        
-        # Informações em duas colunas
-        y_start = self.get_y() + 3
-        
-        # Coluna esquerda
-        self.set_font("Helvetica", "B", 12)
-        self.set_text_color(0, 0, 0)
-        self.set_y(y_start)
-        self.set_x(15)
-        self.cell(90, 7, f"Nome: {nome}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-        
-        self.set_x(15)
-        self.cell(90, 7, f"Posicao no Ranking: {posicao}º lugar", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-        
-        if aluno_data and 'Sede' in aluno_data:
-            self.set_x(15)
-            self.cell(90, 7, f"Sede: {aluno_data['Sede']}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-        
-        # Coluna direita
-        self.set_y(y_start)
-        self.set_x(110)
-        self.cell(90, 7, f"Nota Individual: {percentual:.1f}%", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-        
-        self.set_x(110)
-        self.cell(90, 7, f"Media da Turma: {media_turma:.1f}%", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-        
-        # Diferença com cor
-        diferenca = percentual - media_turma
-        self.set_x(110)
-        if diferenca > 0:
-            self.set_text_color(0, 128, 0)  # Verde
-            self.cell(90, 7, f"Diferenca: +{diferenca:.1f}% (acima)", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-        else:
-            self.set_text_color(255, 0, 0)  # Vermelho
-            self.cell(90, 7, f"Diferenca: {diferenca:.1f}% (abaixo)", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-        
-        self.set_text_color(0, 0, 0)  # Voltar para preto
-        self.ln(18)
+    # Boletins e sedes já prontos podem ser baixados (e impressos) enquanto o resto é gerado
+    mostrar_downloads_parciais(fila, id_trabalho, "parcial")
 
-    def add_table(self, df):
-        """Tabela melhorada com cores alternadas - SEM WARNINGS"""
-        # Título da tabela
-        self.set_font("Helvetica", "B", 14)
-        self.set_text_color(45, 90, 61)
-        self.cell(0, 10, "DESEMPENHO POR DISCIPLINA", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
-        self.ln(5)
-        
-        # Cabeçalho da tabela
-        self.set_fill_color(45, 90, 61)  # Verde ACAFE
-        self.set_text_color(255, 255, 255)  # Branco
-        self.set_font("Helvetica", "B", 10)
-        
-        self.cell(50, 10, "Disciplina", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
-        self.cell(25, 10, "Acertos", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
-        self.cell(25, 10, "Total", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
-        self.cell(30, 10, "Nota (%)", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
-        self.cell(30, 10, "Media (%)", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
-        self.cell(30, 10, "Diferenca", 1, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C', fill=True)
-        
-        # Dados da tabela
-        self.set_font("Helvetica", "", 9)
-        
-        for i, (_, row) in enumerate(df.iterrows()):
-            # Alternar cores das linhas
-            if i % 2 == 0:
-                self.set_fill_color(248, 255, 254)  # Verde muito claro
-            else:
-                self.set_fill_color(255, 255, 255)  # Branco
-            
-            self.set_text_color(0, 0, 0)
-            disciplina = str(row["Disciplina"])[:22]  # Limitar tamanho
-            self.cell(50, 8, disciplina, 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='L', fill=True)
-            self.cell(25, 8, str(row["Acertos"]), 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
-            self.cell(25, 8, str(row["Total"]), 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
-            self.cell(30, 8, f"{row['%']:.1f}%", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
-            self.cell(30, 8, f"{row['Media Turma']:.1f}%", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
-            
-            diferenca = row['Diferenca']
-            texto_dif = f"+{diferenca:.1f}%" if diferenca > 0 else f"{diferenca:.1f}%"
-            self.cell(30, 8, texto_dif, 1, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C', fill=True)
-        
-        self.set_text_color(0, 0, 0)  # Voltar para preto
-        self.ln(12)
+    time.sleep(1)
+    st.rerun()
 
-    def add_image(self, path, largura=180, titulo=""):
-        """Adiciona imagem com título - SEM WARNINGS"""
-        if path and os.path.exists(path):
-            try:
-                if titulo:
-                    self.set_font("Helvetica", "B", 12)
-                    self.set_text_color(45, 90, 61)
-                    self.cell(0, 10, titulo, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
-                    self.ln(3)
-                
-                x_pos = (210 - largura) / 2
-                self.image(path, x=x_pos, w=largura)
-                self.ln(12)
-                
-            except Exception as e:
-                self.set_font("Helvetica", "", 10)
-                self.set_text_color(255, 0, 0)
-                self.cell(0, 10, f"Erro ao carregar grafico: {str(e)}", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
-                self.set_text_color(0, 0, 0)
+def abrir_trabalho(id_trabalho):
+    """Passa a acompanhar outro trabalho (também pela URL)"""
+    st.session_state.trabalho = id_trabalho
+    st.session_state.processamento_concluido = False
+    st.experimental_set_query_params(trabalho=id_trabalho)
+    st.rerun()
 
-    def footer(self):
-        """Footer melhorado - SEM WARNINGS"""
-        self.set_y(-25)
-        
-        # Linha decorativa
-        self.set_draw_color(45, 90, 61)
-        self.set_line_width(0.8)
-        self.line(20, self.get_y(), 190, self.get_y())
-        
-        self.set_font("Helvetica", "", 9)
-        self.set_text_color(100, 100, 100)
-        self.ln(5)
-        self.cell(0, 5, f"Pagina {self.page_no()}", new_x=XPos.RIGHT, new_y=YPos.TOP, align='C')
-        self.ln(4)
-        self.cell(0, 5, "Sistema de Correcao ACAFE - Colegio Fleming | v4.0", new_x=XPos.RIGHT, new_y=YPos.TOP, align='C')
+def esquecer_trabalho():
+    """Desliga a sessão do trabalho atual (o trabalho continua na fila)"""
+    st.session_state.trabalho = None
+    st.experimental_set_query_params()
 
 # --------------------------
 # APLICAR CSS E HEADER
@@ -812,11 +595,10 @@ with st.sidebar:
     st.markdown("### 📋 **Template Excel**")
     
     try:
-        template_excel = criar_template_excel()
         st.download_button(
             label="📥 **Baixar Template Excel**",
-            data=template_excel,
-            file_name="Template_Simulado_ACAFE_Fleming.xlsx",
+            data=template_excel(),
+            file_name=NOME_TEMPLATE,
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             help="Template pré-formatado com tema ACAFE e estrutura correta",
             use_container_width=True
@@ -833,6 +615,7 @@ with st.sidebar:
         - **Nome**: Nome completo
         - **Sede**: Unidade do colégio
         - **Questão 01-70**: Respostas (A, B, C, D, E)
+        - **Língua** *(opcional)*: Inglês ou Espanhol
         """)
     
     with st.expander("📝 **Aba GABARITO**", expanded=False):
@@ -840,8 +623,44 @@ with st.sidebar:
         - **Questão**: Número da questão (1-70)
         - **Resposta**: Resposta correta (A-E)
         - **Disciplina**: Nome da matéria
+        - **Peso** *(opcional)*: Valor da questão na nota (padrão 1)
+        - **Anulada** *(opcional)*: "Sim" dá o acerto a todos
         """)
     
+    st.markdown("### ⚙️ **Configurações**")
+    metodo_ranking = st.selectbox(
+        "🏆 Critério de empate no ranking",
+        options=list(METODOS_RANKING),
+        index=list(METODOS_RANKING).index(METODO_RANKING_PADRAO),
+        format_func=METODOS_RANKING.get,
+        key="metodo_ranking",
+        help="Define como são numerados os alunos com a mesma nota"
+    )
+    processos = st.number_input(
+        "⚡ Processos paralelos",
+        min_value=1,
+        max_value=32,
+        value=processos_padrao(),
+        key="processos_boletins",
+        help="Quantos boletins são gerados ao mesmo tempo. Use 1 para gerar em sequência."
+    )
+    formato_graficos = st.selectbox(
+        "📈 Gráficos do boletim",
+        options=list(FORMATOS_GRAFICOS),
+        index=list(FORMATOS_GRAFICOS).index(FORMATO_GRAFICOS_PADRAO),
+        format_func=FORMATOS_GRAFICOS.get,
+        key="formato_graficos",
+        help="Vetorial desenha os gráficos direto no PDF (arquivos menores e geração mais rápida)"
+    )
+    saida_boletins = st.selectbox(
+        "🖨️ Entrega dos boletins",
+        options=list(SAIDAS_BOLETINS),
+        index=list(SAIDAS_BOLETINS).index(SAIDA_BOLETINS_PADRAO),
+        format_func=SAIDAS_BOLETINS.get,
+        key="saida_boletins",
+        help="O PDF único junta todos os boletins, por sede, num arquivo pronto para imprimir"
+    )
+    
     st.markdown("### 📊 **Estatísticas**")
     if 'stats' in st.session_state:
         stats = st.session_state.stats
@@ -855,6 +674,16 @@ with st.sidebar:
             if 'media_geral' in stats:
                 st.metric("📈 Média", f"{stats['media_geral']:.1f}%")
 
+    st.markdown("### 🗂️ **Trabalhos recentes**")
+    recentes = fila_trabalhos().listar(limite=5)
+    if not recentes:
+        st.caption("Nenhum trabalho enviado ainda.")
+    for recente in recentes:
+        andamento = f" · {recente.progresso}%" if not recente.terminado else ""
+        if st.button(f"{recente.nome} — {ESTADOS[recente.estado]}{andamento}", key=f"recente_{recente.id}",
+                     use_container_width=True):
+            abrir_trabalho(recente.id)
+
 # --------------------------
 # INTERFACE PRINCIPAL
 # --------------------------
@@ -866,7 +695,13 @@ if st.session_state.processamento_concluido:
     if st.button("🔄 **Processar Novo Arquivo**", type="primary"):
         st.session_state.processamento_concluido = False
         st.session_state.dados_processados = None
+        esquecer_trabalho()
         st.rerun()
+
+    # Downloads continuam disponíveis enquanto o resultado estiver na tela
+    trabalho = fila_trabalhos().obter(st.session_state.trabalho) if st.session_state.trabalho else None
+    if trabalho and trabalho.estado == CONCLUIDO:
+        mostrar_downloads(fila_trabalhos(), trabalho)
     
     # Mostrar dados processados se existirem
     if st.session_state.dados_processados:
@@ -910,8 +745,11 @@ if st.session_state.processamento_concluido:
                 """, unsafe_allow_html=True)
         
         # Tabela do ranking
+        # Com mais de uma sede, a posição dentro da sede aparece ao lado da geral
+        colunas_ranking = [col for col in ["Posição", "Nome", "Sede", "Posição na Sede", "Nota (%)"]
+                           if col in dados_proc['ranking_df'].columns]
         st.dataframe(
-            dados_proc['ranking_df'][["Posição", "Nome", "Nota (%)"]].head(10), 
+            dados_proc['ranking_df'][colunas_ranking].head(10), 
             use_container_width=True,
             hide_index=True
         )
@@ -920,6 +758,24 @@ if st.session_state.processamento_concluido:
         st.markdown("### 📊 **Médias por Disciplina**")
         st.dataframe(dados_proc['media_df'], use_container_width=True, hide_index=True)
 
+        # Médias por sede
+        if dados_proc.get('sedes_df') is not None:
+            st.markdown("### 🏫 **Médias por Sede**")
+            st.dataframe(dados_proc['sedes_df'], use_container_width=True, hide_index=True)
+
+        # Análise de itens (dificuldade, discriminação, distratores)
+        if 'itens_df' in dados_proc:
+            itens_df = dados_proc['itens_df']
+            revisar = int((itens_df["Revisar"] == "Sim").sum())
+            with st.expander(f"🔬 **Análise de Itens** ({revisar} questão(ões) para revisar)"):
+                st.dataframe(itens_df, use_container_width=True, hide_index=True)
+
+    if trabalho and trabalho.estado == CONCLUIDO:
+        mostrar_tempos(trabalho)
+
+elif st.session_state.trabalho:
+    acompanhar_trabalho(st.session_state.trabalho)
+
 else:
     # Interface de upload
     st.markdown("### 📚 Faça upload da planilha com as abas **RESPOSTAS** e **GABARITO**")
@@ -933,222 +789,22 @@ else:
 
     if arquivo:
         try:
-            # Mostrar progresso
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            status_text.success("📖 Lendo arquivo Excel...")
-            progress_bar.progress(10)
-            
-            # Ler arquivo Excel com engine otimizado
-            dados = pd.read_excel(arquivo, sheet_name=None, engine='openpyxl')
-            
-            status_text.success("✅ Validando estrutura do arquivo...")
-            progress_bar.progress(20)
-            
-            # Validar arquivo
-            valido, erros = validar_arquivo_excel(dados)
-            if not valido:
-                st.error("**🚨 Problemas encontrados no arquivo:**")
-                for erro in erros:
-                    st.error(erro)
-                st.stop()
-            
-            respostas = dados["RESPOSTAS"]
-            gabarito = dados["GABARITO"]
-            
-            # Validar gabarito
-            gabarito_valido, erros_gabarito = validar_dados_gabarito(gabarito)
-            if not gabarito_valido:
-                st.error("**🚨 Problemas encontrados no gabarito:**")
-                for erro in erros_gabarito:
-                    st.error(erro)
-                st.stop()
-            
-            status_text.success("📊 Processando dados...")
-            progress_bar.progress(30)
-            
-            # Estatísticas
-            total_alunos = len(respostas)
-            total_questoes = len(gabarito)
-            disciplinas = gabarito['Disciplina'].unique()
-            total_disciplinas = len(disciplinas)
-            
-            # Mostrar estatísticas principais
-            st.markdown("### 📊 **Estatísticas do Simulado**")
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.markdown(f"""
-                <div class="metric-container">
-                    <h3 style="color: #2d5a3d; margin: 0;">👥 {total_alunos}</h3>
-                    <p style="margin: 0; color: #666;">Alunos</p>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown(f"""
-                <div class="metric-container">
-                    <h3 style="color: #2d5a3d; margin: 0;">❓ {total_questoes}</h3>
-                    <p style="margin: 0; color: #666;">Questões</p>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col3:
-                st.markdown(f"""
-                <div class="metric-container">
-                    <h3 style="color: #2d5a3d; margin: 0;">📚 {total_disciplinas}</h3>
-                    <p style="margin: 0; color: #666;">Disciplinas</p>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            # Processar dados
-            status_text.success("🔄 Corrigindo respostas...")
-            progress_bar.progress(40)
-            
-            # Mapeamento disciplinas
-            mapa_disciplinas = {}
-            for disciplina in gabarito['Disciplina'].unique():
-                if pd.isna(disciplina):
-                    continue
-                questoes = gabarito[gabarito['Disciplina'] == disciplina]['Questão'].tolist()
-                mapa_disciplinas[disciplina] = questoes
-
-            # Usar função otimizada
-            respostas_corr = corrigir_respostas_otimizado(respostas, gabarito, mapa_disciplinas)
-            
-            status_text.success("📈 Calculando ranking...")
-            progress_bar.progress(50)
-
-            # Ranking otimizado
-            questoes_unicas = gabarito['Questão'].unique()
-            
-            # Calcular percentuais de forma vetorizada
-            colunas_ok = [f"Q{int(q)}_OK" for q in questoes_unicas]
-            colunas_ok_existentes = [col for col in colunas_ok if col in respostas_corr.columns]
-            
-            respostas_corr["Percentual"] = respostas_corr[colunas_ok_existentes].sum(axis=1) / len(questoes_unicas)
-
-            ranking_df = respostas_corr[["ID", "Nome", "Percentual"]].sort_values("Percentual", ascending=False).reset_index(drop=True)
-            ranking_df["Posição"] = ranking_df.index + 1
-            ranking_df["Nota (%)"] = (ranking_df["Percentual"] * 100).round(1)
-            media_turma = ranking_df["Percentual"].mean() * 100
-            
-            # Atualizar estatísticas
-            with col4:
-                st.markdown(f"""
-                <div class="metric-container">
-                    <h3 style="color: #2d5a3d; margin: 0;">📈 {media_turma:.1f}%</h3>
-                    <p style="margin: 0; color: #666;">Média Geral</p>
-                </div>
-                """, unsafe_allow_html=True)
-
-            # Salvar estatísticas
-            st.session_state.stats = {
-                'total_alunos': total_alunos,
-                'total_questoes': total_questoes,
-                'total_disciplinas': total_disciplinas,
-                'media_geral': media_turma
+            opcoes = {
+                'metodo_ranking': metodo_ranking,
+                'formato_graficos': formato_graficos,
+                'saida_boletins': saida_boletins,
+                'logos': assinatura_logos(logos),
             }
-            
-            status_text.success("📊 Calculando médias por disciplina...")
-            progress_bar.progress(60)
-
-            # Médias por disciplina otimizadas
-            media_disciplinas = []
-            for disc, questoes in mapa_disciplinas.items():
-                colunas_disc = [f"Q{int(q)}_OK" for q in questoes if f"Q{int(q)}_OK" in respostas_corr.columns]
-                if colunas_disc:
-                    media_disc = respostas_corr[colunas_disc].mean().mean() * 100
-                    media_disciplinas.append((disc, round(media_disc, 1)))
-            
-            media_df = pd.DataFrame(media_disciplinas, columns=["Disciplina", "%"])
-            
-            status_text.success("📄 Gerando boletins individuais...")
-            progress_bar.progress(70)
-
-            # Gerar boletins
-            with tempfile.TemporaryDirectory() as tmpdir:
-                zip_path = os.path.join(tmpdir, "boletins.zip")
-                
-                with zipfile.ZipFile(zip_path, "w") as zipf:
-                    total_alunos = len(respostas_corr)
-                    
-                    for i, aluno in respostas_corr.iterrows():
-                        # Atualizar progresso
-                        progresso = 70 + (i / total_alunos) * 25
-                        progress_bar.progress(int(progresso))
-                        status_text.success(f"📄 Gerando boletim: {aluno['Nome']} ({i+1}/{total_alunos})")
-                        
-                        nome = aluno["Nome"].replace(" ", "_").replace("/", "_")
-                        posicao = int(ranking_df.loc[ranking_df["ID"] == aluno["ID"], "Posição"].iloc[0])
-                        percentual = aluno["Percentual"] * 100
-
-                        resultados = resultados_disciplina_otimizado(aluno, mapa_disciplinas)
-                        df_boletim = pd.DataFrame(resultados, columns=["Disciplina", "Acertos", "Total", "%"])
-                        df_boletim["Media Turma"] = media_df["%"]
-                        df_boletim["Diferenca"] = (df_boletim["%"] - media_df["%"]).round(1)
-
-                        # Gráficos otimizados
-                        graficos = gerar_graficos_otimizado(nome, posicao, percentual, df_boletim, media_df, ranking_df, tmpdir)
-
-                        # PDF COM LOGOS OFICIAIS E SEM WARNINGS
-                        try:
-                            pdf = BoletimPDF()
-                            pdf.add_page()
-                            
-                            # Informações do aluno
-                            aluno_data = {'Sede': aluno.get('Sede', 'N/A')}
-                            pdf.add_aluno_info(aluno["Nome"], posicao, percentual, media_turma, aluno_data)
-                            
-                            # Tabela
-                            pdf.add_table(df_boletim)
-                            
-                            # Gráficos
-                            titulos = [
-                                "DESEMPENHO POR DISCIPLINA",
-                                "GRAFICO RADAR - COMPARACAO COM A TURMA", 
-                                "DISTRIBUICAO DAS NOTAS DA TURMA",
-                                "POSICAO NO RANKING GERAL"
-                            ]
-                            
-                            for grafico, titulo in zip(graficos, titulos):
-                                if grafico:
-                                    pdf.add_image(grafico, titulo=titulo)
-
-                            pdf_path = os.path.join(tmpdir, f"Boletim_{nome}.pdf")
-                            pdf.output(pdf_path)
-                            zipf.write(pdf_path, f"Boletim_{nome}.pdf")
-                        
-                        except Exception as e:
-                            st.warning(f"⚠️ Erro ao gerar PDF para {aluno['Nome']}: {str(e)}")
-                            continue
-
-                status_text.success("✅ Processamento concluído!")
-                progress_bar.progress(100)
-                
-                # Salvar dados processados
-                st.session_state.dados_processados = {
-                    'ranking_df': ranking_df,
-                    'media_df': media_df
-                }
-                
-                # Botão de download
-                with open(zip_path, "rb") as f:
-                    st.markdown("### 🎉 **Boletins Prontos!**")
-                    st.download_button(
-                        "📥 **Baixar Todos os Boletins (ZIP)**", 
-                        f.read(), 
-                        "boletins_acafe_fleming.zip", 
-                        "application/zip",
-                        help=f"Arquivo contém {total_alunos} boletins individuais em PDF com logos oficiais",
-                        use_container_width=True
-                    )
-                
-                # Marcar como concluído
-                st.session_state.processamento_concluido = True
-                st.balloons()
-                st.success(f"🎊 **{total_alunos} boletins gerados com sucesso!**")
+            # Correção e boletins vão para a fila: sobrevivem a reruns e a conexões perdidas.
+            # Mesmo arquivo com as mesmas opções: o trabalho sai pronto do cache em disco
+            id_trabalho = fila_trabalhos().enviar(
+                arquivo.getvalue(),
+                getattr(arquivo, 'name', 'planilha.xlsx'),
+                opcoes,
+                caminhos_logos=logos,
+                processos=processos
+            )
+            abrir_trabalho(id_trabalho)
                 
         except Exception as e:
             st.error(f"❌ **Erro durante o processamento:** {str(e)}")
@@ -0,0 +1,61 @@
+"""Núcleo de correção do Simulado ACAFE - Colégio Fleming"""
+
+from corretor.correcao import (
+    ALTERNATIVAS,
+    CODIGO_INVALIDO,
+    COLUNA_ANULADA,
+    COLUNA_PESO,
+    LINGUAS_ESTRANGEIRAS,
+    SEM_TRILHA,
+    Correcao,
+    codificar_gabarito,
+    codificar_respostas,
+    coluna_questao,
+    corrigir_matriz,
+    escolher_trilhas,
+    pesos_gabarito,
+    recorrigir_gabarito,
+    trilhas_gabarito,
+)
+from corretor.disciplinas import (
+    BoletimDisciplinas,
+    IndiceDisciplinas,
+    ResultadoDisciplinas,
+    construir_indice_disciplinas,
+    resultados_disciplinas,
+    somar_por_disciplina,
+)
+from corretor.ranking import (
+    METODO_RANKING_PADRAO,
+    METODOS_RANKING,
+    calcular_posicoes,
+    montar_ranking,
+)
+
+__all__ = [
+    "ALTERNATIVAS",
+    "CODIGO_INVALIDO",
+    "COLUNA_ANULADA",
+    "COLUNA_PESO",
+    "LINGUAS_ESTRANGEIRAS",
+    "METODO_RANKING_PADRAO",
+    "METODOS_RANKING",
+    "SEM_TRILHA",
+    "BoletimDisciplinas",
+    "Correcao",
+    "IndiceDisciplinas",
+    "ResultadoDisciplinas",
+    "calcular_posicoes",
+    "codificar_gabarito",
+    "codificar_respostas",
+    "coluna_questao",
+    "construir_indice_disciplinas",
+    "corrigir_matriz",
+    "escolher_trilhas",
+    "montar_ranking",
+    "pesos_gabarito",
+    "recorrigir_gabarito",
+    "resultados_disciplinas",
+    "somar_por_disciplina",
+    "trilhas_gabarito",
+]
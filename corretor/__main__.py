@@ -0,0 +1,7 @@
+"""Permite `python -m corretor grade planilha.xlsx --out boletins.zip`"""
+
+import sys
+
+from corretor.cli import main
+
+sys.exit(main())
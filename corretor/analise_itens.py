@@ -0,0 +1,155 @@
+"""Análise de itens do simulado (dificuldade, discriminação e distratores)
+
+Tudo sai de reduções sobre a matriz da correção, sem laço por aluno:
+    - dificuldade (p): fração dos alunos que acertou o item;
+    - bisserial por ponto: correlação entre acertar o item e a nota final;
+    - índice D: p no grupo dos 27% melhores menos p nos 27% piores;
+    - distratores: fração dos alunos que marcou cada alternativa ou deixou
+      em branco.
+Com trilhas de língua, cada item considera só os alunos da sua trilha.
+"""
+
+from dataclasses import dataclass
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from corretor.correcao import ALTERNATIVAS, CODIGO_INVALIDO
+
+FRACAO_GRUPOS = 0.27
+DISCRIMINACAO_MINIMA = 0.2  # abaixo disso o item merece revisão
+
+
+@dataclass
+class AnaliseItens:
+    """Estatísticas por item (Q,), na ordem das colunas da correção"""
+    questoes: np.ndarray
+    disciplinas: list
+    gabarito: list          # letra correta ('-' se inválida)
+    anuladas: np.ndarray
+    alunos: np.ndarray      # alunos que fizeram o item
+    dificuldade: np.ndarray
+    bisserial: np.ndarray
+    indice_d: np.ndarray
+    distratores: np.ndarray  # (Q, 6) fração em A-E e em branco/inválida
+
+    def tabela(self):
+        """DataFrame com uma linha por item, pronto para a tela e para o Excel"""
+        tabela = pd.DataFrame({
+            "Questão": self.questoes,
+            "Disciplina": self.disciplinas,
+            "Gabarito": self.gabarito,
+            "Anulada": np.where(self.anuladas, "Sim", ""),
+            "Alunos": self.alunos,
+            "Acerto (%)": np.round(100 * self.dificuldade, 1),
+            "Bisserial": np.round(self.bisserial, 3),
+            "Índice D": np.round(self.indice_d, 3),
+            "Nível": classificar_dificuldade(self.dificuldade),
+            "Revisar": np.where(self.revisar, "Sim", ""),
+        })
+        for k, alternativa in enumerate(ALTERNATIVAS + ["Branco"]):
+            tabela[f"% {alternativa}"] = np.round(100 * self.distratores[:, k], 1)
+        return tabela
+
+    @property
+    def revisar(self):
+        """Itens que discriminam pouco (ou ao contrário) e não foram anulados
+
+        Bisserial indefinida (todos acertaram, todos erraram ou ninguém fez o
+        item) não marca revisão: não há como medir a discriminação.
+        """
+        bisserial = self.bisserial
+        return ~self.anuladas & np.isfinite(bisserial) & (bisserial < DISCRIMINACAO_MINIMA)
+
+
+def classificar_dificuldade(dificuldade):
+    """Fácil (p >= 0,7), Média ou Difícil (p < 0,3); vazio se ninguém fez o item"""
+    dificuldade = np.asarray(dificuldade, dtype=float)
+    return np.select([np.isnan(dificuldade), dificuldade >= 0.7, dificuldade < 0.3],
+                     ["", "Fácil", "Difícil"], "Média")
+
+
+def _divisao(numerador, denominador):
+    """Divisão elemento a elemento com NaN onde o denominador é zero"""
+    numerador = np.asarray(numerador, dtype=float)
+    saida = np.full(numerador.shape, np.nan)
+    return np.divide(numerador, denominador, out=saida, where=np.asarray(denominador) > 0)
+
+
+def analisar_itens(correcao, indice_disciplinas):
+    """Calcula a análise de todos os itens de uma correção"""
+    acertos = correcao.acertos.astype(np.float64)          # (N, Q)
+    aplicaveis = correcao.aplicaveis.astype(np.float64)    # (N, Q)
+    notas = np.asarray(correcao.percentual, dtype=np.float64)
+    n_alunos, n_itens = acertos.shape
+
+    # Dificuldade e bisserial por ponto a partir de somas por coluna
+    alunos = aplicaveis.sum(axis=0)
+    acertaram = acertos.sum(axis=0)
+    dificuldade = _divisao(acertaram, alunos)
+
+    soma_notas = notas @ aplicaveis
+    media = _divisao(soma_notas, alunos)
+    desvio = np.sqrt(np.maximum(_divisao((notas ** 2) @ aplicaveis, alunos) - media ** 2, 0))
+    media_acerto = _divisao(notas @ acertos, acertaram)
+    media_erro = _divisao(soma_notas - notas @ acertos, alunos - acertaram)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bisserial = (media_acerto - media_erro) / desvio * np.sqrt(dificuldade * (1 - dificuldade))
+    bisserial[~np.isfinite(bisserial)] = np.nan
+
+    # Grupos superior e inferior pela nota final (empates pela ordem da planilha)
+    tamanho = max(1, int(round(FRACAO_GRUPOS * n_alunos))) if n_alunos else 0
+    ordem = np.argsort(-notas, kind="stable")
+    superior, inferior = ordem[:tamanho], ordem[n_alunos - tamanho:]
+    indice_d = (_divisao(acertos[superior].sum(axis=0), aplicaveis[superior].sum(axis=0))
+                - _divisao(acertos[inferior].sum(axis=0), aplicaveis[inferior].sum(axis=0)))
+
+    # Alternativas marcadas (A-E e branco/inválida) por quem fez o item
+    marcadas = np.empty((n_itens, len(ALTERNATIVAS) + 1))
+    feitos = aplicaveis.astype(bool)
+    for k in range(len(ALTERNATIVAS)):
+        marcadas[:, k] = ((correcao.respostas == k) & feitos).sum(axis=0)
+    marcadas[:, -1] = alunos - marcadas[:, :-1].sum(axis=1)
+    distratores = _divisao(marcadas, alunos[:, np.newaxis])
+
+    # Disciplina de cada coluna a partir dos trechos do índice
+    disciplinas = [""] * n_itens
+    for disciplina, inicio, total in zip(indice_disciplinas.disciplinas, indice_disciplinas.inicios,
+                                         indice_disciplinas.totais):
+        for coluna in indice_disciplinas.colunas[inicio:inicio + total]:
+            disciplinas[coluna] = disciplina
+
+    gabarito = [ALTERNATIVAS[c] if c != CODIGO_INVALIDO else "-" for c in correcao.gabarito.tolist()]
+
+    return AnaliseItens(
+        questoes=np.asarray(correcao.questoes),
+        disciplinas=disciplinas,
+        gabarito=gabarito,
+        anuladas=np.asarray(correcao.anuladas, dtype=bool),
+        alunos=alunos.astype(int),
+        dificuldade=dificuldade,
+        bisserial=bisserial,
+        indice_d=indice_d,
+        distratores=distratores,
+    )
+
+
+LEGENDA = [
+    ("Acerto (%)", "Dificuldade do item: porcentagem dos alunos que acertou"),
+    ("Bisserial", "Correlação entre acertar o item e a nota final (bom acima de 0,2; negativo indica problema)"),
+    ("Índice D", "Acerto dos 27% melhores menos o dos 27% piores (bom acima de 0,2)"),
+    ("Nível", "Fácil: acerto de 70% ou mais; Difícil: abaixo de 30%; vazio se nenhum aluno fez o item"),
+    ("Revisar", f"Bisserial abaixo de {DISCRIMINACAO_MINIMA:g}: conferir gabarito e enunciado"),
+    ("% A ... % Branco", "Distribuição das marcações entre os alunos que fizeram o item"),
+]
+
+
+def planilha_analise_itens(analise):
+    """Bytes de um .xlsx com a análise de itens e a legenda das colunas"""
+    saida = BytesIO()
+    with pd.ExcelWriter(saida, engine="openpyxl") as escritor:
+        analise.tabela().to_excel(escritor, sheet_name="ANÁLISE DE ITENS", index=False)
+        pd.DataFrame(LEGENDA, columns=["Coluna", "Significado"]).to_excel(
+            escritor, sheet_name="LEGENDA", index=False)
+    return saida.getvalue()
@@ -0,0 +1,270 @@
+"""Benchmark do processamento com planilhas sintéticas
+
+    python -m corretor bench --alunos 100 1000 10000 --out benchmark.json
+    python -m corretor bench --alunos 1000 --comparar benchmark_anterior.json
+
+`gerar_simulado` monta uma planilha no formato do template (abas RESPOSTAS
+e GABARITO) com o número de alunos, questões, disciplinas, sedes e línguas
+que se quiser. `medir` passa essa planilha pelas mesmas funções do app e da
+linha de comando e cronometra cada etapa: leitura, validação, correção,
+médias por disciplina, sedes, ranking, análise de itens e boletins (com
+cada gráfico, cada fase do PDF e a gravação no ZIP somados à parte).
+
+Cada tamanho roda num processo novo, para que o pico de memória (RSS) seja
+só o daquela execução. O resultado é um dicionário pronto para JSON; dois
+arquivos de versões diferentes são comparados com `comparar`.
+"""
+
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+
+from corretor.boletins import FORMATO_GRAFICOS_PADRAO, adicionar_ao_zip, gerar_boletins
+from corretor.cache import VERSAO_RESULTADOS
+from corretor.cronometro import Cronometro
+from corretor.logos import LOGOS_PADRAO, preparar_logos_pdf
+from corretor.pipeline import contexto_boletins, corrigir_turma, ler_planilha, validar_planilha
+
+try:
+    import resource
+except ImportError:  # Windows: sem pico de memória
+    resource = None
+
+ALTERNATIVAS_SIMULADO = np.array(list("ABCDE"), dtype=object)
+DISCIPLINAS_SIMULADO = ["Português", "Matemática", "História", "Geografia", "Biologia",
+                        "Física", "Química", "Literatura", "Filosofia", "Sociologia"]
+SEDES_SIMULADO = ["CRICIÚMA", "TUBARÃO", "FLORIANÓPOLIS", "JOINVILLE", "BLUMENAU"]
+LINGUAS_SIMULADO = ["Inglês", "Espanhol"]
+QUESTOES_LINGUA = 5        # últimas questões, com o mesmo número em Inglês e Espanhol
+TAXA_EM_BRANCO = 0.03
+
+ALUNOS_PADRAO = (100, 1000)
+
+
+# --------------------------
+# PLANILHA SINTÉTICA
+# --------------------------
+
+def _nomes(base, quantidade, prefixo):
+    return [base[i] if i < len(base) else f"{prefixo} {i + 1}" for i in range(quantidade)]
+
+
+def gerar_simulado(alunos, questoes=70, disciplinas=7, sedes=2, linguas=True, semente=0):
+    """Bytes de um .xlsx com as abas RESPOSTAS e GABARITO preenchidas ao acaso
+
+    Cada aluno tem uma habilidade própria (chance de acertar cada questão);
+    ~3% das respostas ficam em branco. Com `linguas`, as últimas questões
+    existem em Inglês e em Espanhol com o mesmo número e a aba RESPOSTAS
+    ganha a coluna Língua.
+    """
+    import openpyxl  # só para escrever a planilha, como na leitura
+
+    rng = np.random.default_rng(semente)
+    n_lingua = QUESTOES_LINGUA if linguas and questoes > QUESTOES_LINGUA else 0
+    numeros = np.arange(1, questoes + 1)
+    comuns, das_linguas = numeros[:questoes - n_lingua], numeros[questoes - n_lingua:]
+
+    # Gabarito: disciplinas em blocos de questões seguidas, como na prova
+    nomes_disciplinas = _nomes(DISCIPLINAS_SIMULADO, max(1, disciplinas), "Disciplina")
+    gabarito = []
+    for disciplina, bloco in zip(nomes_disciplinas, np.array_split(comuns, len(nomes_disciplinas))):
+        gabarito += [(int(q), rng.choice(ALTERNATIVAS_SIMULADO), disciplina) for q in bloco]
+    chaves_linguas = {lingua: rng.choice(ALTERNATIVAS_SIMULADO, n_lingua) for lingua in LINGUAS_SIMULADO}
+    if n_lingua:
+        for lingua, chave in chaves_linguas.items():
+            gabarito += [(int(q), letra, lingua) for q, letra in zip(das_linguas, chave)]
+
+    # Chave que cada aluno deveria marcar em cada coluna de questão (N x Q)
+    chave_comum = np.array([letra for _, letra, _ in gabarito[:len(comuns)]], dtype=object)
+    lingua_aluno = rng.integers(0, len(LINGUAS_SIMULADO), alunos)
+    chave_aluno = np.empty((alunos, questoes), dtype=object)
+    chave_aluno[:, :len(comuns)] = chave_comum
+    for t, lingua in enumerate(LINGUAS_SIMULADO):
+        chave_aluno[lingua_aluno == t, len(comuns):] = chaves_linguas[lingua]
+
+    # Acerta com a chance da sua habilidade; errando, marca outra letra qualquer
+    habilidade = rng.beta(4, 3, alunos)[:, None]
+    acertou = rng.random((alunos, questoes)) < habilidade
+    deslocamento = rng.integers(1, len(ALTERNATIVAS_SIMULADO), (alunos, questoes))
+    indices_chave = np.searchsorted(ALTERNATIVAS_SIMULADO.astype(str), chave_aluno.astype(str))
+    erradas = ALTERNATIVAS_SIMULADO[(indices_chave + deslocamento) % len(ALTERNATIVAS_SIMULADO)]
+    respostas = np.where(acertou, chave_aluno, erradas)
+    respostas[rng.random((alunos, questoes)) < TAXA_EM_BRANCO] = None
+
+    nomes_sedes = _nomes(SEDES_SIMULADO, max(1, sedes), "Sede")
+    sede_aluno = rng.integers(0, len(nomes_sedes), alunos)
+
+    livro = openpyxl.Workbook(write_only=True)
+    aba = livro.create_sheet("RESPOSTAS")
+    cabecalho = ["ID", "Nome", "Sede"] + (["Língua"] if n_lingua else [])
+    aba.append(cabecalho + [f"Questão {q:02d}" for q in numeros])
+    for i in range(alunos):
+        fixos = [i + 1, f"Aluno {i + 1}", nomes_sedes[sede_aluno[i]]]
+        if n_lingua:
+            fixos.append(LINGUAS_SIMULADO[lingua_aluno[i]])
+        aba.append(fixos + respostas[i].tolist())
+
+    aba = livro.create_sheet("GABARITO")
+    aba.append(["Questão", "Resposta", "Disciplina"])
+    for linha in gabarito:
+        aba.append(list(linha))
+
+    buffer = BytesIO()
+    livro.save(buffer)
+    return buffer.getvalue()
+
+
+# --------------------------
+# MEDIÇÃO
+# --------------------------
+
+def _pico_rss_mb(quem):
+    """Maior RSS já atingido (MB) pelo processo ou pelo maior dos filhos; None sem `resource`"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(quem).ru_maxrss
+    # Linux informa em KiB, macOS em bytes
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def medir(conteudo, processos=1, formato_graficos=FORMATO_GRAFICOS_PADRAO, max_boletins=None):
+    """Roda a planilha `conteudo` (bytes) pelo pipeline e devolve os tempos de cada etapa
+
+    Com `max_boletins`, só os primeiros alunos ganham boletim; a correção é
+    sempre da turma inteira.
+    """
+    cronometro = Cronometro()
+    dados = ler_planilha(BytesIO(conteudo), cronometro)
+
+    with cronometro.etapa("Validação"):
+        respostas, gabarito, _ = validar_planilha(dados)
+
+    turma = corrigir_turma(respostas, gabarito, cronometro=cronometro)
+
+    with cronometro.etapa("Logos"):
+        logos = preparar_logos_pdf(LOGOS_PADRAO)
+
+    tarefas = turma.tarefas()[:max_boletins]
+    contexto = contexto_boletins(turma, logos, formato_graficos)
+    fases = Cronometro()
+    gerados = 0
+    with cronometro.etapa("Boletins"), tempfile.TemporaryFile() as destino:
+        with zipfile.ZipFile(destino, "w") as zipf:
+            for resultado in gerar_boletins(contexto, tarefas, processos):
+                fases.somar(resultado.tempos)
+                with fases.etapa("ZIP"):
+                    gerados += adicionar_ao_zip(zipf, resultado)
+        tamanho_zip = destino.tell()
+
+    total = cronometro.total
+    return {
+        "alunos": turma.total_alunos,
+        "questoes": turma.total_questoes,
+        "disciplinas": turma.total_disciplinas,
+        "sedes": len(turma.sedes) if turma.sedes is not None else 1,
+        "boletins": gerados,
+        "etapas": {nome: round(segundos, 4) for nome, segundos in cronometro.etapas.items()},
+        # Somas por boletim: com vários processos passam do tempo de parede
+        "boletins_detalhe": {nome: round(segundos, 4) for nome, segundos in fases.etapas.items()},
+        "total_s": round(total, 4),
+        "alunos_por_s": round(turma.total_alunos / total, 2) if total else None,
+        "boletins_por_s": round(gerados / cronometro.etapas["Boletins"], 2) if gerados else None,
+        "zip_mb": round(tamanho_zip / (1024 * 1024), 2),
+        "pico_rss_mb": _pico_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        "pico_rss_processos_mb": _pico_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+    }
+
+
+def _medir_simulado(alunos, simulado, processos, formato_graficos, max_boletins):
+    conteudo = gerar_simulado(alunos, **simulado)
+    return medir(conteudo, processos, formato_graficos, max_boletins)
+
+
+def executar(tamanhos=ALUNOS_PADRAO, questoes=70, disciplinas=7, sedes=2, linguas=True, semente=0,
+             processos=1, formato_graficos=FORMATO_GRAFICOS_PADRAO, max_boletins=None, ao_medir=None):
+    """Mede cada número de alunos de `tamanhos`, cada um num processo novo
+
+    `ao_medir(execucao)` é chamado a cada tamanho concluído. Devolve o
+    dicionário completo (máquina, parâmetros e execuções) para gravar em JSON.
+    """
+    simulado = dict(questoes=questoes, disciplinas=disciplinas, sedes=sedes, linguas=linguas, semente=semente)
+    execucoes = []
+    for alunos in tamanhos:
+        # spawn: cada medição começa sem nada importado nem em memória
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            execucao = executor.submit(_medir_simulado, alunos, simulado, processos,
+                                       formato_graficos, max_boletins).result()
+        execucoes.append(execucao)
+        if ao_medir:
+            ao_medir(execucao)
+
+    return {
+        "versao": VERSAO_RESULTADOS,
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parametros": dict(simulado, processos=processos, formato_graficos=formato_graficos,
+                           max_boletins=max_boletins),
+        "execucoes": execucoes,
+    }
+
+
+# --------------------------
+# RELATÓRIOS
+# --------------------------
+
+def resumo(execucao):
+    """Tabela de texto de uma execução: etapas, vazão e memória"""
+    etapas = execucao["etapas"]
+    largura = max(len(nome) for nome in list(etapas) + list(execucao["boletins_detalhe"]) + ["Total"])
+    linhas = [f"{execucao['alunos']} alunos, {execucao['questoes']} questões, "
+              f"{execucao['disciplinas']} disciplinas, {execucao['sedes']} sede(s)"]
+    linhas += [f"  {nome:<{largura}}  {segundos:8.2f} s" for nome, segundos in etapas.items()]
+    linhas.append(f"  {'Total':<{largura}}  {execucao['total_s']:8.2f} s")
+    linhas.append(f"  {execucao['boletins']} boletins, ZIP de {execucao['zip_mb']:.1f} MB; "
+                  "soma das fases de todos os boletins:")
+    linhas += [f"    {nome:<{largura}}  {segundos:8.2f} s" for nome, segundos in execucao["boletins_detalhe"].items()]
+    linhas.append(f"  {execucao['alunos_por_s']} alunos/s, {execucao['boletins_por_s']} boletins/s")
+    if execucao["pico_rss_mb"] is not None:
+        processos = execucao["pico_rss_processos_mb"]
+        linhas.append(f"  Pico de memória: {execucao['pico_rss_mb']:.0f} MB"
+                      + (f" (maior processo de boletins: {processos:.0f} MB)" if processos else ""))
+    return "\n".join(linhas)
+
+
+def _variacao(antes, depois):
+    if not antes:
+        return ""
+    return f"{(depois - antes) / antes * 100:+.0f}%"
+
+
+def comparar(atual, anterior):
+    """Tabela de texto com a variação de cada etapa entre dois resultados, por número de alunos"""
+    anteriores = {execucao["alunos"]: execucao for execucao in anterior["execucoes"]}
+    linhas = [f"Comparação com {anterior.get('versao')} de {anterior.get('data')}"]
+    for execucao in atual["execucoes"]:
+        antes = anteriores.get(execucao["alunos"])
+        if antes is None:
+            continue
+        linhas.append(f"{execucao['alunos']} alunos")
+        pares = [(nome, antes["etapas"][nome], segundos)
+                 for nome, segundos in execucao["etapas"].items() if nome in antes["etapas"]]
+        pares.append(("Total", antes["total_s"], execucao["total_s"]))
+        largura = max(len(nome) for nome, _, _ in pares)
+        linhas += [f"  {nome:<{largura}}  {a:8.2f} s -> {d:8.2f} s  {_variacao(a, d)}" for nome, a, d in pares]
+        if antes.get("pico_rss_mb") and execucao.get("pico_rss_mb"):
+            linhas.append(f"  {'Pico RSS':<{largura}}  {antes['pico_rss_mb']:6.0f} MB -> "
+                          f"{execucao['pico_rss_mb']:6.0f} MB  "
+                          f"{_variacao(antes['pico_rss_mb'], execucao['pico_rss_mb'])}")
+    if len(linhas) == 1:
+        linhas.append("Nenhum número de alunos em comum")
+    return "\n".join(linhas)
@@ -0,0 +1,434 @@
+"""Geração dos boletins individuais (gráficos + PDF)
+
+O trabalho de cada aluno é independente: recebe uma `TarefaBoletim`
+pequena e lê o resto de um `ContextoBoletins` compartilhado. Com mais de um
+processo, o contexto é enviado uma única vez para cada worker do
+`ProcessPoolExecutor` (no initializer) e os resultados voltam na ordem das
+tarefas, prontos para entrar no ZIP.
+
+Nada passa pelo disco: gráficos são renderizados em buffers, o PDF sai
+como bytes de `pdf.output()` e entra no ZIP com `writestr`.
+
+Para impressão, `LoteImpressao` escreve todos os boletins num único
+documento, agrupados por sede e com marcadores (outline) por sede e por
+aluno. Fontes, logos e os fundos dos gráficos da turma entram uma vez só.
+
+Sob demanda, `BoletinsSobDemanda` gera só o boletim do aluno aberto na tela
+e guarda os últimos gerados num LRU de tamanho fixo.
+
+Cada boletim traz em `ResultadoBoletim.tempos` o tempo de parede, CPU e
+memória de cada gráfico e de cada fase do PDF; `perfilar_boletim` roda um
+único boletim sob o cProfile.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from corretor.cronometro import Cronometro
+from corretor.sedes import nome_sede
+
+# matplotlib, fpdf e os módulos de gráficos e PDF só são importados ao gerar o
+# primeiro boletim: abrir o app (ou só corrigir) não paga por eles
+
+TITULOS_GRAFICOS = [
+    "DESEMPENHO POR DISCIPLINA",
+    "GRAFICO RADAR - COMPARACAO COM A TURMA",
+    "DISTRIBUICAO DAS NOTAS DA TURMA",
+    "POSICAO NO RANKING GERAL"
+]
+
+# Como os gráficos entram no PDF
+FORMATOS_GRAFICOS = {
+    "vetorial": "Vetorial (PDF leve e rápido)",
+    "png": "Imagem PNG (matplotlib)",
+}
+FORMATO_GRAFICOS_PADRAO = "vetorial"
+
+# Como os boletins são entregues
+SAIDAS_BOLETINS = {
+    "zip": "ZIP com um PDF por aluno",
+    "zip_sedes": "ZIP com uma pasta por sede (cada sede liberada ao ficar pronta)",
+    "pdf_unico": "PDF único para impressão (marcadores por sede e aluno)",
+    "sob_demanda": "Sob demanda (notas na hora; cada boletim gerado ao abrir o aluno)",
+}
+SAIDA_BOLETINS_PADRAO = "zip"
+SAIDA_SOB_DEMANDA = "sob_demanda"
+
+# Boletins sob demanda guardados em memória (os usados há mais tempo saem primeiro)
+LIMITE_BOLETINS_SOB_DEMANDA = 256
+
+# Sessões do Streamlit e workers da fila são threads do mesmo processo, e os
+# gráficos trocam o rcParams global (rc_context): um boletim por vez por processo
+_trava_graficos = threading.Lock()
+
+
+def nome_arquivo(nome):
+    """Nome do aluno em formato seguro para arquivos"""
+    return str(nome).replace(" ", "_").replace("/", "_")
+
+
+def gerar_graficos_otimizado(nome, posicao, percentual, boletim, graficos_turma, vetorial=False,
+                             cronometro=None, graficos_aluno=None):
+    """Gera os gráficos para o boletim individual - VERSÃO OTIMIZADA
+
+    Com `vetorial=True` as barras (e, via `graficos_turma`, o histograma e o
+    ranking) viram desenhos FPDF em vez de PNGs; o radar continua em PNG.
+    As figuras das barras e do radar vêm de `graficos_aluno`, reaproveitadas
+    entre alunos. Cada gráfico é uma etapa do `cronometro`.
+    """
+    cronometro = cronometro or Cronometro()
+    if graficos_aluno is None:
+        from corretor.graficos import GraficosAluno
+        graficos_aluno = GraficosAluno()
+    from corretor.graficos_vetoriais import grafico_barras
+
+    n_disciplinas = len(boletim.disciplinas)
+    graficos = []
+    
+    # Gráfico de Barras (mais importante)
+    with cronometro.etapa("Gráfico de barras"):
+        if n_disciplinas > 0 and vetorial:
+            graficos.append(grafico_barras(boletim, nome))
+        elif n_disciplinas > 0:
+            graficos.append(graficos_aluno.barras(nome, boletim))
+        else:
+            graficos.append(None)
+
+    # Gráfico Radar (se houver disciplinas suficientes)
+    with cronometro.etapa("Gráfico radar"):
+        if n_disciplinas >= 3:
+            graficos.append(graficos_aluno.radar(nome, boletim))
+        else:
+            graficos.append(None)
+
+    # Distribuição das notas e ranking: fundo da turma em cache, só o destaque é redesenhado
+    with cronometro.etapa("Gráfico de distribuição"):
+        graficos.append(graficos_turma.histograma(nome, percentual))
+    with cronometro.etapa("Gráfico de ranking"):
+        graficos.append(graficos_turma.posicao_ranking(nome, posicao, percentual))
+
+    return graficos
+
+
+# --------------------------
+# TAREFAS E CONTEXTO
+# --------------------------
+
+@dataclass
+class ContextoBoletins:
+    """Dados da turma compartilhados por todos os boletins"""
+    ranking_df: object       # DataFrame do ranking (histograma e curva)
+    por_disciplina: object   # ResultadoDisciplinas com a matriz N x S
+    media_turma: float
+    logos: dict
+    formato_graficos: str = FORMATO_GRAFICOS_PADRAO
+
+
+@dataclass
+class TarefaBoletim:
+    """Dados de um único aluno - o que trafega por tarefa entre processos"""
+    indice: int          # linha do aluno na matriz de correção
+    nome: str
+    sede: object
+    posicao: int
+    percentual: float
+    posicao_sede: int = None   # só com mais de uma sede
+    total_sede: int = None
+
+
+@dataclass
+class ResultadoBoletim:
+    """Boletim pronto (ou o motivo de não ter sido gerado)"""
+    indice: int
+    nome: str
+    arquivo: str
+    pdf: bytes = None
+    avisos: list = field(default_factory=list)
+    tempos: dict = field(default_factory=dict)   # {etapa: Medida} dos gráficos e do PDF deste boletim
+    cpu_processo: float = None   # CPU (s) gasta num processo do pool; None se gerado no processo atual
+
+
+class GeradorBoletins:
+    """Gera boletins de uma turma reaproveitando as camadas de gráficos da turma
+
+    Com `turma_compartilhada=True` (vários boletins no mesmo documento) o
+    histograma e o ranking usam o fundo da turma como imagem única.
+    """
+
+    def __init__(self, contexto, turma_compartilhada=False):
+        from corretor.graficos import GraficosAluno, GraficosTurma
+        from corretor.graficos_vetoriais import GraficosTurmaCompartilhados, GraficosTurmaVetoriais
+
+        self.contexto = contexto
+        self.vetorial = contexto.formato_graficos == "vetorial"
+        if turma_compartilhada:
+            self.graficos_turma = GraficosTurmaCompartilhados(GraficosTurma(contexto.ranking_df))
+        elif self.vetorial:
+            self.graficos_turma = GraficosTurmaVetoriais(contexto.ranking_df)
+        else:
+            self.graficos_turma = GraficosTurma(contexto.ranking_df)
+        # Figuras das barras e do radar, montadas no primeiro aluno e reaproveitadas
+        self.graficos_aluno = GraficosAluno()
+
+    def novo_resultado(self, tarefa):
+        nome = nome_arquivo(tarefa.nome)
+        return ResultadoBoletim(indice=tarefa.indice, nome=tarefa.nome, arquivo=f"Boletim_{nome}.pdf")
+
+    def escrever(self, pdf, tarefa, resultado, cronometro=None):
+        """Escreve o boletim do aluno a partir da página atual do documento"""
+        contexto = self.contexto
+        nome = nome_arquivo(tarefa.nome)
+        boletim = contexto.por_disciplina.aluno(tarefa.indice)
+        cronometro = cronometro or Cronometro()
+
+        try:
+            graficos = gerar_graficos_otimizado(nome, tarefa.posicao, tarefa.percentual, boletim,
+                                                self.graficos_turma, self.vetorial, cronometro,
+                                                self.graficos_aluno)
+        except Exception as e:
+            resultado.avisos.append(f"Erro ao gerar gráficos para {nome}: {str(e)}")
+            graficos = [None, None, None, None]
+
+        with cronometro.etapa("PDF: cabeçalho e tabela"):
+            # Informações do aluno
+            aluno_data = {'Sede': tarefa.sede}
+            if tarefa.posicao_sede:
+                aluno_data['Posição na Sede'] = (tarefa.posicao_sede, tarefa.total_sede)
+            pdf.add_aluno_info(tarefa.nome, tarefa.posicao, tarefa.percentual, contexto.media_turma, aluno_data)
+
+            # Tabela
+            pdf.add_table(boletim)
+        
+        # Gráficos
+        with cronometro.etapa("PDF: gráficos"):
+            for grafico, titulo in zip(graficos, TITULOS_GRAFICOS):
+                if grafico:
+                    pdf.add_grafico(grafico, titulo=titulo)
+
+    def __call__(self, tarefa):
+        resultado = self.novo_resultado(tarefa)
+        cronometro = Cronometro()
+
+        from corretor.pdf import BoletimPDF
+
+        try:
+            with cronometro.etapa("PDF: nova página"):
+                pdf = BoletimPDF(self.contexto.logos)
+                pdf.novo_boletim()
+            self.escrever(pdf, tarefa, resultado, cronometro)
+            with cronometro.etapa("PDF: gravar"):
+                resultado.pdf = bytes(pdf.output())
+        
+        except Exception as e:
+            resultado.pdf = None
+            resultado.avisos.append(f"⚠️ Erro ao gerar PDF para {tarefa.nome}: {str(e)}")
+
+        resultado.tempos = cronometro.medidas
+        return resultado
+
+
+# --------------------------
+# PDF ÚNICO PARA IMPRESSÃO
+# --------------------------
+
+def ordenar_para_impressao(tarefas):
+    """Tarefas agrupadas por sede e em ordem alfabética dentro de cada sede"""
+    return sorted(tarefas, key=lambda t: (nome_sede(t.sede), str(t.nome)))
+
+
+class LoteImpressao:
+    """Todos os boletins num único `BoletimPDF`, com marcadores por sede e por aluno
+
+    O documento é um só, então a geração é sequencial; em troca, logos,
+    fontes e fundos dos gráficos da turma são gravados uma única vez.
+    """
+
+    def __init__(self, contexto):
+        from corretor.pdf import BoletimPDF
+
+        with _trava_graficos:
+            self.gerador = GeradorBoletins(contexto, turma_compartilhada=True)
+        self.pdf = BoletimPDF(contexto.logos)
+        self.incluidos = 0
+        self._sede_atual = None
+
+    def adicionar(self, tarefa):
+        """Acrescenta o boletim do aluno ao documento (sem bytes próprios no resultado)"""
+        resultado = self.gerador.novo_resultado(tarefa)
+        pdf = self.pdf
+        cronometro = Cronometro()
+
+        try:
+            with cronometro.etapa("PDF: nova página"):
+                pdf.novo_boletim()
+                sede = nome_sede(tarefa.sede)
+                if sede != self._sede_atual:
+                    pdf.start_section(sede, level=0)
+                    self._sede_atual = sede
+                pdf.start_section(str(tarefa.nome), level=1)
+            self.gerador.escrever(pdf, tarefa, resultado, cronometro)
+            self.incluidos += 1
+        
+        except Exception as e:
+            resultado.avisos.append(f"⚠️ Erro ao gerar PDF para {tarefa.nome}: {str(e)}")
+
+        resultado.tempos = cronometro.medidas
+        return resultado
+
+    def gerar(self, tarefas):
+        """Acrescenta os boletins na ordem de impressão, produzindo cada resultado"""
+        for tarefa in ordenar_para_impressao(tarefas):
+            with _trava_graficos:
+                resultado = self.adicionar(tarefa)
+            yield resultado
+
+    def finalizar(self):
+        """Bytes do documento completo"""
+        return bytes(self.pdf.output())
+
+
+# --------------------------
+# BOLETINS SOB DEMANDA
+# --------------------------
+
+class BoletinsSobDemanda:
+    """Gera o boletim de um aluno só quando pedido, com LRU dos últimos gerados
+
+    As camadas de gráficos da turma são montadas no primeiro pedido e
+    reaproveitadas pelos seguintes.
+    """
+
+    def __init__(self, contexto, tarefas, limite=LIMITE_BOLETINS_SOB_DEMANDA):
+        self.contexto = contexto
+        self.tarefas = {tarefa.indice: tarefa for tarefa in tarefas}
+        self.limite = limite
+        self._gerador = None
+        self._prontos = OrderedDict()
+
+    def __len__(self):
+        return len(self._prontos)
+
+    def __call__(self, indice):
+        """ResultadoBoletim do aluno `indice` (linha da correção)"""
+        with _trava_graficos:
+            if indice in self._prontos:
+                self._prontos.move_to_end(indice)
+                return self._prontos[indice]
+
+            if self._gerador is None:
+                self._gerador = GeradorBoletins(self.contexto)
+            resultado = self._gerador(self.tarefas[indice])
+
+            self._prontos[indice] = resultado
+            if len(self._prontos) > self.limite:
+                self._prontos.popitem(last=False)
+            return resultado
+
+
+# --------------------------
+# PERFIL DE UM BOLETIM
+# --------------------------
+
+def perfilar_boletim(contexto, tarefa, linhas=30):
+    """Gera o boletim de `tarefa` sob o cProfile: (resultado, arquivo .prof em bytes, resumo em texto)
+
+    O boletim é gerado uma vez antes, fora do perfil, para que imports e os
+    fundos dos gráficos da turma não entrem na conta: o perfil é o de um
+    boletim típico do meio do lote. O .prof abre no snakeviz ou no pstats.
+    """
+    import cProfile
+    import io
+    import pstats
+
+    with _trava_graficos:
+        gerador = GeradorBoletins(contexto)
+        gerador(tarefa)
+        perfil = cProfile.Profile()
+        perfil.enable()
+        try:
+            resultado = gerador(tarefa)
+        finally:
+            perfil.disable()
+
+    texto = io.StringIO()
+    pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(linhas)
+    descritor, caminho = tempfile.mkstemp(suffix=".prof")
+    os.close(descritor)
+    try:
+        perfil.dump_stats(caminho)
+        with open(caminho, "rb") as arquivo:
+            dados = arquivo.read()
+    finally:
+        os.unlink(caminho)
+    return resultado, dados, texto.getvalue()
+
+
+# --------------------------
+# EXECUÇÃO EM PARALELO
+# --------------------------
+
+# Um gerador por processo worker, criado uma vez no initializer
+_gerador_processo = None
+
+
+def _inicializar_processo(contexto):
+    global _gerador_processo
+    _gerador_processo = GeradorBoletins(contexto)
+
+
+def _gerar_no_processo(tarefa):
+    inicio = time.process_time()
+    resultado = _gerador_processo(tarefa)
+    resultado.cpu_processo = time.process_time() - inicio
+    return resultado
+
+
+def processos_padrao():
+    """Número de processos sugerido para a máquina atual"""
+    return os.cpu_count() or 1
+
+
+def gerar_boletins(contexto, tarefas, processos=1):
+    """Gera os boletins e devolve os resultados na ordem das tarefas
+
+    Com `processos` <= 1 tudo roda no processo atual, um boletim por vez
+    sob `_trava_graficos`, a mesma das outras threads. Caso contrário os
+    alunos são distribuídos num pool de processos; o gerador produz cada
+    resultado assim que ele (e todos os anteriores) ficam prontos.
+    """
+    if processos <= 1 or len(tarefas) <= 1:
+        with _trava_graficos:
+            gerador = GeradorBoletins(contexto)
+        for tarefa in tarefas:
+            # A trava é solta antes do yield: quem consome não a segura
+            with _trava_graficos:
+                resultado = gerador(tarefa)
+            yield resultado
+        return
+
+    # spawn evita herdar as threads do servidor Streamlit via fork
+    executor = ProcessPoolExecutor(
+        max_workers=min(processos, len(tarefas)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_inicializar_processo,
+        initargs=(contexto,),
+    )
+    try:
+        yield from executor.map(_gerar_no_processo, tarefas)
+    finally:
+        # Se a execução for interrompida, não espera os boletins restantes
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def adicionar_ao_zip(zipf, resultado):
+    """Grava o PDF do resultado direto no ZIP, sem arquivo intermediário"""
+    if resultado.pdf:
+        zipf.writestr(resultado.arquivo, resultado.pdf)
+        return True
+    return False
@@ -0,0 +1,243 @@
+"""Cache em disco dos resultados de uma planilha
+
+A chave é o hash do arquivo enviado mais a versão dos resultados e as
+opções que mudam a saída (critério do ranking, formato dos gráficos,
+entrega). Reenviar a mesma planilha - comum depois de recarregar a página -
+devolve a turma corrigida (matriz, ranking, médias) e o arquivo de boletins
+prontos, sem reler a planilha nem gerar nenhum PDF.
+
+Cada entrada tem dois arquivos na pasta do cache: `<chave>.turma` (pickle
+da Turma) e `<chave>.boletins` (bytes do ZIP ou do PDF único). O horário de
+modificação marca o último uso; quando o total passa do limite, as
+entradas usadas há mais tempo são apagadas (LRU).
+
+Uma entrada `<chave>.base` aponta, a partir do hash só das respostas dos
+alunos, para o último resultado dessas respostas: reenviar a planilha com o
+gabarito corrigido reaproveita a correção e os boletins que não mudaram.
+
+As entradas são pickles: a pasta precisa ser só do usuário do app. A
+padrão, na pasta temporária do sistema, leva o id do usuário no nome e é
+criada com permissão 0o700; uma pasta de outro dono ou em que o grupo ou
+os demais possam gravar é recusada (`preparar_pasta_privada`).
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import stat
+import tempfile
+
+# Mudou a correção, o layout do boletim ou dos gráficos? Altere para invalidar o cache
+VERSAO_RESULTADOS = "4.0-8"
+
+
+
+def pasta_temporaria_do_usuario(nome):
+    """Pasta `nome-<uid>` na pasta temporária do sistema (no Windows ela já é do usuário)"""
+    if hasattr(os, "getuid"):
+        nome = f"{nome}-{os.getuid()}"
+    return os.path.join(tempfile.gettempdir(), nome)
+
+
+def preparar_pasta_privada(pasta):
+    """Cria a pasta só para o usuário do processo e confere que ninguém mais grava nela
+
+    Cache e fila de trabalhos carregam pickles da pasta: quem puder gravar
+    ali executa código no app. Outro dono, link simbólico ou permissão de
+    escrita para o grupo/demais levantam PermissionError.
+    """
+    os.makedirs(pasta, mode=0o700, exist_ok=True)
+    if not hasattr(os, "geteuid"):
+        return pasta
+    info = os.lstat(pasta)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{pasta} não é uma pasta (link simbólico?): escolha outra pasta")
+    if info.st_uid != os.geteuid():
+        raise PermissionError(f"{pasta} pertence a outro usuário (uid {info.st_uid}): escolha outra pasta")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"{pasta} pode ser alterada por outros usuários "
+                              f"(permissão {stat.S_IMODE(info.st_mode):o}): use chmod 700")
+    return pasta
+
+
+PASTA_CACHE_PADRAO = pasta_temporaria_do_usuario("corretor-acafe-cache")
+LIMITE_CACHE_PADRAO = 512 * 1024 * 1024
+
+SUFIXO_TURMA = ".turma"
+SUFIXO_BOLETINS = ".boletins"
+SUFIXO_BASE = ".base"
+SUFIXOS = (SUFIXO_TURMA, SUFIXO_BOLETINS, SUFIXO_BASE)
+
+
+def _tamanho(dados):
+    """Tamanho de bytes ou de um arquivo aberto"""
+    if hasattr(dados, "seek"):
+        return dados.seek(0, os.SEEK_END)
+    return len(dados)
+
+
+def _gravar_atomicamente(caminho, dados):
+    """Grava num temporário da mesma pasta e troca: leitores nunca veem arquivo pela metade
+
+    `dados` são bytes ou um arquivo aberto, copiado desde o início sem ir todo para a memória.
+    """
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix=".tmp")
+    try:
+        with os.fdopen(descritor, "wb") as arquivo:
+            if hasattr(dados, "read"):
+                dados.seek(0)
+                shutil.copyfileobj(dados, arquivo)
+            else:
+                arquivo.write(dados)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+class CacheResultados:
+    """Resultados por hash de conteúdo, com limite de tamanho total (LRU)"""
+
+    def __init__(self, pasta=None, limite_bytes=None):
+        self.pasta = pasta or os.environ.get("CORRETOR_CACHE_DIR") or PASTA_CACHE_PADRAO
+        if limite_bytes is None:
+            limite_mb = os.environ.get("CORRETOR_CACHE_MB")
+            limite_bytes = int(limite_mb) * 1024 * 1024 if limite_mb else LIMITE_CACHE_PADRAO
+        self.limite_bytes = limite_bytes
+        preparar_pasta_privada(self.pasta)
+
+    def chave(self, conteudo, **opcoes):
+        """Hash dos bytes enviados + versão dos resultados + opções que mudam a saída"""
+        resumo = hashlib.sha256(conteudo)
+        resumo.update(VERSAO_RESULTADOS.encode())
+        resumo.update(json.dumps(opcoes, sort_keys=True, default=str).encode())
+        return resumo.hexdigest()
+
+    def _caminho(self, chave, sufixo):
+        return os.path.join(self.pasta, chave + sufixo)
+
+    def abrir(self, chave):
+        """(turma, caminho do arquivo de boletins) ou None, sem ler os boletins para a memória"""
+        caminho_turma = self._caminho(chave, SUFIXO_TURMA)
+        caminho_boletins = self._caminho(chave, SUFIXO_BOLETINS)
+        if not os.path.exists(caminho_boletins):
+            return None
+        try:
+            with open(caminho_turma, "rb") as arquivo:
+                turma = pickle.load(arquivo)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Entrada ilegível (versão antiga do pandas, arquivo truncado): descarta
+            self.remover(chave)
+            return None
+
+        # Marca o uso para o LRU
+        for caminho in (caminho_turma, caminho_boletins):
+            try:
+                os.utime(caminho)
+            except OSError:
+                pass
+        return turma, caminho_boletins
+
+    def carregar(self, chave):
+        """(turma, bytes dos boletins) ou None se a entrada não existir / estiver corrompida"""
+        entrada = self.abrir(chave)
+        if entrada is None:
+            return None
+        turma, caminho_boletins = entrada
+        try:
+            with open(caminho_boletins, "rb") as arquivo:
+                return turma, arquivo.read()
+        except FileNotFoundError:
+            return None
+
+    def copiar(self, chave, destino):
+        """Copia os boletins da entrada para o caminho `destino` e devolve a turma (ou None)"""
+        entrada = self.abrir(chave)
+        if entrada is None:
+            return None
+        turma, caminho_boletins = entrada
+        try:
+            shutil.copyfile(caminho_boletins, destino)
+        except FileNotFoundError:
+            return None
+        return turma
+
+    def guardar(self, chave, turma, boletins):
+        """Grava a entrada e apaga as mais antigas se o cache passar do limite
+
+        `boletins` são bytes ou o arquivo aberto onde os boletins foram gravados.
+        """
+        if _tamanho(boletins) > self.limite_bytes:
+            return
+        # Boletins primeiro: a entrada só conta como existente quando a turma aparece
+        _gravar_atomicamente(self._caminho(chave, SUFIXO_BOLETINS), boletins)
+        _gravar_atomicamente(self._caminho(chave, SUFIXO_TURMA),
+                             pickle.dumps(turma, protocol=pickle.HIGHEST_PROTOCOL))
+        self.podar()
+
+    def guardar_base(self, chave_base, chave_resultado, registro):
+        """Liga `chave_base` (hash das respostas) ao resultado `chave_resultado` e seu registro"""
+        _gravar_atomicamente(self._caminho(chave_base, SUFIXO_BASE),
+                             pickle.dumps((chave_resultado, registro), protocol=pickle.HIGHEST_PROTOCOL))
+        self.podar()
+
+    def carregar_base(self, chave_base):
+        """(registro, turma, caminho dos boletins) do último resultado dessas respostas, ou None"""
+        caminho = self._caminho(chave_base, SUFIXO_BASE)
+        try:
+            with open(caminho, "rb") as arquivo:
+                chave_resultado, registro = pickle.load(arquivo)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self.remover(chave_base)
+            return None
+
+        resultado = self.abrir(chave_resultado)
+        if resultado is None:
+            # O resultado já foi descartado pelo LRU
+            return None
+        try:
+            os.utime(caminho)
+        except OSError:
+            pass
+        turma, boletins = resultado
+        return registro, turma, boletins
+
+    def remover(self, chave):
+        for sufixo in SUFIXOS:
+            try:
+                os.unlink(self._caminho(chave, sufixo))
+            except FileNotFoundError:
+                pass
+
+    def entradas(self):
+        """[(último uso, tamanho, chave)] das entradas gravadas"""
+        tamanhos = {}
+        usos = {}
+        with os.scandir(self.pasta) as itens:
+            for item in itens:
+                chave, sufixo = os.path.splitext(item.name)
+                if sufixo not in SUFIXOS:
+                    continue
+                try:
+                    info = item.stat()
+                except FileNotFoundError:
+                    continue
+                tamanhos[chave] = tamanhos.get(chave, 0) + info.st_size
+                usos[chave] = max(usos.get(chave, 0), info.st_mtime)
+        return [(usos[chave], tamanhos[chave], chave) for chave in tamanhos]
+
+    def podar(self):
+        """Apaga as entradas usadas há mais tempo até caber no limite"""
+        entradas = sorted(self.entradas())
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, chave in entradas:
+            if total <= self.limite_bytes:
+                break
+            self.remover(chave)
+            total -= tamanho
@@ -0,0 +1,313 @@
+"""Linha de comando: correção e boletins sem navegador
+
+    python -m corretor grade planilha.xlsx --out boletins.zip --workers 8
+    python -m corretor grade planilha.xlsx --out criciuma.zip --sede CRICIÚMA
+    python -m corretor template
+    python -m corretor partida
+    python -m corretor bench --alunos 100 1000 --out benchmark.json
+    python -m corretor perfil planilha.xlsx --aluno 0 --out boletim.prof
+
+Roda a mesma validação, correção, ranking e geração de boletins do app,
+mostra o tempo de cada etapa e termina com um código de saída útil no cron:
+0 tudo certo, 1 planilha inválida ou algum boletim com erro, 2 uso incorreto.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from corretor.analise_itens import planilha_analise_itens
+from corretor.benchmark import ALUNOS_PADRAO, comparar, executar, resumo
+from corretor.boletins import (
+    FORMATO_GRAFICOS_PADRAO,
+    FORMATOS_GRAFICOS,
+    SAIDA_SOB_DEMANDA,
+    SAIDAS_BOLETINS,
+    perfilar_boletim,
+    processos_padrao,
+)
+from corretor.logos import LOGOS_PADRAO, preparar_logos_pdf
+from corretor.pipeline import (
+    Cronometro,
+    ErroPlanilha,
+    contexto_boletins,
+    corrigir_turma,
+    filtrar_sedes,
+    ler_planilha,
+    processar_arquivo,
+    validar_planilha,
+)
+from corretor.ranking import METODO_RANKING_PADRAO, METODOS_RANKING
+from corretor.template import TEMPLATE_PRONTO, montar_template
+
+# Módulos importados quando o app abre, antes de qualquer envio
+MODULOS_PARTIDA = (
+    "streamlit",
+    "corretor.analise_itens",
+    "corretor.cache",
+    "corretor.boletins",
+    "corretor.logos",
+    "corretor.pipeline",
+    "corretor.template",
+    "corretor.trabalhos",
+)
+# Pesados, só podem entrar ao gerar boletins ou montar o template
+MODULOS_PROIBIDOS_PARTIDA = ("matplotlib", "fpdf", "openpyxl", "seaborn")
+LIMITE_PARTIDA_S = 2.0
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m corretor",
+        description="Corretor ACAFE - Colégio Fleming (sem interface)"
+    )
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    grade = comandos.add_parser("grade", help="Corrige a planilha e gera os boletins")
+    grade.add_argument("planilha", help="Arquivo .xlsx com as abas RESPOSTAS e GABARITO")
+    grade.add_argument("--out", "-o", required=True,
+                       help="Arquivo de saída: ZIP com um PDF por aluno ou, terminando em .pdf, PDF único")
+    grade.add_argument("--workers", "-w", type=int, default=processos_padrao(),
+                       help="Processos paralelos para os boletins (padrão: número de CPUs)")
+    grade.add_argument("--ranking", choices=list(METODOS_RANKING), default=METODO_RANKING_PADRAO,
+                       help="Critério de empate no ranking")
+    grade.add_argument("--graficos", choices=list(FORMATOS_GRAFICOS), default=FORMATO_GRAFICOS_PADRAO,
+                       help="Como os gráficos entram no PDF")
+    grade.add_argument("--saida", choices=[saida for saida in SAIDAS_BOLETINS if saida != SAIDA_SOB_DEMANDA],
+                       help="Formato de entrega (padrão: pela extensão de --out)")
+    grade.add_argument("--sede", action="append", dest="sedes", metavar="SEDE",
+                       help="Gera só os boletins desta sede (pode repetir); médias e rankings seguem a turma toda")
+    grade.add_argument("--itens",
+                       help="Planilha da análise de itens (padrão: ao lado de --out, terminando em _itens.xlsx)")
+    grade.add_argument("--sem-itens", action="store_true", help="Não grava a análise de itens")
+    grade.add_argument("--logo-acafe", default=LOGOS_PADRAO["acafe"], help="Logo ACAFE do cabeçalho")
+    grade.add_argument("--logo-fleming", default=LOGOS_PADRAO["fleming"], help="Logo Fleming do cabeçalho")
+    grade.add_argument("--quiet", "-q", action="store_true", help="Não mostra o progresso por aluno")
+
+    template = comandos.add_parser("template", help="Grava o template Excel pronto (rode no build da imagem)")
+    template.add_argument("--out", "-o", default=TEMPLATE_PRONTO, help="Arquivo de saída (padrão: %(default)s)")
+
+    partida = comandos.add_parser("partida", help="Mede o tempo de importação do app e falha acima do limite")
+    partida.add_argument("--limite", type=float, default=LIMITE_PARTIDA_S,
+                         help="Tempo máximo de importação em segundos (padrão: %(default)s)")
+
+    bench = comandos.add_parser("bench", help="Mede cada etapa com planilhas sintéticas e grava os tempos em JSON")
+    bench.add_argument("--alunos", type=int, nargs="+", default=list(ALUNOS_PADRAO), metavar="N",
+                       help="Tamanhos da turma a medir (padrão: %(default)s)")
+    bench.add_argument("--questoes", type=int, default=70, help="Questões por prova (padrão: %(default)s)")
+    bench.add_argument("--disciplinas", type=int, default=7, help="Disciplinas (padrão: %(default)s)")
+    bench.add_argument("--sedes", type=int, default=2, help="Sedes (padrão: %(default)s)")
+    bench.add_argument("--sem-linguas", action="store_true", help="Sem questões de Inglês/Espanhol")
+    bench.add_argument("--semente", type=int, default=0, help="Semente das respostas sorteadas")
+    bench.add_argument("--workers", "-w", type=int, default=processos_padrao(),
+                       help="Processos paralelos para os boletins (padrão: número de CPUs)")
+    bench.add_argument("--graficos", choices=list(FORMATOS_GRAFICOS), default=FORMATO_GRAFICOS_PADRAO,
+                       help="Como os gráficos entram no PDF")
+    bench.add_argument("--max-boletins", type=int,
+                       help="Gera boletins só dos primeiros N alunos (a correção é sempre da turma toda)")
+    bench.add_argument("--out", "-o", default="benchmark.json", help="JSON com os resultados (padrão: %(default)s)")
+    bench.add_argument("--comparar", metavar="JSON", help="Resultado anterior para comparar etapa a etapa")
+
+    perfil = comandos.add_parser("perfil", help="Gera um único boletim sob o cProfile")
+    perfil.add_argument("planilha", help="Arquivo .xlsx com as abas RESPOSTAS e GABARITO")
+    perfil.add_argument("--aluno", type=int, default=0, help="Linha do aluno na aba RESPOSTAS, a partir de 0")
+    perfil.add_argument("--out", "-o", default="boletim.prof",
+                        help="Estatísticas do cProfile, para snakeviz ou pstats (padrão: %(default)s)")
+    perfil.add_argument("--graficos", choices=list(FORMATOS_GRAFICOS), default=FORMATO_GRAFICOS_PADRAO,
+                        help="Como os gráficos entram no PDF")
+    perfil.add_argument("--ranking", choices=list(METODOS_RANKING), default=METODO_RANKING_PADRAO,
+                        help="Critério de empate no ranking (use o mesmo do grade para a mesma posição)")
+    perfil.add_argument("--linhas", type=int, default=30, help="Funções mostradas no resumo (padrão: %(default)s)")
+    return parser
+
+
+def _gravar_atomicamente(caminho, escrever):
+    """Escreve num temporário da mesma pasta e troca no fim: nunca deixa arquivo pela metade"""
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    descritor, temporario = tempfile.mkstemp(dir=pasta, prefix=".corretor-", suffix=".tmp")
+    try:
+        with os.fdopen(descritor, "w+b") as destino:
+            resultado = escrever(destino)
+        # mkstemp cria com 0600; o arquivo final segue a umask, como um arquivo comum
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temporario, 0o666 & ~umask)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+    return resultado
+
+
+def caminho_itens(saida):
+    """boletins.zip -> boletins_itens.xlsx, na mesma pasta"""
+    raiz, _ = os.path.splitext(saida)
+    return f"{raiz}_itens.xlsx"
+
+
+def comando_grade(args):
+    saida = args.saida or ("pdf_unico" if args.out.lower().endswith(".pdf") else "zip")
+    cronometro = Cronometro()
+
+    def ao_gerar(i, resultado):
+        for aviso in resultado.avisos:
+            print(aviso, file=sys.stderr)
+        if not args.quiet:
+            print(f"📄 {resultado.nome}", file=sys.stderr)
+
+    with cronometro.etapa("Logos"):
+        logos = preparar_logos_pdf({'acafe': args.logo_acafe, 'fleming': args.logo_fleming})
+
+    try:
+        turma, gravados = _gravar_atomicamente(args.out, lambda destino: processar_arquivo(
+            args.planilha, destino,
+            logos=logos,
+            metodo_ranking=args.ranking,
+            formato_graficos=args.graficos,
+            saida=saida,
+            processos=max(1, args.workers),
+            ao_gerar=ao_gerar,
+            cronometro=cronometro,
+            sedes=args.sedes
+        ))
+    except ErroPlanilha as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    esperados = len(filtrar_sedes(turma.tarefas(), args.sedes))
+    print(f"{gravados}/{esperados} boletins gravados em {args.out} "
+          f"(média da turma {turma.media_turma:.1f}%)")
+    if turma.varias_sedes:
+        print(turma.sedes.tabela()[["Sede", "Alunos", "Média (%)"]].to_string(index=False))
+
+    if not args.sem_itens:
+        destino_itens = args.itens or caminho_itens(args.out)
+        with cronometro.etapa("Planilha de itens"):
+            _gravar_atomicamente(destino_itens,
+                                 lambda destino: destino.write(planilha_analise_itens(turma.itens)))
+        revisar = int(turma.itens.revisar.sum())
+        print(f"Análise de itens em {destino_itens}"
+              + (f" ({revisar} questão(ões) para revisar)" if revisar else ""))
+
+    print(cronometro.resumo())
+    if turma.total_alunos:
+        print(f"{turma.total_alunos / cronometro.total:.1f} alunos/s")
+
+    return 0 if gravados == esperados else 1
+
+
+def comando_template(args):
+    _gravar_atomicamente(args.out, lambda destino: destino.write(montar_template()))
+    print(f"Template gravado em {args.out}")
+    return 0
+
+
+def medir_importacoes(modulos):
+    """Importa `modulos` num processo novo com `-X importtime`
+
+    Devolve {módulo de primeiro nível: segundos acumulados} e o conjunto de
+    todos os módulos carregados, inclusive os importados por outros.
+    """
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modulos)],
+        cwd=raiz, capture_output=True, text=True, check=True
+    )
+    tempos = {}
+    carregados = set()
+    for linha in processo.stderr.splitlines():
+        # "import time:  próprio |  acumulado | nome", indentado conforme a profundidade
+        if not linha.startswith("import time:"):
+            continue
+        _, acumulado, nome = linha.split("|")
+        if not acumulado.strip().isdigit():
+            continue
+        carregados.add(nome.strip())
+        if not nome.startswith("  "):
+            tempos[nome.strip()] = int(acumulado) / 1e6
+    return tempos, carregados
+
+
+def comando_partida(args):
+    tempos, carregados = medir_importacoes(MODULOS_PARTIDA)
+    total = sum(tempos.values())
+    for nome, segundos in sorted(tempos.items(), key=lambda item: -item[1])[:10]:
+        print(f"{segundos * 1000:8.0f} ms  {nome}")
+    print(f"{total * 1000:8.0f} ms  total (limite {args.limite * 1000:.0f} ms)")
+
+    pesados = [nome for nome in MODULOS_PROIBIDOS_PARTIDA if nome in carregados]
+    if pesados:
+        print(f"Importados na partida: {', '.join(pesados)}", file=sys.stderr)
+    if total > args.limite:
+        print("Tempo de importação acima do limite", file=sys.stderr)
+    return 1 if pesados or total > args.limite else 0
+
+
+def comando_bench(args):
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            anterior = json.load(arquivo)
+
+    resultado = executar(
+        tamanhos=args.alunos,
+        questoes=args.questoes,
+        disciplinas=args.disciplinas,
+        sedes=args.sedes,
+        linguas=not args.sem_linguas,
+        semente=args.semente,
+        processos=max(1, args.workers),
+        formato_graficos=args.graficos,
+        max_boletins=args.max_boletins,
+        ao_medir=lambda execucao: print(resumo(execucao), flush=True)
+    )
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    _gravar_atomicamente(args.out, lambda destino: destino.write(texto.encode("utf-8")))
+    print(f"Resultados em {args.out}")
+    if anterior:
+        print(comparar(resultado, anterior))
+    return 0
+
+
+def comando_perfil(args):
+    try:
+        respostas, gabarito, _ = validar_planilha(ler_planilha(args.planilha))
+    except ErroPlanilha as e:
+        print(e, file=sys.stderr)
+        return 1
+    turma = corrigir_turma(respostas, gabarito, args.ranking)
+    tarefas = turma.tarefas()
+    if not 0 <= args.aluno < len(tarefas):
+        print(f"--aluno deve estar entre 0 e {len(tarefas) - 1}", file=sys.stderr)
+        return 2
+
+    contexto = contexto_boletins(turma, preparar_logos_pdf(LOGOS_PADRAO), args.graficos)
+    resultado, dados, texto = perfilar_boletim(contexto, tarefas[args.aluno], args.linhas)
+    _gravar_atomicamente(args.out, lambda destino: destino.write(dados))
+
+    # Fases do boletim (medidas sob o profiler, então mais lentas que o normal)
+    fases = Cronometro()
+    fases.somar(resultado.tempos)
+    print(texto)
+    print(fases.resumo())
+    print(f"Perfil do boletim de {resultado.nome} em {args.out}")
+    return 0
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    if args.comando == "grade":
+        return comando_grade(args)
+    if args.comando == "template":
+        return comando_template(args)
+    if args.comando == "partida":
+        return comando_partida(args)
+    if args.comando == "bench":
+        return comando_bench(args)
+    if args.comando == "perfil":
+        return comando_perfil(args)
+    return 2
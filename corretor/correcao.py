@@ -0,0 +1,353 @@
+"""Motor de correção matricial do simulado
+
+As respostas dos alunos viram uma matriz compacta de códigos uint8
+(A-E -> 0-4, em branco/inválida -> CODIGO_INVALIDO) e o gabarito vira um
+vetor de códigos. A correção inteira é uma única comparação com broadcast;
+totais por aluno, por disciplina e taxas de acerto por questão saem de
+reduções sobre a matriz de acertos.
+
+O gabarito pode trazer as colunas opcionais `Peso` (valor da questão na
+nota, padrão 1) e `Anulada` (todos recebem o acerto). A nota ponderada é
+um produto matriz-vetor dos acertos pelos pesos.
+
+Inglês e Espanhol podem usar os mesmos números de questão: cada língua vira
+uma trilha e o gabarito é indexado por (questão, trilha). Cada coluna da
+matriz é um item do gabarito; o aluno só é corrigido nos itens comuns e
+nos da sua trilha (uma máscara sobre a mesma comparação).
+"""
+
+import unicodedata
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+# --------------------------
+# CODIFICAÇÃO
+# --------------------------
+
+ALTERNATIVAS = ["A", "B", "C", "D", "E"]
+CODIGO_INVALIDO = 255  # Em branco, rasurada ou fora de A-E
+
+
+def coluna_questao(questao):
+    """Nome da coluna da aba RESPOSTAS para o número da questão"""
+    return f"Questão {int(questao):02d}"
+
+
+def categorizar_respostas(valores):
+    """Valores soltos como categórica A-E; em branco ou inválida vira NaN"""
+    textos = pd.Series(valores, dtype=object).astype(str).str.strip().str.upper()
+    return pd.Categorical(textos, categories=ALTERNATIVAS)
+
+
+def _codificar_textos(valores):
+    """Converte valores soltos em códigos uint8 - uma única passada de strings"""
+    # Categorias fora de A-E recebem código -1, que vira 255 no uint8
+    return categorizar_respostas(valores).codes.astype(np.uint8)
+
+
+def _categorizada(coluna):
+    """A coluna já chegou como categórica A-E (leitura rápida da planilha)?"""
+    return isinstance(coluna.dtype, pd.CategoricalDtype) and list(coluna.cat.categories) == ALTERNATIVAS
+
+
+def codificar_respostas(df_respostas, questoes):
+    """Monta a matriz N x Q de códigos das respostas dos alunos
+
+    Números repetidos (itens de trilhas diferentes) repetem a mesma coluna,
+    codificada uma única vez.
+    """
+    unicas, posicoes = np.unique(np.asarray(questoes, dtype=int), return_inverse=True)
+    if len(unicas) < len(questoes):
+        return _codificar_colunas(df_respostas, unicas)[:, posicoes]
+    return _codificar_colunas(df_respostas, questoes)
+
+
+def _codificar_colunas(df_respostas, questoes):
+    n_alunos = len(df_respostas)
+    matriz = np.full((n_alunos, len(questoes)), CODIGO_INVALIDO, dtype=np.uint8)
+
+    # Questões sem coluna na planilha ficam inteiras como inválidas
+    presentes = [j for j, q in enumerate(questoes) if coluna_questao(q) in df_respostas.columns]
+    if presentes and n_alunos > 0:
+        colunas = df_respostas[[coluna_questao(questoes[j]) for j in presentes]]
+        if all(_categorizada(colunas[nome]) for nome in colunas.columns):
+            # Códigos prontos: -1 (NaN) vira 255 no uint8
+            matriz[:, presentes] = np.column_stack(
+                [colunas[nome].cat.codes.to_numpy() for nome in colunas.columns]).astype(np.uint8)
+        else:
+            bloco = colunas.to_numpy(dtype=object)
+            matriz[:, presentes] = _codificar_textos(bloco.ravel()).reshape(n_alunos, len(presentes))
+
+    return matriz
+
+
+def _por_item(gabarito, trilhas, colunas):
+    """Agrupa valores por linha do gabarito em itens (questão, trilha); repetidos mantêm o último"""
+    itens = pd.MultiIndex.from_arrays([gabarito["Questão"].astype(int).to_numpy(),
+                                       trilhas_linhas(gabarito, trilhas)])
+    return pd.DataFrame(colunas, index=itens).groupby(level=[0, 1], sort=False).last()
+
+
+def codificar_gabarito(gabarito, trilhas=()):
+    """Retorna (números das questões, vetor de códigos, trilha de cada item)
+
+    Cada item é um par (questão, trilha), na ordem do gabarito; fora das
+    trilhas de língua a trilha é SEM_TRILHA. Itens repetidos mantêm a última
+    resposta informada.
+    """
+    codigos = _codificar_textos(gabarito["Resposta"].to_numpy(dtype=object))
+    chave = _por_item(gabarito, trilhas, {"codigo": codigos})
+    return (chave.index.get_level_values(0).to_numpy(dtype=int),
+            chave["codigo"].to_numpy(dtype=np.uint8),
+            chave.index.get_level_values(1).to_numpy(dtype=np.int8))
+
+
+# --------------------------
+# TRILHAS DE LÍNGUA
+# --------------------------
+
+LINGUAS_ESTRANGEIRAS = ['Inglês', 'Espanhol', 'Ingles', 'Espanol']
+COLUNAS_LINGUA = ["Língua", "Lingua", "Idioma", "Língua Estrangeira"]
+SEM_TRILHA = -1
+
+
+def _sem_acentos(texto):
+    normalizado = unicodedata.normalize("NFKD", str(texto).strip().casefold())
+    return "".join(c for c in normalizado if not unicodedata.combining(c))
+
+
+def trilhas_gabarito(gabarito):
+    """Línguas do gabarito que dividem números de questão: cada aluno faz só uma
+
+    Sem números repetidos entre as línguas não há trilhas (todos fazem tudo).
+    """
+    linguas = gabarito[gabarito["Disciplina"].isin(LINGUAS_ESTRANGEIRAS)]
+    if not linguas["Questão"].duplicated().any():
+        return []
+    return list(linguas["Disciplina"].unique())
+
+
+def trilhas_linhas(gabarito, trilhas):
+    """Trilha de cada linha do gabarito (SEM_TRILHA fora das línguas)"""
+    if not trilhas:
+        return np.full(len(gabarito), SEM_TRILHA, dtype=np.int8)
+    indices = gabarito["Disciplina"].map({disciplina: t for t, disciplina in enumerate(trilhas)})
+    return indices.fillna(SEM_TRILHA).to_numpy(dtype=np.int8)
+
+
+def coluna_lingua(df_respostas):
+    """Nome da coluna da aba RESPOSTAS com a língua escolhida, ou None"""
+    return next((coluna for coluna in COLUNAS_LINGUA if coluna in df_respostas.columns), None)
+
+
+def escolher_trilhas(df_respostas, trilhas, acertos, trilhas_itens):
+    """Trilha de cada aluno (N,)
+
+    Vale a coluna Língua da aba RESPOSTAS ('Inglês', 'ingles', 'ESP'...).
+    Sem a coluna, em branco ou com valor desconhecido, fica a trilha em que o
+    aluno mais acertou (empate: a primeira do gabarito).
+    """
+    acertos_trilhas = np.column_stack(
+        [acertos[:, trilhas_itens == t].sum(axis=1) for t in range(len(trilhas))])
+    escolhidas = np.argmax(acertos_trilhas, axis=1)
+
+    coluna = coluna_lingua(df_respostas)
+    if coluna is not None:
+        # Compara pelas três primeiras letras sem acento: 'Inglês', 'Ingles', 'ING'
+        prefixos = {_sem_acentos(nome)[:3]: t for t, nome in enumerate(trilhas)}
+        informadas = (df_respostas[coluna].reset_index(drop=True)
+                      .map(lambda valor: prefixos.get(_sem_acentos(valor)[:3]) if pd.notna(valor) else None))
+        informadas = pd.to_numeric(informadas, errors="coerce").to_numpy()
+        escolhidas = np.where(np.isnan(informadas), escolhidas, informadas)
+
+    return escolhidas.astype(np.int8)
+
+
+# --------------------------
+# PESOS E ANULAÇÕES
+# --------------------------
+
+COLUNA_PESO = "Peso"
+COLUNA_ANULADA = "Anulada"
+VALORES_ANULADA = {"SIM", "S", "X", "ANULADA", "TRUE", "VERDADEIRO", "1"}
+
+
+def marcar_anuladas(valores):
+    """Vetor bool a partir da coluna Anulada: 'Sim', 'S', 'X', 1... anulam; vazio não"""
+    textos = pd.Series(valores, dtype=object).fillna("").astype(str).str.strip().str.upper()
+    # 1.0 vindo do Excel como número
+    textos = textos.str.replace(r"\.0+$", "", regex=True)
+    return textos.isin(VALORES_ANULADA).to_numpy()
+
+
+def converter_pesos(valores):
+    """Pesos numéricos (aceita vírgula decimal); vazio vale 1, texto inválido vira NaN"""
+    serie = pd.Series(valores, dtype=object)
+    textos = serie.astype(str).str.strip()
+    vazios = serie.isna() | (textos == "")
+    pesos = pd.to_numeric(textos.str.replace(",", ".", regex=False), errors="coerce")
+    return pesos.mask(vazios, 1.0).to_numpy(dtype=float)
+
+
+def pesos_gabarito(gabarito, trilhas=()):
+    """(pesos, anuladas) por item, na ordem de codificar_gabarito
+
+    Sem as colunas, peso 1 e nenhuma anulada.
+    """
+    n = len(gabarito)
+    pesos = converter_pesos(gabarito[COLUNA_PESO]) if COLUNA_PESO in gabarito.columns else np.ones(n)
+    anuladas = (marcar_anuladas(gabarito[COLUNA_ANULADA]) if COLUNA_ANULADA in gabarito.columns
+                else np.zeros(n, dtype=bool))
+
+    por_item = _por_item(gabarito, trilhas, {"peso": pesos, "anulada": anuladas})
+    return por_item["peso"].to_numpy(dtype=float), por_item["anulada"].to_numpy(dtype=bool)
+
+
+# --------------------------
+# RESULTADO DA CORREÇÃO
+# --------------------------
+
+@dataclass
+class Correcao:
+    """Resultado da correção em formato matricial"""
+    questoes: np.ndarray   # (Q,) números das questões, na ordem das colunas
+    respostas: np.ndarray  # (N, Q) uint8 com os códigos marcados
+    gabarito: np.ndarray   # (Q,) uint8 com os códigos corretos
+    acertos: np.ndarray    # (N, Q) bool, anuladas contam como acerto; itens de outra trilha, não
+    pesos: np.ndarray = field(default=None)          # (Q,) float, padrão 1
+    anuladas: np.ndarray = field(default=None)       # (Q,) bool
+    trilhas: np.ndarray = field(default=None)        # (Q,) int8, trilha do item ou SEM_TRILHA
+    trilha_alunos: np.ndarray = field(default=None)  # (N,) int8, trilha de cada aluno
+    nomes_trilhas: list = field(default_factory=list)
+
+    def __post_init__(self):
+        if self.pesos is None:
+            self.pesos = np.ones(len(self.questoes))
+        if self.anuladas is None:
+            self.anuladas = np.zeros(len(self.questoes), dtype=bool)
+        if self.trilhas is None:
+            self.trilhas = np.full(len(self.questoes), SEM_TRILHA, dtype=np.int8)
+        if self.trilha_alunos is None:
+            self.trilha_alunos = np.full(len(self.acertos), SEM_TRILHA, dtype=np.int8)
+
+    @property
+    def aplicaveis(self):
+        """(N, Q) bool: item comum ou da trilha do aluno"""
+        return ((self.trilhas == SEM_TRILHA)[np.newaxis, :]
+                | (self.trilhas[np.newaxis, :] == self.trilha_alunos[:, np.newaxis]))
+
+    def trilha_disciplina(self, disciplina):
+        """Índice da trilha de uma disciplina, ou SEM_TRILHA"""
+        if disciplina in self.nomes_trilhas:
+            return self.nomes_trilhas.index(disciplina)
+        return SEM_TRILHA
+
+    @property
+    def ponderada(self):
+        """Algum peso diferente de 1?"""
+        return bool(np.any(self.pesos != 1))
+
+    @property
+    def total_acertos(self):
+        """Acertos por aluno (N,)"""
+        return self.acertos.sum(axis=1)
+
+    @property
+    def pontos(self):
+        """Pontos por aluno (N,): acertos ponderados pelos pesos das questões"""
+        if not self.ponderada:
+            return self.total_acertos
+        # Arredondado para que somas iguais em ordens diferentes empatem no ranking
+        return np.round(self.acertos @ self.pesos, 9)
+
+    @property
+    def pontos_possiveis(self):
+        """Pontos possíveis por aluno (N,): itens comuns mais os da sua trilha"""
+        comuns = self.pesos[self.trilhas == SEM_TRILHA].sum()
+        por_trilha = np.array([comuns + self.pesos[self.trilhas == t].sum()
+                               for t in range(len(self.nomes_trilhas))] + [comuns])
+        # SEM_TRILHA (-1) pega o último: só os itens comuns
+        return por_trilha[self.trilha_alunos]
+
+    @property
+    def percentual(self):
+        """Fração dos pontos possíveis por aluno (N,), entre 0 e 1"""
+        possiveis = self.pontos_possiveis
+        if len(self.questoes) == 0:
+            return np.zeros(len(self.acertos))
+        return np.divide(self.pontos, possiveis, out=np.zeros(len(possiveis)), where=possiveis > 0)
+
+    @property
+    def taxa_acerto_questoes(self):
+        """Fração dos alunos de cada item que o acertou (Q,)"""
+        if len(self.acertos) == 0:
+            return np.zeros(len(self.questoes))
+        if not self.nomes_trilhas:
+            return self.acertos.mean(axis=0)
+        return self.acertos.sum(axis=0) / np.maximum(self.aplicaveis.sum(axis=0), 1)
+
+    def indices_questoes(self, questoes, trilha=SEM_TRILHA):
+        """Posições das colunas da matriz para uma lista de números de questão de uma trilha"""
+        posicao = {(int(q), int(t)): j for j, (q, t) in enumerate(zip(self.questoes, self.trilhas))}
+        return np.array([posicao[int(q), trilha] for q in questoes if (int(q), trilha) in posicao],
+                        dtype=np.intp)
+
+
+def _comparar(respostas, chave, anuladas):
+    """Matriz de acertos: gabarito inválido não casa com branco; anulada vale para todos"""
+    return ((respostas == chave[np.newaxis, :]) & (chave != CODIGO_INVALIDO)) | anuladas[np.newaxis, :]
+
+
+def corrigir_matriz(df_respostas, gabarito):
+    """Corrige todas as respostas com uma única comparação vetorizada"""
+    trilhas = trilhas_gabarito(gabarito)
+    questoes, chave, trilhas_itens = codificar_gabarito(gabarito, trilhas)
+    pesos, anuladas = pesos_gabarito(gabarito, trilhas)
+    respostas = codificar_respostas(df_respostas, questoes)
+
+    acertos = _comparar(respostas, chave, anuladas)
+
+    trilha_alunos = None
+    if trilhas:
+        # Mesma comparação para as duas línguas; a máscara zera a trilha que o aluno não fez
+        trilha_alunos = escolher_trilhas(df_respostas, trilhas, acertos, trilhas_itens)
+        acertos &= ((trilhas_itens == SEM_TRILHA)[np.newaxis, :]
+                    | (trilhas_itens[np.newaxis, :] == trilha_alunos[:, np.newaxis]))
+
+    return Correcao(questoes=questoes, respostas=respostas, gabarito=chave, acertos=acertos,
+                    pesos=pesos, anuladas=anuladas, trilhas=trilhas_itens,
+                    trilha_alunos=trilha_alunos, nomes_trilhas=trilhas)
+
+
+def recorrigir_gabarito(anterior, df_respostas, gabarito):
+    """Nova correção das mesmas respostas, refazendo só as questões cujo gabarito mudou
+
+    `anterior` é a Correcao dessas respostas com o gabarito antigo. Se o
+    conjunto de itens mudou, ou se mudou um item de língua (que pode mudar a
+    trilha de quem não informou a língua), a correção é refeita inteira.
+    Mudança só de peso não exige comparar nada: basta o novo vetor de pesos.
+    Retorna (Correcao, posições das questões alteradas).
+    """
+    trilhas = trilhas_gabarito(gabarito)
+    questoes, chave, trilhas_itens = codificar_gabarito(gabarito, trilhas)
+    mesmos_itens = (trilhas == anterior.nomes_trilhas and np.array_equal(questoes, anterior.questoes)
+                    and np.array_equal(trilhas_itens, anterior.trilhas))
+    if not mesmos_itens:
+        return corrigir_matriz(df_respostas, gabarito), np.arange(len(questoes))
+
+    pesos, anuladas = pesos_gabarito(gabarito, trilhas)
+    comparar = (chave != anterior.gabarito) | (anuladas != anterior.anuladas)
+    if (comparar & (trilhas_itens != SEM_TRILHA)).any():
+        return corrigir_matriz(df_respostas, gabarito), np.flatnonzero(comparar | (pesos != anterior.pesos))
+    acertos = anterior.acertos.copy()
+    if comparar.any():
+        colunas = np.flatnonzero(comparar)
+        acertos[:, colunas] = _comparar(anterior.respostas[:, colunas], chave[colunas], anuladas[colunas])
+
+    # Só itens comuns foram refeitos: valem para todos, a trilha de cada aluno não muda
+    correcao = Correcao(questoes=questoes, respostas=anterior.respostas, gabarito=chave, acertos=acertos,
+                        pesos=pesos, anuladas=anuladas, trilhas=trilhas_itens,
+                        trilha_alunos=anterior.trilha_alunos, nomes_trilhas=trilhas)
+    return correcao, np.flatnonzero(comparar | (pesos != anterior.pesos))
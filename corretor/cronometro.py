@@ -0,0 +1,135 @@
+"""Medição de cada etapa do processamento: tempo de parede, CPU e memória
+
+Cada etapa guarda uma `Medida` com o tempo de parede, o tempo de CPU da
+thread que a executou (outros trabalhos e sessões do servidor não entram)
+e a memória residente (RSS) do processo ao terminar. Trabalho feito em
+outros processos (o pool dos boletins) não aparece na CPU da thread: entra
+à parte, em `cpu_processos`, com `acrescentar_cpu_processos`. Medidas de
+vários boletins (que podem vir de outros processos) são somadas com `somar`.
+
+Com `rotulos`, cada etapa concluída também vira uma linha de log em JSON
+no logger `corretor.etapas` (por exemplo com o id do trabalho), para ser
+filtrada e agregada fora do app.
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+try:
+    import resource
+except ImportError:  # Windows: sem medida de memória
+    resource = None
+
+logger = logging.getLogger("corretor.etapas")
+
+FORMATO_LOG = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+
+def memoria_rss_mb():
+    """Memória residente atual do processo em MB (no Linux); senão o pico, ou None"""
+    try:
+        with open("/proc/self/statm") as arquivo:
+            paginas = int(arquivo.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return None
+        # ru_maxrss: KiB no Linux, bytes no macOS
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def configurar_log(nivel=None):
+    """Manda os logs do pacote `corretor` para o stderr (nível em CORRETOR_LOG, padrão INFO)"""
+    raiz = logging.getLogger("corretor")
+    if not raiz.handlers:
+        saida = logging.StreamHandler()
+        saida.setFormatter(logging.Formatter(FORMATO_LOG))
+        raiz.addHandler(saida)
+    raiz.setLevel(nivel or os.environ.get("CORRETOR_LOG") or logging.INFO)
+
+
+def log_estruturado(evento, **campos):
+    """Uma linha de log em JSON: {"evento": ..., campos...}"""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"evento": evento, **campos}, ensure_ascii=False, default=str))
+
+
+@dataclass
+class Medida:
+    """Totais de uma etapa (somados se ela rodar mais de uma vez)"""
+    parede: float = 0.0        # segundos
+    cpu: float = 0.0           # segundos de CPU da thread
+    memoria_mb: float = None   # maior RSS visto ao fim da etapa
+    vezes: int = 0
+    cpu_processos: float = 0.0   # segundos de CPU em processos do pool durante a etapa
+
+    def somar(self, outra):
+        self.parede += outra.parede
+        self.cpu += outra.cpu
+        self.cpu_processos += outra.cpu_processos
+        self.vezes += outra.vezes
+        if outra.memoria_mb is not None:
+            self.memoria_mb = max(self.memoria_mb or 0.0, outra.memoria_mb)
+
+
+class Cronometro:
+    """Parede, CPU e memória de cada etapa do processamento, na ordem em que rodaram"""
+
+    def __init__(self, rotulos=None):
+        self.medidas = {}
+        self.rotulos = rotulos
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        inicio_cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            medida = Medida(time.perf_counter() - inicio, time.thread_time() - inicio_cpu, memoria_rss_mb(), 1)
+            total = self.medidas.setdefault(nome, Medida())
+            total.somar(medida)
+            if self.rotulos is not None:
+                log_estruturado("etapa", etapa=nome, parede_s=round(medida.parede, 4),
+                                cpu_s=round(medida.cpu, 4), memoria_mb=round(medida.memoria_mb or 0, 1),
+                                cpu_processos_s=round(total.cpu_processos, 4), **self.rotulos)
+
+    def acrescentar_cpu_processos(self, nome, segundos):
+        """Soma à etapa a CPU gasta por ela em outros processos (ex.: boletins no pool)"""
+        self.medidas.setdefault(nome, Medida()).cpu_processos += segundos
+
+    def somar(self, medidas):
+        """Acrescenta medidas de fora ({etapa: Medida}), por exemplo as de um boletim"""
+        for nome, medida in medidas.items():
+            self.medidas.setdefault(nome, Medida()).somar(medida)
+
+    @property
+    def etapas(self):
+        """{etapa: segundos de parede}"""
+        return {nome: medida.parede for nome, medida in self.medidas.items()}
+
+    @property
+    def total(self):
+        return sum(medida.parede for medida in self.medidas.values())
+
+    def como_dict(self):
+        """{etapa: {parede, cpu, memoria_mb, vezes, cpu_processos}}, pronto para JSON"""
+        return {nome: asdict(medida) for nome, medida in self.medidas.items()}
+
+    def resumo(self):
+        """Tabela de texto com parede, CPU da thread e memória de cada etapa e o total"""
+        largura = max([len(nome) for nome in self.medidas] + [len("Total")])
+        linhas = [
+            f"{nome:<{largura}}  {medida.parede:8.2f} s  CPU {medida.cpu:8.2f} s"
+            + (f"  {medida.memoria_mb:7.0f} MB" if medida.memoria_mb is not None else "")
+            + (f"  + {medida.cpu_processos:.2f} s de CPU nos processos" if medida.cpu_processos else "")
+            for nome, medida in self.medidas.items()
+        ]
+        linhas.append(f"{'Total':<{largura}}  {self.total:8.2f} s")
+        return "\n".join(linhas)
@@ -0,0 +1,130 @@
+"""Resultados por disciplina a partir da matriz de acertos
+
+O índice de disciplinas é montado uma única vez a partir de
+`mapa_disciplinas`: as colunas da matriz são reagrupadas para que cada
+disciplina ocupe um trecho contíguo, e uma soma segmentada
+(`np.add.reduceat`) produz a matriz N x S de acertos de todos os alunos
+de uma só vez.
+
+Com trilhas de língua (Inglês/Espanhol com os mesmos números), cada aluno
+só tem no boletim a língua que fez, e a média de cada língua é a dos alunos
+daquela trilha.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from corretor.correcao import SEM_TRILHA
+
+
+@dataclass
+class IndiceDisciplinas:
+    """Mapeamento disciplina -> trecho contíguo de colunas da matriz de acertos"""
+    disciplinas: list       # (S,) nomes, na ordem do mapa
+    colunas: np.ndarray     # posições das colunas, agrupadas por disciplina
+    inicios: np.ndarray     # (S,) offset de cada disciplina em `colunas`
+    totais: np.ndarray      # (S,) número de questões de cada disciplina
+    trilhas: np.ndarray     # (S,) trilha de língua da disciplina ou SEM_TRILHA
+
+    def __len__(self):
+        return len(self.disciplinas)
+
+
+def construir_indice_disciplinas(correcao, mapa_disciplinas):
+    """Monta o índice de disciplinas para as colunas de uma correção"""
+    disciplinas, trechos, trilhas = [], [], []
+    for disc, questoes in mapa_disciplinas.items():
+        trilha = correcao.trilha_disciplina(disc)
+        indices = correcao.indices_questoes(questoes, trilha)
+        # Disciplina sem nenhuma questão corrigida não entra no boletim
+        if len(indices) == 0:
+            continue
+        disciplinas.append(disc)
+        trechos.append(indices)
+        trilhas.append(trilha)
+
+    totais = np.array([len(t) for t in trechos], dtype=np.intp)
+    inicios = np.concatenate(([0], np.cumsum(totais)[:-1])).astype(np.intp) if trechos else np.zeros(0, dtype=np.intp)
+    colunas = np.concatenate(trechos) if trechos else np.zeros(0, dtype=np.intp)
+
+    return IndiceDisciplinas(disciplinas=disciplinas, colunas=colunas, inicios=inicios, totais=totais,
+                             trilhas=np.array(trilhas, dtype=np.int8))
+
+
+@dataclass
+class BoletimDisciplinas:
+    """Linha de resultados de um aluno, pronta para tabela e gráficos"""
+    disciplinas: list
+    acertos: np.ndarray
+    totais: np.ndarray
+    percentuais: np.ndarray
+    medias: np.ndarray
+    diferencas: np.ndarray
+
+    def linhas(self):
+        """Itera (disciplina, acertos, total, %, média, diferença) para a tabela do PDF"""
+        return zip(self.disciplinas, self.acertos.tolist(), self.totais.tolist(),
+                   self.percentuais.tolist(), self.medias.tolist(), self.diferencas.tolist())
+
+
+@dataclass
+class ResultadoDisciplinas:
+    """Acertos, totais e percentuais por disciplina de todos os alunos"""
+    disciplinas: list
+    acertos: np.ndarray      # (N, S) int
+    totais: np.ndarray       # (S,)
+    percentuais: np.ndarray  # (N, S) arredondado a 0,1
+    medias: np.ndarray       # (S,) média da turma em %, arredondada a 0,1
+    aplicaveis: np.ndarray = None  # (N, S) bool com trilhas: disciplina que o aluno fez
+
+    def aluno(self, i):
+        """Fatia a linha do aluno i - nenhum laço sobre questões"""
+        if self.aplicaveis is None:
+            colunas = slice(None)
+            disciplinas = self.disciplinas
+        else:
+            # Só a língua que o aluno fez
+            colunas = self.aplicaveis[i]
+            disciplinas = [d for d, fez in zip(self.disciplinas, colunas) if fez]
+        return BoletimDisciplinas(
+            disciplinas=disciplinas,
+            acertos=self.acertos[i, colunas],
+            totais=self.totais[colunas],
+            percentuais=self.percentuais[i, colunas],
+            medias=self.medias[colunas],
+            diferencas=np.round(self.percentuais[i, colunas] - self.medias[colunas], 1),
+        )
+
+
+def somar_por_disciplina(acertos, indice):
+    """Soma segmentada N x Q -> N x S sobre as colunas do índice"""
+    if len(indice) == 0:
+        return np.zeros((len(acertos), 0), dtype=np.int32)
+    return np.add.reduceat(acertos[:, indice.colunas], indice.inicios, axis=1, dtype=np.int32)
+
+
+def resultados_disciplinas(correcao, indice):
+    """Calcula acertos, percentuais e médias por disciplina em uma passada vetorizada"""
+    acertos = somar_por_disciplina(correcao.acertos, indice)
+    totais = indice.totais
+
+    # Disciplinas sem questões já ficaram fora do índice, então totais > 0
+    percentuais = np.round(100 * acertos / totais, 1)
+
+    aplicaveis = None
+    participantes = max(len(acertos), 1)
+    if (indice.trilhas != SEM_TRILHA).any():
+        aplicaveis = ((indice.trilhas == SEM_TRILHA)[np.newaxis, :]
+                      | (indice.trilhas[np.newaxis, :] == correcao.trilha_alunos[:, np.newaxis]))
+        participantes = np.maximum(aplicaveis.sum(axis=0), 1)
+    medias = np.round(100 * acertos.sum(axis=0) / (participantes * totais), 1)
+
+    return ResultadoDisciplinas(
+        disciplinas=indice.disciplinas,
+        acertos=acertos,
+        totais=totais,
+        percentuais=percentuais,
+        medias=medias,
+        aplicaveis=aplicaveis,
+    )
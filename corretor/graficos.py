@@ -0,0 +1,324 @@
+"""Gráficos da turma renderizados uma única vez por processamento
+
+O histograma das notas e a curva do ranking são iguais para todos os
+alunos; só mudam a barra destacada, a linha/ponto vermelho e a legenda.
+As camadas estáticas são desenhadas uma vez no canvas Agg e guardadas como
+fundo. Para cada aluno o fundo é restaurado e apenas os artistas de
+destaque são desenhados por cima (blitting).
+
+As barras e o radar do aluno mudam por inteiro, mas a figura não:
+`GraficosAluno` monta figura, eixos, barras, linhas e textos uma vez e,
+para cada aluno, só troca os dados e redesenha. Tudo pela API de objetos
+(`Figure` + canvas Agg), sem o pyplot e seu registro global de figuras.
+"""
+
+from io import BytesIO
+
+import numpy as np
+from matplotlib import rc_context
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+from PIL import Image
+
+# Cores tema ACAFE
+COR_PRINCIPAL = '#2d5a3d'
+COR_SECUNDARIA = '#4a8c6a'
+COR_DESTAQUE = '#6bb77b'
+
+ESTILO_GRAFICOS = {
+    'font.size': 10,
+    'axes.titlesize': 14,
+    'axes.labelsize': 12,
+    'xtick.labelsize': 10,
+    'ytick.labelsize': 10,
+    'legend.fontsize': 12
+}
+
+DPI_GRAFICOS = 150
+MARGEM_RECORTE = 0.1   # polegadas em volta do conteúdo, como o bbox_inches="tight" do savefig
+
+
+def _canvas_em_png(canvas):
+    """PNG em memória (RGB, sem canal alfa: o FPDF lê mais rápido) do que está no canvas"""
+    largura, altura = canvas.get_width_height()
+    imagem = Image.frombuffer("RGBA", (largura, altura), canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+    buffer = BytesIO()
+    imagem.convert("RGB").save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
+
+class _CamadaFixa:
+    """Figura com fundo em cache e artistas de destaque redesenhados por aluno"""
+
+    def __init__(self, figsize):
+        self.fig = Figure(figsize=figsize, dpi=DPI_GRAFICOS, facecolor='white')
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        self.fundo = None
+
+    def congelar(self):
+        """Desenha as camadas estáticas e guarda o fundo"""
+        # Fixa os limites para que os destaques não reescalem os eixos
+        self.ax.set_xlim(self.ax.get_xlim())
+        self.ax.set_ylim(self.ax.get_ylim())
+        self.fig.tight_layout()
+        self.canvas.draw()
+        self.fundo = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def desenhar(self, artistas):
+        """Restaura o fundo, desenha os destaques e devolve o PNG em memória"""
+        self.canvas.restore_region(self.fundo)
+        for artista in artistas:
+            self.ax.draw_artist(artista)
+        return _canvas_em_png(self.canvas)
+
+    def fundo_png(self):
+        """PNG só com as camadas estáticas, sem nenhum destaque"""
+        return self.desenhar([]).getvalue()
+
+    def area_eixos(self):
+        """Área dos eixos em pixels, a partir do canto superior esquerdo: (x, y, largura, altura)"""
+        x0, y0, x1, y1 = self.ax.bbox.extents
+        _, altura = self.canvas.get_width_height()
+        return x0, altura - y1, x1 - x0, y1 - y0
+
+
+class GraficosTurma:
+    """Histograma e ranking da turma, com destaque individual barato"""
+
+    def __init__(self, ranking_df):
+        notas = ranking_df["Percentual"].to_numpy(dtype=float) * 100
+
+        with rc_context(ESTILO_GRAFICOS):
+            self._montar_distribuicao(notas)
+            self._montar_ranking(ranking_df["Posição"].to_numpy(), notas)
+
+    # ----- Distribuição das notas -----
+
+    def _montar_distribuicao(self, notas):
+        camada = _CamadaFixa((12, 7))
+        ax = camada.ax
+
+        _, self.bins, patches = ax.hist(notas, bins=min(12, len(notas)), color=COR_DESTAQUE,
+                                        edgecolor=COR_PRINCIPAL, alpha=0.7, linewidth=1.5)
+
+        ax.set_xlabel("Percentual de Acertos (%)", fontsize=12, fontweight='bold')
+        ax.set_ylabel("Número de Estudantes", fontsize=12, fontweight='bold')
+        ax.set_title("Distribuição das Notas da Turma", fontsize=16, fontweight='bold',
+                     color=COR_PRINCIPAL, pad=20)
+        ax.grid(alpha=0.3)
+
+        # Uma cópia destacada de cada barra, desenhada só para a faixa do aluno
+        self.barras_destaque = []
+        for patch in patches:
+            destaque = Rectangle(patch.get_xy(), patch.get_width(), patch.get_height(),
+                                 color=COR_PRINCIPAL, alpha=0.9, animated=True)
+            ax.add_patch(destaque)
+            self.barras_destaque.append(destaque)
+
+        self.linha_aluno = ax.axvline(notas.mean() if len(notas) else 0, color='red', linewidth=4,
+                                      linestyle='--', alpha=0.8, animated=True)
+        camada.congelar()
+        self.distribuicao = camada
+
+    def histograma(self, nome, percentual):
+        """Renderiza o histograma da turma destacando a faixa do aluno"""
+        ax = self.distribuicao.ax
+        faixas = np.flatnonzero((self.bins[:-1] <= percentual) & (percentual <= self.bins[1:]))
+        artistas = [self.barras_destaque[i] for i in faixas]
+
+        self.linha_aluno.set_xdata([percentual, percentual])
+        self.linha_aluno.set_label(f"{nome} ({percentual:.1f}%)")
+        with rc_context(ESTILO_GRAFICOS):
+            legenda = ax.legend(handles=[self.linha_aluno], fontsize=12)
+        legenda.set_animated(True)
+        artistas += [self.linha_aluno, legenda]
+
+        return self.distribuicao.desenhar(artistas)
+
+    # ----- Ranking -----
+
+    def _montar_ranking(self, posicoes, notas):
+        camada = _CamadaFixa((12, 7))
+        ax = camada.ax
+
+        self.curva_ranking, = ax.plot(posicoes, notas, "o-", color=COR_SECUNDARIA, markersize=8,
+                                      linewidth=3, alpha=0.7, label="Outros alunos")
+        self.top3 = ax.scatter(posicoes[:3], notas[:3], color='gold', s=150, zorder=4,
+                               edgecolor='orange', linewidth=2, alpha=0.8, label="Top 3")
+
+        ax.set_xlabel("Posição no Ranking", fontsize=12, fontweight='bold')
+        ax.set_ylabel("Percentual de Acertos (%)", fontsize=12, fontweight='bold')
+        ax.set_title("Ranking da Turma", fontsize=16, fontweight='bold', color=COR_PRINCIPAL, pad=20)
+        ax.grid(alpha=0.3)
+
+        self.ponto_aluno = ax.scatter([posicoes[0] if len(posicoes) else 0], [notas[0] if len(notas) else 0],
+                                      color='red', s=200, zorder=5, edgecolor='darkred', linewidth=2,
+                                      animated=True)
+        camada.congelar()
+        self.ranking = camada
+
+    def posicao_ranking(self, nome, posicao, percentual):
+        """Renderiza a curva do ranking marcando a posição do aluno"""
+        ax = self.ranking.ax
+
+        self.ponto_aluno.set_offsets([[posicao, percentual]])
+        self.ponto_aluno.set_label(f"{nome} - {posicao}º lugar")
+        with rc_context(ESTILO_GRAFICOS):
+            legenda = ax.legend(handles=[self.curva_ranking, self.ponto_aluno, self.top3], fontsize=12)
+        legenda.set_animated(True)
+
+        return self.ranking.desenhar([self.ponto_aluno, legenda])
+
+
+# --------------------------
+# GRÁFICOS DO ALUNO
+# --------------------------
+
+def _enquadrar(fig, canvas):
+    """Redimensiona a figura para o conteúdo caber com a margem, movendo os eixos junto
+
+    Faz uma vez o que o `bbox_inches="tight"` do savefig faria a cada
+    boletim (que desenha a figura duas vezes).
+    """
+    canvas.draw()
+    caixa = fig.get_tightbbox(canvas.get_renderer())
+    largura_antiga, altura_antiga = fig.get_size_inches()
+    largura = caixa.width + 2 * MARGEM_RECORTE
+    altura = caixa.height + 2 * MARGEM_RECORTE
+    for ax in fig.axes:
+        pos = ax.get_position()
+        ax.set_position([
+            (pos.x0 * largura_antiga - caixa.x0 + MARGEM_RECORTE) / largura,
+            (pos.y0 * altura_antiga - caixa.y0 + MARGEM_RECORTE) / altura,
+            pos.width * largura_antiga / largura,
+            pos.height * altura_antiga / altura,
+        ])
+    fig.set_size_inches(largura, altura)
+
+
+class _FiguraAluno:
+    """Figura reaproveitada entre alunos: os artistas são atualizados e o canvas redesenhado"""
+
+    def __init__(self, figsize, **subplot):
+        self.fig = Figure(figsize=figsize, dpi=DPI_GRAFICOS, facecolor='white')
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(**subplot)
+
+    def png(self):
+        """Desenha e devolve o PNG; se o nome do aluno passar da figura, recorta como o savefig"""
+        self.canvas.draw()
+        renderer = self.canvas.get_renderer()
+        extensoes = [artista.get_window_extent(renderer) for artista in (self.titulo, self.legenda)]
+        if any(e.x0 < 0 or e.x1 > self.fig.bbox.width for e in extensoes):
+            # Nome longo demais para o enquadramento feito na montagem
+            buffer = BytesIO()
+            self.fig.savefig(buffer, format="png", bbox_inches="tight", pad_inches=MARGEM_RECORTE,
+                             facecolor='white')
+            buffer.seek(0)
+            return buffer
+        return _canvas_em_png(self.canvas)
+
+
+class GraficosAluno:
+    """Barras e radar do aluno vs. média da turma, com as figuras montadas uma vez
+
+    Há uma figura de cada tipo por lista de disciplinas (com Inglês e
+    Espanhol, uma por língua), criada no primeiro aluno que a usa.
+    """
+
+    def __init__(self):
+        self._barras = {}
+        self._radares = {}
+
+    # ----- Barras -----
+
+    def _montar_barras(self, disciplinas):
+        figura = _FiguraAluno((14, 8))
+        ax = figura.ax
+        x = np.arange(len(disciplinas))
+        largura = 0.35
+        zeros = np.zeros(len(disciplinas))
+
+        figura.barras_aluno = ax.bar(x - largura/2, zeros, largura, label="Aluno",
+                                     color=COR_PRINCIPAL, alpha=0.8, edgecolor='white', linewidth=1)
+        figura.barras_media = ax.bar(x + largura/2, zeros, largura, label="Média Turma",
+                                     color=COR_SECUNDARIA, alpha=0.7, edgecolor='white', linewidth=1)
+
+        # Valores em cima das barras
+        figura.textos_aluno = [ax.text(i - largura/2, 0, "", ha="center", fontsize=10,
+                                       fontweight='bold', color=COR_PRINCIPAL) for i in x]
+        figura.textos_media = [ax.text(i + largura/2, 0, "", ha="center", fontsize=10,
+                                       color=COR_SECUNDARIA) for i in x]
+
+        ax.set_xticks(x)
+        ax.set_xticklabels(disciplinas, rotation=45, ha='right', fontsize=11)
+        ax.set_ylabel("Percentual de Acertos (%)", fontsize=12, fontweight='bold')
+        figura.titulo = ax.set_title("Desempenho por Disciplina", fontsize=16, fontweight='bold',
+                                     color=COR_PRINCIPAL, pad=20)
+        figura.legenda = ax.legend(fontsize=12)
+        ax.grid(axis='y', alpha=0.3)
+        ax.set_ylim(0, 105)
+        _enquadrar(figura.fig, figura.canvas)
+        return figura
+
+    def barras(self, nome, boletim):
+        """PNG das barras do aluno ao lado das médias da turma, por disciplina"""
+        disciplinas = tuple(boletim.disciplinas)
+        if disciplinas not in self._barras:
+            with rc_context(ESTILO_GRAFICOS):
+                self._barras[disciplinas] = self._montar_barras(disciplinas)
+        figura = self._barras[disciplinas]
+
+        for barras, textos, valores in ((figura.barras_aluno, figura.textos_aluno, boletim.percentuais),
+                                        (figura.barras_media, figura.textos_media, boletim.medias)):
+            for barra, texto, valor in zip(barras, textos, valores):
+                barra.set_height(valor)
+                texto.set_y(valor + 1.5)
+                texto.set_text(f"{valor:.1f}%")
+        figura.legenda.get_texts()[0].set_text(nome)
+        figura.titulo.set_text(f"Desempenho por Disciplina - {nome}")
+        return figura.png()
+
+    # ----- Radar -----
+
+    def _montar_radar(self, disciplinas):
+        figura = _FiguraAluno((8, 8), polar=True)
+        ax = figura.ax
+        angulos = np.linspace(0, 2 * np.pi, len(disciplinas), endpoint=False)
+        figura.angulos = np.append(angulos, angulos[0])
+        zeros = np.zeros(len(figura.angulos))
+
+        figura.linha_aluno, = ax.plot(figura.angulos, zeros, "o-", label="Aluno", linewidth=3,
+                                      color=COR_PRINCIPAL, markersize=8)
+        figura.area_aluno, = ax.fill(figura.angulos, zeros, alpha=0.3, color=COR_PRINCIPAL)
+        figura.linha_media, = ax.plot(figura.angulos, zeros, "s--", label="Média da Turma",
+                                      color=COR_SECUNDARIA, linewidth=2, markersize=6)
+        figura.area_media, = ax.fill(figura.angulos, zeros, alpha=0.1, color=COR_SECUNDARIA)
+        ax.set_thetagrids(np.degrees(angulos), disciplinas, fontsize=10)
+        figura.legenda = ax.legend(loc="upper right", bbox_to_anchor=(1.3, 1.1), fontsize=12)
+        ax.set_ylim(0, 100)
+        ax.grid(True, alpha=0.3)
+        figura.titulo = ax.set_title("Desempenho Radar", fontsize=14, fontweight='bold',
+                                     color=COR_PRINCIPAL, pad=20)
+        _enquadrar(figura.fig, figura.canvas)
+        return figura
+
+    def radar(self, nome, boletim):
+        """PNG do radar do aluno e da média da turma (precisa de 3 disciplinas ou mais)"""
+        disciplinas = tuple(boletim.disciplinas)
+        if disciplinas not in self._radares:
+            with rc_context(ESTILO_GRAFICOS):
+                self._radares[disciplinas] = self._montar_radar(disciplinas)
+        figura = self._radares[disciplinas]
+
+        for linha, area, valores in ((figura.linha_aluno, figura.area_aluno, boletim.percentuais),
+                                     (figura.linha_media, figura.area_media, boletim.medias)):
+            circular = np.append(valores, valores[0])
+            linha.set_data(figura.angulos, circular)
+            area.set_xy(np.column_stack([figura.angulos, circular]))
+        figura.legenda.get_texts()[0].set_text(nome)
+        figura.titulo.set_text(f"Desempenho Radar - {nome}")
+        return figura.png()
@@ -0,0 +1,403 @@
+"""Gráficos desenhados direto no PDF com primitivas do FPDF
+
+Alternativa leve aos PNGs de 150 dpi do matplotlib: barras, histograma e
+ranking viram retângulos, linhas e textos vetoriais dentro da própria
+página. O arquivo fica muito menor e não há rasterização nem compressão
+PNG por aluno. Os dados da turma (faixas do histograma, curva do ranking)
+são calculados uma única vez em `GraficosTurmaVetoriais`.
+
+Quando vários boletins dividem o mesmo documento (PDF único de impressão),
+`GraficosTurmaCompartilhados` grava as camadas da turma como uma imagem
+única por documento e desenha por cima, em vetor, só o destaque do aluno.
+"""
+
+from dataclasses import dataclass
+from io import BytesIO
+
+import numpy as np
+from fpdf.image_parsing import get_img_info
+
+from corretor.graficos import COR_DESTAQUE, COR_PRINCIPAL, COR_SECUNDARIA
+
+# Dimensões em mm (página A4 com 210 mm de largura)
+MARGEM_EIXO_Y = 18
+LARGURA_GRAFICO = 170
+ALTURA_BARRAS = 80
+ALTURA_TURMA = 70
+ESPACO_ROTULOS_X = 22
+LARGURA_FUNDO_TURMA = 140
+
+COR_GRADE = (225, 225, 225)
+COR_EIXO = (60, 60, 60)
+VERMELHO = (220, 30, 30)
+OURO = (255, 205, 0)
+LARANJA = (255, 165, 0)
+
+# Acima disso a curva do ranking é desenhada sem marcador por aluno
+MAX_MARCADORES_RANKING = 60
+
+
+@dataclass
+class GraficoVetorial:
+    """Gráfico pronto para ser desenhado no PDF a partir da altura y"""
+    altura: float       # espaço vertical ocupado, em mm
+    desenhar: object    # função (pdf, y) -> None
+
+
+def _rgb(cor_hex, alpha=1.0):
+    """Cor hex -> RGB, misturada com branco para simular a transparência"""
+    cor_hex = cor_hex.lstrip('#')
+    canais = [int(cor_hex[i:i + 2], 16) for i in (0, 2, 4)]
+    return tuple(round(255 - alpha * (255 - c)) for c in canais)
+
+
+def _marcas(maximo, quantidade=5):
+    """Valores "redondos" para as marcas de um eixo entre 0 e `maximo`"""
+    if maximo <= 0:
+        return [0]
+    passo_bruto = maximo / quantidade
+    base = 10 ** np.floor(np.log10(passo_bruto))
+    passo = next(m * base for m in (1, 2, 5, 10) if m * base >= passo_bruto)
+    return list(np.arange(0, maximo + passo / 2, passo))
+
+
+def _marcas_intervalo(inicio, fim, quantidade=6):
+    """Marcas "redondas" dentro de [inicio, fim]"""
+    amplitude = fim - inicio
+    if amplitude <= 0:
+        return [inicio]
+    marcas = _marcas(amplitude, quantidade)
+    passo = marcas[1] - marcas[0] if len(marcas) > 1 else amplitude
+    primeira = np.ceil(inicio / passo) * passo
+    return [v for v in np.arange(primeira, fim + passo / 2, passo) if inicio <= v <= fim]
+
+
+def _ponto(pdf, cx, cy, diametro, style="F"):
+    """Círculo centrado em (cx, cy) - o FPDF posiciona pelo canto superior"""
+    pdf.ellipse(cx - diametro / 2, cy - diametro / 2, diametro, diametro, style)
+
+
+class _Eixos:
+    """Área de plotagem: converte valores dos dados em coordenadas da página"""
+
+    def __init__(self, pdf, y, altura, xlim, ylim, x=None, largura=None):
+        self.pdf = pdf
+        self.x = (210 - LARGURA_GRAFICO) / 2 + MARGEM_EIXO_Y if x is None else x
+        self.y = y
+        self.largura = LARGURA_GRAFICO - MARGEM_EIXO_Y if largura is None else largura
+        self.altura = altura
+        self.xlim = xlim
+        self.ylim = ylim
+
+    def px(self, valor):
+        x0, x1 = self.xlim
+        return self.x + (valor - x0) / ((x1 - x0) or 1) * self.largura
+
+    def py(self, valor):
+        y0, y1 = self.ylim
+        return self.y + self.altura - (valor - y0) / ((y1 - y0) or 1) * self.altura
+
+    def grade_y(self, marcas, formato="{:.0f}"):
+        pdf = self.pdf
+        pdf.set_font("Helvetica", "", 7)
+        pdf.set_text_color(*COR_EIXO)
+        pdf.set_draw_color(*COR_GRADE)
+        pdf.set_line_width(0.2)
+        for valor in marcas:
+            y = self.py(valor)
+            pdf.line(self.x, y, self.x + self.largura, y)
+            texto = formato.format(valor)
+            pdf.text(self.x - pdf.get_string_width(texto) - 1.5, y + 1, texto)
+
+    def grade_x(self, marcas, formato="{:.0f}"):
+        pdf = self.pdf
+        pdf.set_font("Helvetica", "", 7)
+        pdf.set_text_color(*COR_EIXO)
+        pdf.set_draw_color(*COR_GRADE)
+        pdf.set_line_width(0.2)
+        base = self.y + self.altura
+        for valor in marcas:
+            x = self.px(valor)
+            pdf.line(x, self.y, x, base)
+            texto = formato.format(valor)
+            pdf.text(x - pdf.get_string_width(texto) / 2, base + 4, texto)
+
+    def moldura(self):
+        self.pdf.set_draw_color(*COR_EIXO)
+        self.pdf.set_line_width(0.3)
+        self.pdf.rect(self.x, self.y, self.largura, self.altura)
+
+    def rotulos(self, rotulo_x, rotulo_y, espaco_x=9):
+        pdf = self.pdf
+        pdf.set_font("Helvetica", "B", 8)
+        pdf.set_text_color(0, 0, 0)
+        if rotulo_x:
+            largura = pdf.get_string_width(rotulo_x)
+            pdf.text(self.x + (self.largura - largura) / 2, self.y + self.altura + espaco_x, rotulo_x)
+        if rotulo_y:
+            largura = pdf.get_string_width(rotulo_y)
+            x = self.x - MARGEM_EIXO_Y + 4
+            y = self.y + (self.altura + largura) / 2
+            with pdf.rotation(90, x, y):
+                pdf.text(x, y, rotulo_y)
+
+    def legenda(self, itens):
+        """Caixa de legenda no canto superior direito: itens (tipo, cor, texto)"""
+        pdf = self.pdf
+        pdf.set_font("Helvetica", "", 7)
+        largura = max(pdf.get_string_width(texto) for _, _, texto in itens) + 12
+        altura = 4.5 * len(itens) + 2
+        x = self.x + self.largura - largura - 2
+        y = self.y + 2
+
+        pdf.set_fill_color(255, 255, 255)
+        pdf.set_draw_color(*COR_GRADE)
+        pdf.set_line_width(0.2)
+        pdf.rect(x, y, largura, altura, "DF")
+
+        for k, (tipo, cor, texto) in enumerate(itens):
+            yk = y + 3.2 + 4.5 * k
+            pdf.set_fill_color(*cor)
+            pdf.set_draw_color(*cor)
+            if tipo == "barra":
+                pdf.rect(x + 2, yk - 1.5, 5, 3, "F")
+            elif tipo == "tracejada":
+                pdf.set_line_width(0.8)
+                pdf.set_dash_pattern(dash=1.2, gap=0.8)
+                pdf.line(x + 1.5, yk, x + 7.5, yk)
+                pdf.set_dash_pattern()
+            elif tipo == "linha":
+                pdf.set_line_width(0.8)
+                pdf.line(x + 1.5, yk, x + 7.5, yk)
+                _ponto(pdf, x + 4.5, yk, 1.6)
+            else:
+                _ponto(pdf, x + 4.5, yk, 2.6)
+            pdf.set_text_color(0, 0, 0)
+            pdf.text(x + 9.5, yk + 1, texto)
+
+
+def grafico_barras(boletim, nome):
+    """Barras aluno x média da turma por disciplina"""
+    return GraficoVetorial(ALTURA_BARRAS + ESPACO_ROTULOS_X,
+                           lambda pdf, y: _desenhar_barras(pdf, y, boletim, nome))
+
+
+def _desenhar_barras(pdf, y, boletim, nome):
+    disciplinas = list(boletim.disciplinas)
+    aluno_vals = np.asarray(boletim.percentuais, dtype=float)
+    media_vals = np.asarray(boletim.medias, dtype=float)
+    n = len(disciplinas)
+
+    eixos = _Eixos(pdf, y, ALTURA_BARRAS, xlim=(-0.6, n - 0.4), ylim=(0, 105))
+    eixos.grade_y(range(0, 101, 20))
+
+    cor_aluno = _rgb(COR_PRINCIPAL, 0.8)
+    cor_media = _rgb(COR_SECUNDARIA, 0.7)
+    largura_barra = 0.35 * eixos.largura / max(n + 0.2, 1)
+    base = eixos.py(0)
+
+    pdf.set_font("Helvetica", "", 5.5)
+    for i in range(n):
+        for deslocamento, valor, cor, negrito in ((-0.175, aluno_vals[i], cor_aluno, True),
+                                                  (0.175, media_vals[i], cor_media, False)):
+            xc = eixos.px(i + deslocamento)
+            topo = eixos.py(valor)
+            pdf.set_fill_color(*cor)
+            pdf.rect(xc - largura_barra / 2, topo, largura_barra, base - topo, "F")
+
+            texto = f"{valor:.1f}%"
+            pdf.set_font("Helvetica", "B" if negrito else "", 5.5)
+            pdf.set_text_color(*_rgb(COR_PRINCIPAL if negrito else COR_SECUNDARIA))
+            pdf.text(xc - pdf.get_string_width(texto) / 2, topo - 1, texto)
+
+    # Nomes das disciplinas inclinados, terminando na marca do eixo
+    pdf.set_font("Helvetica", "", 7)
+    pdf.set_text_color(0, 0, 0)
+    for i, disciplina in enumerate(disciplinas):
+        texto = str(disciplina)[:22]
+        x = eixos.px(i)
+        yb = base + 2.5
+        with pdf.rotation(45, x, yb):
+            pdf.text(x - pdf.get_string_width(texto), yb + 1, texto)
+
+    eixos.moldura()
+    eixos.rotulos(None, "Percentual de Acertos (%)")
+    eixos.legenda([("barra", cor_aluno, str(nome)), ("barra", cor_media, "Média Turma")])
+
+
+class GraficosTurmaVetoriais:
+    """Histograma e ranking da turma em primitivas FPDF, dados calculados uma vez"""
+
+    def __init__(self, ranking_df):
+        self.notas = ranking_df["Percentual"].to_numpy(dtype=float) * 100
+        self.posicoes = ranking_df["Posição"].to_numpy()
+
+        if len(self.notas):
+            self.contagens, self.bins = np.histogram(self.notas, bins=min(12, len(self.notas)))
+        else:
+            self.contagens, self.bins = np.zeros(0, dtype=int), np.zeros(1)
+        self.marcas_contagem = _marcas(self.contagens.max() if len(self.contagens) else 0)
+
+        margem = 0.05 * max(self.notas.max() - self.notas.min(), 1) if len(self.notas) else 1
+        self.lim_notas = ((self.notas.min() - margem, self.notas.max() + margem)
+                          if len(self.notas) else (0, 100))
+        self.lim_posicoes = (0, max(self.posicoes.max() if len(self.posicoes) else 1, 1) + 1)
+
+    def histograma(self, nome, percentual):
+        """Distribuição das notas destacando a faixa do aluno"""
+        return GraficoVetorial(ALTURA_TURMA + 12,
+                               lambda pdf, y: self._desenhar_histograma(pdf, y, nome, percentual))
+
+    def posicao_ranking(self, nome, posicao, percentual):
+        """Curva do ranking marcando a posição do aluno"""
+        return GraficoVetorial(ALTURA_TURMA + 12,
+                               lambda pdf, y: self._desenhar_ranking(pdf, y, nome, posicao, percentual))
+
+    def _desenhar_histograma(self, pdf, y, nome, percentual):
+        lim_x = (self.bins[0] - (self.bins[-1] - self.bins[0]) * 0.05,
+                 self.bins[-1] + (self.bins[-1] - self.bins[0]) * 0.05)
+        if lim_x[0] == lim_x[1]:
+            lim_x = (lim_x[0] - 1, lim_x[1] + 1)
+        eixos = _Eixos(pdf, y, ALTURA_TURMA, xlim=lim_x, ylim=(0, self.marcas_contagem[-1] * 1.05 or 1))
+        eixos.grade_y(self.marcas_contagem)
+        eixos.grade_x(_marcas_intervalo(*lim_x))
+
+        faixa_aluno = (self.bins[:-1] <= percentual) & (percentual <= self.bins[1:])
+        pdf.set_line_width(0.4)
+        pdf.set_draw_color(*_rgb(COR_PRINCIPAL, 0.8))
+        for k, contagem in enumerate(self.contagens):
+            x0, x1 = eixos.px(self.bins[k]), eixos.px(self.bins[k + 1])
+            topo = eixos.py(contagem)
+            cor = _rgb(COR_PRINCIPAL, 0.9) if faixa_aluno[k] else _rgb(COR_DESTAQUE, 0.7)
+            pdf.set_fill_color(*cor)
+            pdf.rect(x0, topo, x1 - x0, eixos.py(0) - topo, "DF")
+
+        _linha_aluno(eixos, percentual)
+        eixos.moldura()
+        eixos.rotulos("Percentual de Acertos (%)", "Número de Estudantes")
+        eixos.legenda([("tracejada", VERMELHO, f"{nome} ({percentual:.1f}%)")])
+
+    def _desenhar_ranking(self, pdf, y, nome, posicao, percentual):
+        eixos = _Eixos(pdf, y, ALTURA_TURMA, xlim=self.lim_posicoes, ylim=self.lim_notas)
+        eixos.grade_y(_marcas_intervalo(*self.lim_notas))
+        eixos.grade_x(_marcas_intervalo(*self.lim_posicoes))
+
+        cor_curva = _rgb(COR_SECUNDARIA, 0.7)
+        pontos = [(eixos.px(p), eixos.py(v)) for p, v in zip(self.posicoes, self.notas)]
+        pdf.set_draw_color(*cor_curva)
+        pdf.set_fill_color(*cor_curva)
+        pdf.set_line_width(0.8)
+        if len(pontos) > 1:
+            pdf.polyline(pontos)
+        if len(pontos) <= MAX_MARCADORES_RANKING:
+            for x, yp in pontos:
+                _ponto(pdf, x, yp, 1.6)
+
+        # Top 3 e o aluno por cima da curva
+        pdf.set_draw_color(*LARANJA)
+        pdf.set_fill_color(*OURO)
+        pdf.set_line_width(0.4)
+        for x, yp in pontos[:3]:
+            _ponto(pdf, x, yp, 3, "DF")
+
+        _ponto_aluno(eixos, posicao, percentual)
+        eixos.moldura()
+        eixos.rotulos("Posição no Ranking", "Percentual de Acertos (%)")
+        eixos.legenda(_legenda_ranking(cor_curva, nome, posicao))
+
+
+def _linha_aluno(eixos, percentual):
+    """Linha tracejada vermelha na nota do aluno"""
+    pdf = eixos.pdf
+    pdf.set_draw_color(*VERMELHO)
+    pdf.set_line_width(0.8)
+    pdf.set_dash_pattern(dash=2, gap=1.2)
+    xa = eixos.px(percentual)
+    pdf.line(xa, eixos.y, xa, eixos.y + eixos.altura)
+    pdf.set_dash_pattern()
+
+
+def _ponto_aluno(eixos, posicao, percentual):
+    """Ponto vermelho do aluno na curva do ranking"""
+    pdf = eixos.pdf
+    pdf.set_draw_color(139, 0, 0)
+    pdf.set_fill_color(*VERMELHO)
+    pdf.set_line_width(0.4)
+    _ponto(pdf, eixos.px(posicao), eixos.py(percentual), 3.6, "DF")
+
+
+def _legenda_ranking(cor_curva, nome, posicao):
+    return [
+        ("linha", cor_curva, "Outros alunos"),
+        ("ponto", VERMELHO, f"{nome} - {posicao}º lugar"),
+        ("ponto", OURO, "Top 3"),
+    ]
+
+
+class _FundoTurma:
+    """Camada estática de um gráfico da turma como imagem, com a posição dos eixos em mm"""
+
+    def __init__(self, chave, camada):
+        self.chave = chave
+        # Analisada uma vez; cada documento só registra a informação pronta
+        self.png = camada.fundo_png()
+        self.info = dict(get_img_info(chave, BytesIO(self.png)))
+        self.info["iccp"] = None
+
+        largura_px, altura_px = camada.canvas.get_width_height()
+        escala = LARGURA_FUNDO_TURMA / largura_px
+        self.x = (210 - LARGURA_FUNDO_TURMA) / 2
+        self.altura = altura_px * escala
+        self.area = [valor * escala for valor in camada.area_eixos()]
+        self.xlim = camada.ax.get_xlim()
+        self.ylim = camada.ax.get_ylim()
+
+    def desenhar(self, pdf, y):
+        """Coloca a imagem (gravada uma vez por documento) e devolve os eixos sobre ela"""
+        pdf.image(pdf.registrar_imagem(self.chave, self.info, self.png), x=self.x, y=y, w=LARGURA_FUNDO_TURMA)
+        x, topo, largura, altura = self.area
+        return _Eixos(pdf, y + topo, altura, self.xlim, self.ylim, x=self.x + x, largura=largura)
+
+
+class GraficosTurmaCompartilhados:
+    """Histograma e ranking com o fundo da turma compartilhado por todas as páginas
+
+    Recebe um `GraficosTurma` (matplotlib) já montado e reaproveita suas
+    camadas estáticas; por aluno só a faixa, a linha/ponto vermelho e a
+    legenda são desenhados em vetor.
+    """
+
+    def __init__(self, graficos_turma):
+        self.bins = graficos_turma.bins
+        self.contagens = [barra.get_height() for barra in graficos_turma.barras_destaque]
+        self.distribuicao = _FundoTurma("turma_distribuicao", graficos_turma.distribuicao)
+        self.ranking = _FundoTurma("turma_ranking", graficos_turma.ranking)
+
+    def histograma(self, nome, percentual):
+        """Distribuição das notas destacando a faixa do aluno"""
+        return GraficoVetorial(self.distribuicao.altura,
+                               lambda pdf, y: self._desenhar_histograma(pdf, y, nome, percentual))
+
+    def posicao_ranking(self, nome, posicao, percentual):
+        """Curva do ranking marcando a posição do aluno"""
+        return GraficoVetorial(self.ranking.altura,
+                               lambda pdf, y: self._desenhar_ranking(pdf, y, nome, posicao, percentual))
+
+    def _desenhar_histograma(self, pdf, y, nome, percentual):
+        eixos = self.distribuicao.desenhar(pdf, y)
+
+        faixas = np.flatnonzero((self.bins[:-1] <= percentual) & (percentual <= self.bins[1:]))
+        pdf.set_fill_color(*_rgb(COR_PRINCIPAL, 0.9))
+        for k in faixas:
+            x0, x1 = eixos.px(self.bins[k]), eixos.px(self.bins[k + 1])
+            topo = eixos.py(self.contagens[k])
+            pdf.rect(x0, topo, x1 - x0, eixos.py(0) - topo, "F")
+
+        _linha_aluno(eixos, percentual)
+        eixos.legenda([("tracejada", VERMELHO, f"{nome} ({percentual:.1f}%)")])
+
+    def _desenhar_ranking(self, pdf, y, nome, posicao, percentual):
+        eixos = self.ranking.desenhar(pdf, y)
+        _ponto_aluno(eixos, posicao, percentual)
+        eixos.legenda(_legenda_ranking(_rgb(COR_SECUNDARIA, 0.7), nome, posicao))
+
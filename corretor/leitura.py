@@ -0,0 +1,127 @@
+"""Leitura rápida da planilha do simulado
+
+`pd.read_excel(sheet_name=None)` carrega todas as abas (INSTRUÇÕES e o que
+mais o professor tiver acrescentado) pelo modelo completo do openpyxl e
+monta DataFrames de objetos. Aqui o arquivo é aberto em modo somente
+leitura (streaming), só as abas RESPOSTAS e GABARITO são percorridas e as
+colunas já saem tipadas: ID inteiro, respostas como categóricas A-E (os
+códigos vão direto para a matriz da correção).
+
+Linhas totalmente vazias não viram alunos (ou questões) sem dados. As do
+fim da aba somem, como no `pd.read_excel`; as do meio também saem, mas os
+números delas na planilha ficam em `df.attrs["linhas_vazias"]` para a
+validação avisar o professor. Células à direita da última coluna do
+cabeçalho não entram (nem contam para a linha ser vazia); as linhas em que
+isso acontece ficam em `df.attrs["linhas_fora_do_cabecalho"]`.
+"""
+
+import re
+
+import pandas as pd
+
+from corretor.correcao import categorizar_respostas
+from corretor.cronometro import Cronometro
+
+ABAS_PLANILHA = ("RESPOSTAS", "GABARITO")
+
+PADRAO_COLUNA_QUESTAO = re.compile(r"^Questão \d+$")
+
+
+def _nomes_colunas(cabecalho):
+    """Nomes das colunas como o pandas daria: vazias viram 'Unnamed: i', repetidas ganham '.n'"""
+    nomes = []
+    vistos = {}
+    for i, valor in enumerate(cabecalho):
+        nome = f"Unnamed: {i}" if valor is None else (valor.strip() if isinstance(valor, str) else valor)
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{nome}.{vistos[nome]}"
+        else:
+            vistos[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+
+def _coluna_id(valores):
+    """ID inteiro quando todas as células são números inteiros; senão como veio
+
+    Só células numéricas no Excel viram número: um ID digitado como texto
+    ("001") continua texto, como no `pd.read_excel`.
+    """
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in valores if v is not None):
+        return pd.Series(valores, dtype=object)
+    numeros = pd.to_numeric(pd.Series(valores, dtype=object), errors="coerce")
+    preenchidos = numeros.notna()
+    if not (numeros[preenchidos] % 1 == 0).all():
+        return numeros
+    return numeros.astype("int64" if preenchidos.all() else "Int64")
+
+
+def _converter_coluna(nome, valores):
+    if isinstance(nome, str) and PADRAO_COLUNA_QUESTAO.match(nome):
+        return categorizar_respostas(valores)
+    if nome == "ID":
+        return _coluna_id(valores)
+    # Demais colunas: o pandas escolhe o tipo (números, textos)
+    return pd.Series(valores)
+
+
+def ler_aba(planilha):
+    """Percorre a aba em streaming e monta o DataFrame coluna a coluna"""
+    linhas = planilha.iter_rows(values_only=True)
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        return pd.DataFrame()
+
+    nomes = _nomes_colunas(cabecalho)
+    largura = len(nomes)
+    dados = []
+    vazias = []
+    fora_do_cabecalho = []
+    ultima_com_dados = 0
+    # Linha 1 é o cabeçalho: os dados começam na linha 2 da planilha
+    for numero, linha in enumerate(linhas, start=2):
+        if any(valor is not None for valor in linha[largura:]):
+            fora_do_cabecalho.append(numero)
+        celulas = linha[:largura]
+        if all(valor is None for valor in celulas):
+            vazias.append(numero)
+        else:
+            dados.append(celulas + (None,) * (largura - len(celulas)))
+            ultima_com_dados = numero
+
+    colunas = list(zip(*dados)) if dados else [()] * largura
+    tabela = pd.DataFrame(
+        {nome: _converter_coluna(nome, list(valores)) for nome, valores in zip(nomes, colunas)},
+        index=pd.RangeIndex(len(dados))
+    )
+    # Vazias depois do último dado são só o fim da aba
+    tabela.attrs["linhas_vazias"] = [numero for numero in vazias if numero < ultima_com_dados]
+    tabela.attrs["linhas_fora_do_cabecalho"] = fora_do_cabecalho
+    return tabela
+
+
+def ler_planilha_rapida(arquivo, cronometro=None, abas=ABAS_PLANILHA):
+    """{aba: DataFrame} só com as abas pedidas que existirem no arquivo
+
+    Cada fase (abrir o arquivo, ler cada aba) é registrada no `cronometro`.
+    """
+    cronometro = cronometro or Cronometro()
+
+    with cronometro.etapa("Abrir planilha"):
+        if hasattr(arquivo, "seek"):
+            arquivo.seek(0)
+        import openpyxl  # carregado na primeira leitura, não ao abrir o app
+        livro = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+
+    try:
+        dados = {}
+        for aba in abas:
+            if aba not in livro.sheetnames:
+                continue
+            with cronometro.etapa(f"Ler aba {aba}"):
+                dados[aba] = ler_aba(livro[aba])
+        return dados
+    finally:
+        livro.close()
+
@@ -0,0 +1,204 @@
+"""Logos decodificadas uma única vez e compartilhadas por todos os PDFs
+
+O FPDF mantém um cache de imagens por documento: cada `BoletimPDF` novo
+abriria e recomprimiria os arquivos das logos de novo. Aqui as logos são
+reduzidas ao tamanho usado no cabeçalho, convertidas (JPEG quando não há
+transparência) e analisadas pelo próprio FPDF uma vez; cada documento só
+recebe a informação já pronta.
+
+As logos vêm dos arquivos do repositório (`logo-acafe.png` e
+`logo_fleming.png`), sem acesso à rede. O resultado fica em cache no
+processo, tanto para os PDFs quanto para o cabeçalho da tela. Uma logo
+remota só é usada se configurada (`CORRETOR_LOGO_ACAFE_URL`,
+`CORRETOR_LOGO_FLEMING_URL`): ela é baixada em segundo plano e, até
+terminar ou se falhar, vale a do repositório.
+"""
+
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+from functools import lru_cache
+from io import BytesIO
+
+from PIL import Image
+
+# Largura das logos no cabeçalho do boletim (mm) e resolução de impressão
+LARGURA_LOGO_MM = 30
+DPI_LOGO = 300
+QUALIDADE_JPEG_LOGO = 90
+
+# Logos que acompanham o repositório
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGOS_PADRAO = {
+    'acafe': os.path.join(RAIZ_PROJETO, "logo-acafe.png"),
+    'fleming': os.path.join(RAIZ_PROJETO, "logo_fleming.png"),
+}
+
+# Logos no cabeçalho da tela: 80 px (CSS .logo-header), em dobro para telas de alta densidade
+TAMANHO_LOGO_TELA_PX = 160
+
+# Logos remotas opcionais, baixadas em segundo plano
+VARIAVEIS_LOGOS_REMOTAS = {
+    'acafe': "CORRETOR_LOGO_ACAFE_URL",
+    'fleming': "CORRETOR_LOGO_FLEMING_URL",
+}
+PASTA_LOGOS_REMOTAS = os.path.join(tempfile.gettempdir(), "corretor-acafe-logos")
+TEMPO_LIMITE_DOWNLOAD = 10
+
+
+def _reduzir(imagem, largura_mm, dpi):
+    """Reduz a imagem para a largura em pixels necessária na impressão"""
+    largura_px = max(1, round(largura_mm / 25.4 * dpi))
+    if imagem.width > largura_px:
+        altura_px = max(1, round(imagem.height * largura_px / imagem.width))
+        imagem = imagem.resize((largura_px, altura_px), Image.LANCZOS)
+    return imagem
+
+
+def _versao(caminho):
+    """Identifica o conteúdo atual do arquivo nas chaves dos caches (muda se ele for trocado)"""
+    info = os.stat(caminho)
+    return info.st_mtime_ns, info.st_size
+
+
+def preparar_logo_pdf(caminho, largura_mm=LARGURA_LOGO_MM, dpi=DPI_LOGO):
+    """Lê, reduz e converte uma logo; retorna {'info': dicionário de imagem do FPDF, 'fonte': bytes}
+
+    O resultado fica em cache no processo: cada documento copia o dicionário
+    ao registrá-lo, então a mesma logo preparada serve a todos os trabalhos.
+    Os bytes da imagem reduzida (`fonte`) são o caminho pela API pública do
+    FPDF quando o atalho do cache de imagens não vale (corretor.pdf).
+    """
+    preparada = _preparar_logo_pdf(caminho, _versao(caminho), largura_mm, dpi)
+    return {"info": dict(preparada["info"]), "fonte": preparada["fonte"]}
+
+
+@lru_cache(maxsize=16)
+def _preparar_logo_pdf(caminho, versao, largura_mm, dpi):
+    # fpdf só é carregado quando um boletim vai ser gerado
+    from fpdf.image_parsing import get_img_info
+
+    with Image.open(caminho) as original:
+        original.load()
+        imagem = _reduzir(original, largura_mm, dpi)
+
+    tem_transparencia = imagem.mode in ("RGBA", "LA", "PA") or "transparency" in imagem.info
+    buffer = BytesIO()
+    if tem_transparencia:
+        imagem = imagem.convert("RGBA")
+        imagem.save(buffer, format="PNG")
+        info = get_img_info(caminho, imagem)
+    else:
+        # Sem transparência: JPEG embutido direto no PDF (DCTDecode), sem recompressão
+        imagem.convert("RGB").save(buffer, format="JPEG", quality=QUALIDADE_JPEG_LOGO)
+        info = get_img_info(caminho, buffer)
+
+    # Perfil ICC não é necessário para as logos e exigiria registro por documento
+    info["iccp"] = None
+    return {"info": dict(info), "fonte": buffer.getvalue()}
+
+
+def preparar_logos_pdf(caminhos, largura_mm=LARGURA_LOGO_MM, dpi=DPI_LOGO):
+    """Prepara todas as logos disponíveis: {'acafe': logo, 'fleming': logo} (ver preparar_logo_pdf)"""
+    logos = {}
+    for nome, caminho in caminhos.items():
+        if not caminho or not os.path.exists(caminho):
+            continue
+        try:
+            logos[nome] = preparar_logo_pdf(caminho, largura_mm, dpi)
+        except Exception:
+            # Logo ilegível: o boletim sai sem ela, como antes
+            continue
+    return logos
+
+
+@lru_cache(maxsize=16)
+def _logo_base64(caminho, versao, tamanho_px):
+    with Image.open(caminho) as original:
+        imagem = original.convert("RGBA")
+    imagem.thumbnail((tamanho_px, tamanho_px), Image.LANCZOS)
+    buffer = BytesIO()
+    imagem.save(buffer, format="PNG", optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def logo_base64(caminho, tamanho_px=TAMANHO_LOGO_TELA_PX):
+    """PNG reduzido ao tamanho do cabeçalho da tela, em base64 (None se a logo não abrir)"""
+    if not caminho or not os.path.exists(caminho):
+        return None
+    try:
+        return _logo_base64(caminho, _versao(caminho), tamanho_px)
+    except Exception:
+        return None
+
+
+def assinatura_logos(caminhos):
+    """{nome: hash curto do arquivo} das logos disponíveis, para a chave do cache de resultados"""
+    assinatura = {}
+    for nome, caminho in sorted(caminhos.items()):
+        if caminho and os.path.exists(caminho):
+            assinatura[nome] = _hash_arquivo(caminho, _versao(caminho))
+    return assinatura
+
+
+@lru_cache(maxsize=16)
+def _hash_arquivo(caminho, versao):
+    with open(caminho, "rb") as arquivo:
+        return hashlib.sha256(arquivo.read()).hexdigest()[:12]
+
+
+# --------------------------
+# LOGOS REMOTAS (OPCIONAIS)
+# --------------------------
+
+_logos_remotas = {}
+_trava_remotas = threading.Lock()
+_download_iniciado = False
+
+
+def _baixar_logos_remotas(urls):
+    """Baixa as logos configuradas; as que falharem continuam sendo as do repositório"""
+    import requests
+
+    os.makedirs(PASTA_LOGOS_REMOTAS, exist_ok=True)
+    for nome, url in urls.items():
+        try:
+            resposta = requests.get(url, timeout=TEMPO_LIMITE_DOWNLOAD)
+            resposta.raise_for_status()
+            with Image.open(BytesIO(resposta.content)) as imagem:
+                imagem.verify()
+            destino = os.path.join(PASTA_LOGOS_REMOTAS, f"logo_{nome}.png")
+            with open(destino + ".tmp", "wb") as arquivo:
+                arquivo.write(resposta.content)
+            os.replace(destino + ".tmp", destino)
+        except Exception:
+            continue
+        with _trava_remotas:
+            _logos_remotas[nome] = destino
+
+
+def iniciar_logos_remotas():
+    """Começa (uma vez por processo) o download das logos remotas configuradas, sem esperar"""
+    global _download_iniciado
+    with _trava_remotas:
+        if _download_iniciado:
+            return
+        _download_iniciado = True
+    urls = {nome: os.environ[variavel] for nome, variavel in VARIAVEIS_LOGOS_REMOTAS.items()
+            if os.environ.get(variavel)}
+    if urls:
+        threading.Thread(target=_baixar_logos_remotas, args=(urls,), name="corretor-logos", daemon=True).start()
+
+
+def caminhos_logos():
+    """{'acafe': caminho, 'fleming': caminho} das logos a usar agora (None se faltar o arquivo)"""
+    iniciar_logos_remotas()
+    with _trava_remotas:
+        remotas = dict(_logos_remotas)
+    caminhos = {}
+    for nome, padrao in LOGOS_PADRAO.items():
+        caminho = remotas.get(nome) or padrao
+        caminhos[nome] = caminho if os.path.exists(caminho) else None
+    return caminhos
@@ -0,0 +1,259 @@
+"""Documento PDF do boletim individual"""
+
+import os
+from io import BytesIO
+
+import fpdf
+from fpdf import FPDF, XPos, YPos
+
+from corretor.graficos_vetoriais import GraficoVetorial
+
+# Logos e fundos da turma são analisados (get_img_info) uma vez por processo e
+# o resultado é posto direto no cache de imagens de cada documento: sem isso o
+# FPDF decodifica o PNG/JPEG de novo em todo boletim. O atalho depende do
+# formato interno desse cache (ImageInfo com i/usages/iccp_i), conferido nas
+# versões abaixo; em outra versão as imagens passam pela API pública `image()`.
+VERSOES_CACHE_IMAGENS = ("2.7.",)
+try:
+    from fpdf.fpdf import ImageInfo
+except ImportError:
+    ImageInfo = None
+ATALHO_IMAGENS = ImageInfo is not None and fpdf.FPDF_VERSION.startswith(VERSOES_CACHE_IMAGENS)
+
+
+class BoletimPDF(FPDF):
+    def __init__(self, logos=None):
+        super().__init__()
+        # Logos como caminho de arquivo ou já preparadas por corretor.logos
+        logos = logos or {}
+        self.logo_acafe = self._registrar_logo('acafe', logos.get('acafe'))
+        self.logo_fleming = self._registrar_logo('fleming', logos.get('fleming'))
+        # Primeira página do boletim atual (vários boletins podem dividir o documento)
+        self.primeira_pagina = 1
+    
+    def registrar_imagem(self, chave, info, fonte):
+        """O que passar a `image()`: a imagem já analisada (`info`) ou, sem o atalho, os bytes `fonte`"""
+        if not ATALHO_IMAGENS:
+            # O FPDF analisa a imagem no primeiro uso e a reaproveita no documento pelo hash dos bytes
+            return BytesIO(fonte)
+        # Mesma chave em todas as páginas: a imagem é gravada uma vez por documento
+        if chave not in self.images:
+            self.images[chave] = ImageInfo(info, i=len(self.images) + 1, usages=0, iccp_i=None)
+        return chave
+    
+    def _registrar_logo(self, nome, logo):
+        """Registra uma logo pré-processada no cache de imagens do documento"""
+        if isinstance(logo, dict):
+            return self.registrar_imagem(f"logo_{nome}", logo["info"], logo["fonte"])
+        if logo and os.path.exists(logo):
+            return logo
+        return None
+    
+    def novo_boletim(self):
+        """Começa o boletim de um aluno numa página nova, com numeração própria"""
+        self.add_page()
+        self.primeira_pagina = self.page_no()
+    
+    def header(self):
+        """Header melhorado com logos oficiais - SEM WARNINGS"""
+        # Fundo verde no header
+        self.set_fill_color(45, 90, 61)  # Verde ACAFE
+        self.rect(0, 0, 210, 45, 'F')
+        
+        # Logo ACAFE (esquerda)
+        if self.logo_acafe:
+            try:
+                self.image(self.logo_acafe, 15, 8, 30)
+            except Exception:
+                pass
+        
+        # Logo Fleming (direita)
+        if self.logo_fleming:
+            try:
+                self.image(self.logo_fleming, 165, 8, 30)
+            except Exception:
+                pass
+        
+        # Título central
+        self.set_font("Helvetica", "B", 20)
+        self.set_text_color(255, 255, 255)  # Branco
+        self.set_y(15)
+        self.cell(0, 8, "SIMULADO ACAFE", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+        
+        self.set_font("Helvetica", "B", 16)
+        self.cell(0, 8, "COLEGIO FLEMING", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+        
+        self.set_font("Helvetica", "", 12)
+        self.cell(0, 6, "Relatorio Individual de Desempenho", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+        
+        # Linha decorativa
+        self.set_draw_color(255, 255, 255)
+        self.set_line_width(1)
+        self.line(20, 42, 190, 42)
+        
+        self.set_text_color(0, 0, 0)  # Voltar para preto
+        self.ln(18)
+
+    def add_aluno_info(self, nome, posicao, percentual, media_turma, aluno_data=None):
+        """Informações do aluno com design melhorado - SEM WARNINGS"""
+        # Caixa principal
+        self.set_fill_color(240, 248, 245)  # Verde muito claro
+        self.set_draw_color(45, 90, 61)  # Verde escuro
+        self.set_line_width(1)
+        self.rect(10, self.get_y(), 190, 50, 'DF')
+        
+        # Título da seção
+        self.set_font("Helvetica", "B", 16)
+        self.set_text_color(45, 90, 61)
+        self.set_y(self.get_y() + 8)
+        self.cell(0, 8, "INFORMACOES DO ESTUDANTE", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+        
+        # Informações em duas colunas
+        y_start = self.get_y() + 3
+        
+        # Coluna esquerda
+        self.set_font("Helvetica", "B", 12)
+        self.set_text_color(0, 0, 0)
+        self.set_y(y_start)
+        self.set_x(15)
+        self.cell(90, 7, f"Nome: {nome}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        
+        self.set_x(15)
+        self.cell(90, 7, f"Posicao no Ranking: {posicao}º lugar", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        
+        if aluno_data and 'Sede' in aluno_data:
+            self.set_x(15)
+            texto_sede = f"Sede: {aluno_data['Sede']}"
+            if 'Posição na Sede' in aluno_data:
+                posicao_sede, total_sede = aluno_data['Posição na Sede']
+                texto_sede += f" ({posicao_sede}º de {total_sede})"
+            self.cell(90, 7, texto_sede, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        
+        # Coluna direita
+        self.set_y(y_start)
+        self.set_x(110)
+        self.cell(90, 7, f"Nota Individual: {percentual:.1f}%", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        
+        self.set_x(110)
+        self.cell(90, 7, f"Media da Turma: {media_turma:.1f}%", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        
+        # Diferença com cor
+        diferenca = percentual - media_turma
+        self.set_x(110)
+        if diferenca > 0:
+            self.set_text_color(0, 128, 0)  # Verde
+            self.cell(90, 7, f"Diferenca: +{diferenca:.1f}% (acima)", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        else:
+            self.set_text_color(255, 0, 0)  # Vermelho
+            self.cell(90, 7, f"Diferenca: {diferenca:.1f}% (abaixo)", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        
+        self.set_text_color(0, 0, 0)  # Voltar para preto
+        self.ln(18)
+
+    def add_table(self, boletim):
+        """Tabela melhorada com cores alternadas - SEM WARNINGS"""
+        # Título da tabela
+        self.set_font("Helvetica", "B", 14)
+        self.set_text_color(45, 90, 61)
+        self.cell(0, 10, "DESEMPENHO POR DISCIPLINA", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+        self.ln(5)
+        
+        # Cabeçalho da tabela
+        self.set_fill_color(45, 90, 61)  # Verde ACAFE
+        self.set_text_color(255, 255, 255)  # Branco
+        self.set_font("Helvetica", "B", 10)
+        
+        self.cell(50, 10, "Disciplina", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
+        self.cell(25, 10, "Acertos", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
+        self.cell(25, 10, "Total", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
+        self.cell(30, 10, "Nota (%)", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
+        self.cell(30, 10, "Media (%)", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
+        self.cell(30, 10, "Diferenca", 1, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C', fill=True)
+        
+        # Dados da tabela
+        self.set_font("Helvetica", "", 9)
+        
+        for i, (disciplina, acertos, total, perc, media, diferenca) in enumerate(boletim.linhas()):
+            # Alternar cores das linhas
+            if i % 2 == 0:
+                self.set_fill_color(248, 255, 254)  # Verde muito claro
+            else:
+                self.set_fill_color(255, 255, 255)  # Branco
+            
+            self.set_text_color(0, 0, 0)
+            disciplina = str(disciplina)[:22]  # Limitar tamanho
+            self.cell(50, 8, disciplina, 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='L', fill=True)
+            self.cell(25, 8, str(acertos), 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
+            self.cell(25, 8, str(total), 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
+            self.cell(30, 8, f"{perc:.1f}%", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
+            self.cell(30, 8, f"{media:.1f}%", 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
+            
+            texto_dif = f"+{diferenca:.1f}%" if diferenca > 0 else f"{diferenca:.1f}%"
+            self.cell(30, 8, texto_dif, 1, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C', fill=True)
+        
+        self.set_text_color(0, 0, 0)  # Voltar para preto
+        self.ln(12)
+
+    def add_image(self, imagem, largura=180, titulo=""):
+        """Adiciona imagem (caminho ou buffer PNG) com título - SEM WARNINGS"""
+        if imagem is not None and (not isinstance(imagem, str) or os.path.exists(imagem)):
+            try:
+                if titulo:
+                    self.set_font("Helvetica", "B", 12)
+                    self.set_text_color(45, 90, 61)
+                    self.cell(0, 10, titulo, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+                    self.ln(3)
+                
+                x_pos = (210 - largura) / 2
+                self.image(imagem, x=x_pos, w=largura)
+                self.ln(12)
+                
+            except Exception as e:
+                self.set_font("Helvetica", "", 10)
+                self.set_text_color(255, 0, 0)
+                self.cell(0, 10, f"Erro ao carregar grafico: {str(e)}", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+                self.set_text_color(0, 0, 0)
+
+    def add_grafico(self, grafico, titulo=""):
+        """Adiciona um gráfico vetorial (GraficoVetorial) ou uma imagem PNG"""
+        if not isinstance(grafico, GraficoVetorial):
+            self.add_image(grafico, titulo=titulo)
+            return
+        
+        # Título e gráfico ficam sempre na mesma página
+        if self.get_y() + 13 + grafico.altura > self.page_break_trigger:
+            self.add_page()
+        
+        if titulo:
+            self.set_font("Helvetica", "B", 12)
+            self.set_text_color(45, 90, 61)
+            self.cell(0, 10, titulo, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+            self.ln(3)
+        
+        y = self.get_y()
+        try:
+            grafico.desenhar(self, y)
+        except Exception as e:
+            self.set_font("Helvetica", "", 10)
+            self.set_text_color(255, 0, 0)
+            self.cell(0, 10, f"Erro ao desenhar grafico: {str(e)}", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+        
+        self.set_text_color(0, 0, 0)
+        self.set_y(y + grafico.altura)
+        self.ln(12)
+
+    def footer(self):
+        """Footer melhorado - SEM WARNINGS"""
+        self.set_y(-25)
+        
+        # Linha decorativa
+        self.set_draw_color(45, 90, 61)
+        self.set_line_width(0.8)
+        self.line(20, self.get_y(), 190, self.get_y())
+        
+        self.set_font("Helvetica", "", 9)
+        self.set_text_color(100, 100, 100)
+        self.ln(5)
+        self.cell(0, 5, f"Pagina {self.page_no() - self.primeira_pagina + 1}", new_x=XPos.RIGHT, new_y=YPos.TOP, align='C')
+        self.ln(4)
+        self.cell(0, 5, "Sistema de Correcao ACAFE - Colegio Fleming | v4.0", new_x=XPos.RIGHT, new_y=YPos.TOP, align='C')
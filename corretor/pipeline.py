@@ -0,0 +1,606 @@
+"""Pipeline completo de correção, sem interface
+
+O mesmo fluxo do app Streamlit (leitura, validação, correção, ranking e
+boletins) em funções importáveis. O app usa `processar_envio` (com cache e
+andamento por etapa), chamado pela fila de trabalhos em segundo plano; a
+linha de comando (`python -m corretor grade ...`) usa `processar_arquivo`,
+que roda tudo de uma vez e mede cada etapa.
+"""
+
+import hashlib
+import zipfile
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from corretor.boletins import (
+    FORMATO_GRAFICOS_PADRAO,
+    SAIDA_BOLETINS_PADRAO,
+    SAIDA_SOB_DEMANDA,
+    ContextoBoletins,
+    LoteImpressao,
+    ResultadoBoletim,
+    TarefaBoletim,
+    adicionar_ao_zip,
+    gerar_boletins,
+)
+from corretor.analise_itens import analisar_itens
+from corretor.correcao import corrigir_matriz, recorrigir_gabarito
+from corretor.cronometro import Cronometro
+from corretor.disciplinas import construir_indice_disciplinas, resultados_disciplinas
+from corretor.leitura import ler_planilha_rapida
+from corretor.ranking import METODO_RANKING_PADRAO, montar_ranking
+from corretor.sedes import nome_sede, resultados_sedes
+from corretor.validacao import (
+    avisos_leitura,
+    informacoes_gabarito,
+    validar_arquivo_excel,
+    validar_dados_gabarito,
+)
+
+
+class ErroPlanilha(ValueError):
+    """Planilha fora da estrutura esperada; `erros` traz as mensagens da validação"""
+
+    def __init__(self, titulo, erros):
+        super().__init__("\n".join([titulo] + list(erros)))
+        self.titulo = titulo
+        self.erros = list(erros)
+
+
+# --------------------------
+# LEITURA E VALIDAÇÃO
+# --------------------------
+
+def ler_planilha(arquivo, cronometro=None):
+    """Lê só as abas RESPOSTAS e GABARITO, em streaming: {nome da aba: DataFrame}"""
+    return ler_planilha_rapida(arquivo, cronometro)
+
+
+def validar_planilha(dados):
+    """Confere a planilha; devolve (respostas, gabarito, informações) ou levanta ErroPlanilha"""
+    valido, erros = validar_arquivo_excel(dados)
+    if not valido:
+        raise ErroPlanilha("🚨 Problemas encontrados no arquivo:", erros)
+
+    respostas = dados["RESPOSTAS"]
+    gabarito = dados["GABARITO"]
+
+    gabarito_valido, erros_gabarito = validar_dados_gabarito(gabarito)
+    if not gabarito_valido:
+        raise ErroPlanilha("🚨 Problemas encontrados no gabarito:", erros_gabarito)
+
+    return respostas, gabarito, avisos_leitura(dados) + informacoes_gabarito(gabarito)
+
+
+# --------------------------
+# CORREÇÃO E RANKING
+# --------------------------
+
+def mapear_disciplinas(gabarito):
+    """{disciplina: [questões]} na ordem em que as disciplinas aparecem no gabarito"""
+    mapa_disciplinas = {}
+    for disciplina in gabarito['Disciplina'].unique():
+        if pd.isna(disciplina):
+            continue
+        questoes = gabarito[gabarito['Disciplina'] == disciplina]['Questão'].tolist()
+        mapa_disciplinas[disciplina] = questoes
+    return mapa_disciplinas
+
+
+@dataclass
+class Turma:
+    """Resultado da correção de uma planilha, pronto para os boletins"""
+    correcao: object         # Correcao (matriz de acertos N x Q)
+    alunos: object           # DataFrame com ID, Nome, Sede e Percentual
+    ranking_df: object
+    posicoes: object         # posição de cada aluno, alinhada a `alunos`
+    media_turma: float       # em %
+    por_disciplina: object   # ResultadoDisciplinas (N x S)
+    itens: object = None     # AnaliseItens (dificuldade, discriminação, distratores)
+    sedes: object = None     # ResultadoSedes (médias e ranking interno de cada sede)
+
+    @property
+    def total_alunos(self):
+        return len(self.alunos)
+
+    @property
+    def total_questoes(self):
+        return len(self.correcao.questoes)
+
+    @property
+    def total_disciplinas(self):
+        return len(self.por_disciplina.disciplinas)
+
+    @property
+    def media_df(self):
+        return pd.DataFrame({"Disciplina": self.por_disciplina.disciplinas, "%": self.por_disciplina.medias})
+
+    @property
+    def varias_sedes(self):
+        return self.sedes is not None and len(self.sedes) > 1
+
+    def tarefas(self):
+        """Uma TarefaBoletim por aluno, na ordem da planilha"""
+        n_alunos = len(self.alunos)
+        sedes = self.alunos["Sede"] if "Sede" in self.alunos.columns else ["N/A"] * n_alunos
+        percentuais = np.asarray(self.alunos["Percentual"], dtype=float) * 100
+        varias_sedes = self.varias_sedes
+        return [
+            TarefaBoletim(
+                indice=i,
+                nome=nome,
+                sede=sede,
+                posicao=int(self.posicoes[i]),
+                percentual=percentuais[i],
+                posicao_sede=int(self.sedes.posicoes[i]) if varias_sedes else None,
+                total_sede=self.sedes.total_sede(i) if varias_sedes else None
+            )
+            for i, (nome, sede) in enumerate(zip(self.alunos["Nome"], sedes))
+        ]
+
+
+def montar_turma(respostas, correcao, mapa_disciplinas, metodo_ranking=METODO_RANKING_PADRAO, cronometro=None):
+    """Ranking e resultados por disciplina a partir de uma correção pronta
+
+    Cada fase (médias por disciplina, sedes, ranking, análise de itens) é
+    registrada no `cronometro`.
+    """
+    cronometro = cronometro or Cronometro()
+
+    # Acertos, percentuais e médias por disciplina de todos os alunos (N x S)
+    with cronometro.etapa("Médias por disciplina"):
+        indice_disciplinas = construir_indice_disciplinas(correcao, mapa_disciplinas)
+        por_disciplina = resultados_disciplinas(correcao, indice_disciplinas)
+
+    colunas_alunos = [col for col in ["ID", "Nome", "Sede"] if col in respostas.columns]
+    alunos = respostas[colunas_alunos].reset_index(drop=True)
+    alunos["Percentual"] = correcao.percentual
+
+    # Médias e ranking interno por sede, num groupby sobre as mesmas matrizes
+    with cronometro.etapa("Sedes"):
+        sedes = resultados_sedes(alunos["Sede"] if "Sede" in alunos.columns else None,
+                                 correcao.percentual, por_disciplina, metodo_ranking)
+        if len(sedes) > 1:
+            alunos["Posição na Sede"] = sedes.posicoes
+
+    # Ranking calculado uma vez, com posições alinhadas às linhas de `alunos`
+    with cronometro.etapa("Ranking"):
+        ranking_df, posicoes = montar_ranking(alunos, correcao.percentual, metodo_ranking)
+        media_turma = ranking_df["Percentual"].mean() * 100
+
+    # Análise de itens: mesmas matrizes, entra no cache junto com a turma
+    with cronometro.etapa("Análise de itens"):
+        itens = analisar_itens(correcao, indice_disciplinas)
+
+    return Turma(correcao, alunos, ranking_df, posicoes, media_turma, por_disciplina, itens, sedes)
+
+
+def corrigir_turma(respostas, gabarito, metodo_ranking=METODO_RANKING_PADRAO, cronometro=None):
+    """Correção completa de uma planilha já validada"""
+    cronometro = cronometro or Cronometro()
+    with cronometro.etapa("Correção"):
+        mapa_disciplinas = mapear_disciplinas(gabarito)
+        correcao = corrigir_matriz(respostas, gabarito)
+    return montar_turma(respostas, correcao, mapa_disciplinas, metodo_ranking, cronometro)
+
+
+# --------------------------
+# BOLETINS
+# --------------------------
+
+def contexto_boletins(turma, logos, formato_graficos=FORMATO_GRAFICOS_PADRAO):
+    """Dados da turma compartilhados por todos os boletins"""
+    return ContextoBoletins(
+        ranking_df=turma.ranking_df,
+        por_disciplina=turma.por_disciplina,
+        media_turma=turma.media_turma,
+        logos=logos,
+        formato_graficos=formato_graficos
+    )
+
+
+def gravar_zip(destino, contexto, tarefas, processos=1, ao_gerar=None, zip_anterior=None, reaproveitar=None):
+    """Grava os boletins (um PDF por aluno) como ZIP em `destino`
+
+    `ao_gerar(i, resultado)` é chamado para cada boletim pronto, na ordem das
+    tarefas. Com `zip_anterior` (bytes ou caminho) e `reaproveitar` ({índice do aluno:
+    posição no ZIP anterior}), esses boletins são copiados do ZIP antigo e só
+    os demais são gerados. Devolve {índice do aluno: posição no novo ZIP}.
+    """
+    reaproveitar = reaproveitar or {}
+    novas = [tarefa for tarefa in tarefas if tarefa.indice not in reaproveitar]
+    resultados = gerar_boletins(contexto, novas, processos)
+    entradas = {}
+
+    if reaproveitar:
+        anterior = zipfile.ZipFile(zip_anterior if isinstance(zip_anterior, str) else BytesIO(zip_anterior))
+    else:
+        anterior = nullcontext()
+    try:
+        with zipfile.ZipFile(destino, "w") as zipf, anterior:
+            for i, tarefa in enumerate(tarefas):
+                if tarefa.indice in reaproveitar:
+                    # Boletim idêntico ao da execução anterior: só copia
+                    info = anterior.infolist()[reaproveitar[tarefa.indice]]
+                    pdf = anterior.read(info)
+                    zipf.writestr(info, pdf)
+                    # Com os bytes, o boletim copiado também sai avulso antes do fim (como os gerados)
+                    resultado = ResultadoBoletim(indice=tarefa.indice, nome=tarefa.nome, arquivo=info.filename,
+                                                 pdf=pdf)
+                    gravado = True
+                else:
+                    resultado = next(resultados)
+                    gravado = adicionar_ao_zip(zipf, resultado)
+
+                if gravado:
+                    entradas[tarefa.indice] = len(zipf.infolist()) - 1
+                if ao_gerar:
+                    ao_gerar(i, resultado)
+    finally:
+        resultados.close()
+
+    return entradas
+
+
+def pasta_sede(sede):
+    """Pasta da sede dentro do ZIP"""
+    return nome_sede(sede).replace("/", "_")
+
+
+def ordenar_por_sede(tarefas):
+    """Tarefas agrupadas por sede (ordem alfabética), mantendo a ordem da planilha em cada uma"""
+    return sorted(tarefas, key=lambda tarefa: nome_sede(tarefa.sede))
+
+
+def filtrar_sedes(tarefas, sedes=None):
+    """Só as tarefas das sedes pedidas (todas se `sedes` for vazio)"""
+    if not sedes:
+        return tarefas
+    escolhidas = {nome_sede(sede).casefold() for sede in sedes}
+    return [tarefa for tarefa in tarefas if nome_sede(tarefa.sede).casefold() in escolhidas]
+
+
+def gravar_zip_sedes(destino, contexto, tarefas, processos=1, ao_gerar=None, ao_concluir_sede=None):
+    """Grava os boletins como ZIP com uma pasta por sede; devolve quantos entraram
+
+    As tarefas entram no pool agrupadas por sede, então as sedes ficam
+    prontas uma depois da outra. `ao_concluir_sede(sede, bytes)` recebe o ZIP
+    só daquela sede assim que o último boletim dela é gravado.
+    """
+    ordenadas = ordenar_por_sede(tarefas)
+    restantes = Counter(nome_sede(tarefa.sede) for tarefa in ordenadas)
+    resultados = gerar_boletins(contexto, ordenadas, processos)
+    gravados = 0
+    zip_sede = buffer_sede = None
+
+    try:
+        with zipfile.ZipFile(destino, "w") as zipf:
+            for i, (tarefa, resultado) in enumerate(zip(ordenadas, resultados)):
+                sede = nome_sede(tarefa.sede)
+                if ao_concluir_sede and zip_sede is None:
+                    buffer_sede = BytesIO()
+                    zip_sede = zipfile.ZipFile(buffer_sede, "w")
+
+                if resultado.pdf:
+                    zipf.writestr(f"{pasta_sede(sede)}/{resultado.arquivo}", resultado.pdf)
+                    if zip_sede:
+                        zip_sede.writestr(resultado.arquivo, resultado.pdf)
+                    gravados += 1
+                if ao_gerar:
+                    ao_gerar(i, resultado)
+
+                restantes[sede] -= 1
+                if restantes[sede] == 0 and zip_sede:
+                    zip_sede.close()
+                    ao_concluir_sede(sede, buffer_sede.getvalue())
+                    zip_sede = buffer_sede = None
+    finally:
+        resultados.close()
+
+    return gravados
+
+
+def separar_por_sede(dados_zip):
+    """{pasta: bytes de um ZIP só com os boletins dela} a partir do ZIP com pastas por sede"""
+    pastas = {}
+    with zipfile.ZipFile(BytesIO(dados_zip)) as origem:
+        for info in origem.infolist():
+            pasta, _, arquivo = info.filename.partition("/")
+            if not arquivo:
+                continue
+            if pasta not in pastas:
+                pastas[pasta] = (BytesIO(), [])
+            pastas[pasta][1].append((arquivo, origem.read(info)))
+
+    separados = {}
+    for pasta, (buffer, arquivos) in pastas.items():
+        with zipfile.ZipFile(buffer, "w") as zip_sede:
+            for arquivo, dados in arquivos:
+                zip_sede.writestr(arquivo, dados)
+        separados[pasta] = buffer.getvalue()
+    return separados
+
+
+def recortar_zip(origem, nomes, sem_pasta=False):
+    """Bytes de um ZIP só com as entradas `nomes` do ZIP `origem` (caminho ou arquivo)
+
+    Lê uma entrada por vez: só o recorte fica na memória, nunca o ZIP inteiro.
+    Com `sem_pasta`, as entradas perdem a pasta (boletins de uma sede).
+    """
+    saida = BytesIO()
+    with zipfile.ZipFile(origem) as zip_origem, zipfile.ZipFile(saida, "w") as recorte:
+        for nome in nomes:
+            info = zip_origem.getinfo(nome)
+            destino = nome.rpartition("/")[2] if sem_pasta else nome
+            recorte.writestr(destino, zip_origem.read(info), compress_type=info.compress_type)
+    return saida.getvalue()
+
+
+def gravar_pdf_unico(destino, contexto, tarefas, ao_gerar=None):
+    """Grava todos os boletins num único PDF em `destino`; devolve quantos entraram"""
+    lote = LoteImpressao(contexto)
+    for i, resultado in enumerate(lote.gerar(tarefas)):
+        if ao_gerar:
+            ao_gerar(i, resultado)
+    destino.write(lote.finalizar())
+    return lote.incluidos
+
+
+def contar_cpu_processos(cronometro, etapa, ao_gerar=None):
+    """`ao_gerar` que também soma à `etapa` a CPU dos boletins gerados no pool de processos"""
+    def contar(i, resultado):
+        if resultado.cpu_processo:
+            cronometro.acrescentar_cpu_processos(etapa, resultado.cpu_processo)
+        if ao_gerar:
+            ao_gerar(i, resultado)
+    return contar
+
+
+def gravar_boletins(destino, contexto, tarefas, saida=SAIDA_BOLETINS_PADRAO, processos=1, ao_gerar=None,
+                    ao_concluir_sede=None):
+    """Grava os boletins no formato de entrega escolhido"""
+    if saida == "pdf_unico":
+        return gravar_pdf_unico(destino, contexto, tarefas, ao_gerar)
+    if saida == "zip_sedes":
+        return gravar_zip_sedes(destino, contexto, tarefas, processos, ao_gerar, ao_concluir_sede)
+    return len(gravar_zip(destino, contexto, tarefas, processos, ao_gerar))
+
+
+# --------------------------
+# NOVA CORREÇÃO SÓ DO GABARITO
+# --------------------------
+
+def hash_respostas(respostas):
+    """Hash do bloco RESPOSTAS (alunos e marcações), independente do gabarito"""
+    resumo = hashlib.sha256(repr(list(respostas.columns)).encode())
+    resumo.update(pd.util.hash_pandas_object(respostas, index=False).to_numpy().tobytes())
+    return resumo.hexdigest()
+
+
+def _desenho_turma(turma):
+    """O que os boletins mostram da turma, na precisão em que é impresso ou desenhado
+
+    Médias com uma casa (como na tabela e nas barras), o histograma pelas
+    contagens de cada faixa (as bordas só dependem da menor e da maior nota)
+    e a curva do ranking com uma casa: notas que mudam sem mudar o desenho
+    não invalidam os boletins.
+    """
+    por_disciplina = turma.por_disciplina
+    notas = turma.ranking_df["Percentual"].to_numpy(dtype=float) * 100
+    if len(notas):
+        contagens, faixas = np.histogram(notas, bins=min(12, len(notas)))
+    else:
+        contagens, faixas = np.zeros(0, dtype=int), np.zeros(1)
+    return (
+        list(por_disciplina.disciplinas),
+        round(float(turma.media_turma), 1),
+        np.asarray(por_disciplina.totais).tolist(),
+        np.round(np.asarray(por_disciplina.medias, dtype=float), 1).tolist(),
+        contagens.tolist(),
+        faixas.tolist(),
+        turma.ranking_df["Posição"].to_numpy().tolist(),
+        np.round(notas, 1).tolist(),
+    )
+
+
+def assinar_boletins(turma):
+    """(assinatura da turma, assinatura de cada aluno) do conteúdo impresso nos boletins
+
+    A parte da turma (médias, histograma, curva do ranking) aparece em todos os
+    boletins: se o que é desenhado dela mudar, todos mudam. A de cada aluno
+    cobre nome, sede, posição, nota e acertos por disciplina.
+    """
+    por_disciplina = turma.por_disciplina
+    resumo_turma = hashlib.sha256(repr(_desenho_turma(turma)).encode())
+
+    assinaturas = []
+    for tarefa in turma.tarefas():
+        resumo = hashlib.sha256(repr((str(tarefa.nome), str(tarefa.sede), tarefa.posicao,
+                                      float(tarefa.percentual), tarefa.posicao_sede,
+                                      tarefa.total_sede)).encode())
+        resumo.update(np.ascontiguousarray(por_disciplina.acertos[tarefa.indice]).tobytes())
+        assinaturas.append(resumo.hexdigest())
+
+    return resumo_turma.hexdigest(), assinaturas
+
+
+@dataclass
+class RegistroBoletins:
+    """Assinaturas e posições no ZIP dos boletins de uma execução, para reaproveitá-los"""
+    assinatura_turma: str
+    assinaturas: list    # uma por aluno, na ordem da planilha
+    entradas: dict       # índice do aluno -> posição do boletim no ZIP
+    avisos: dict = field(default_factory=dict)   # índice do aluno -> avisos ao gerar o boletim
+
+    def reaproveitaveis(self, assinatura_turma, assinaturas):
+        """{índice: posição no ZIP antigo} dos boletins que ficaram idênticos"""
+        if assinatura_turma != self.assinatura_turma or len(assinaturas) != len(self.assinaturas):
+            return {}
+        return {indice: posicao for indice, posicao in self.entradas.items()
+                if assinaturas[indice] == self.assinaturas[indice]}
+
+
+# --------------------------
+# EXECUÇÃO COMPLETA
+# --------------------------
+
+def processar_arquivo(arquivo, destino, logos=None, metodo_ranking=METODO_RANKING_PADRAO,
+                      formato_graficos=FORMATO_GRAFICOS_PADRAO, saida=SAIDA_BOLETINS_PADRAO,
+                      processos=1, ao_gerar=None, cronometro=None, sedes=None):
+    """Planilha -> boletins em `destino`, sem interface; devolve (turma, boletins gravados)
+
+    `logos` são as logos já preparadas (corretor.logos.preparar_logos_pdf).
+    Com `sedes`, só os boletins dessas sedes são gerados (médias e rankings
+    continuam sendo os da turma inteira). Levanta ErroPlanilha se a planilha
+    não passar na validação.
+    """
+    cronometro = cronometro or Cronometro()
+
+    # Abertura e leitura de cada aba entram como etapas próprias
+    dados = ler_planilha(arquivo, cronometro)
+
+    with cronometro.etapa("Validação"):
+        respostas, gabarito, _ = validar_planilha(dados)
+
+    turma = corrigir_turma(respostas, gabarito, metodo_ranking, cronometro)
+
+    with cronometro.etapa("Boletins"):
+        contexto = contexto_boletins(turma, logos or {}, formato_graficos)
+        tarefas = filtrar_sedes(turma.tarefas(), sedes)
+        gravados = gravar_boletins(destino, contexto, tarefas, saida, processos,
+                                   contar_cpu_processos(cronometro, "Boletins", ao_gerar))
+
+    return turma, gravados
+
+
+# --------------------------
+# ENVIO DO APP (COM CACHE E ANDAMENTO)
+# --------------------------
+
+class Acompanhamento:
+    """Recebe o andamento de `processar_envio`; cada interface sobrescreve o que mostra"""
+
+    def etapa(self, mensagem, progresso):
+        """Nova fase do processamento; `progresso` de 0 a 100"""
+
+    def detalhe(self, texto):
+        """Informação secundária (tempos de leitura)"""
+
+    def informacao(self, texto):
+        """Mensagem informativa para o usuário"""
+
+    def turma_pronta(self, turma):
+        """Correção e ranking prontos, antes dos boletins"""
+
+    def boletim(self, i, total, resultado):
+        """Boletim i (de `total`) pronto, com seus avisos"""
+
+    def sede_pronta(self, sede, dados):
+        """ZIP só com os boletins de uma sede (entrega com pasta por sede)"""
+
+
+def processar_envio(conteudo, destino, opcoes, logos, cache=None, processos=1, acompanhamento=None,
+                    cronometro=None):
+    """Planilha enviada (bytes) -> boletins em `destino`; devolve a Turma
+
+    `opcoes` são as escolhas que mudam a saída (metodo_ranking,
+    formato_graficos, saida_boletins, logos) e também compõem a chave do
+    cache. Na saída sob demanda nada é gravado em `destino`: a correção
+    termina na turma. Com `cache`, o resultado é guardado; se as respostas
+    dos alunos forem as mesmas de uma execução anterior (só o gabarito
+    mudou), só as questões alteradas são corrigidas e, na saída "zip", só os
+    boletins que mudaram são gerados (`zip_sedes` e `pdf_unico` geram todos
+    de novo); os copiados trazem os avisos de quando foram gerados. Cada
+    etapa fica registrada no `cronometro`; o detalhe de cada boletim chega
+    ao `acompanhamento` em `resultado.tempos`. Levanta ErroPlanilha se a
+    planilha não passar na validação.
+    """
+    acompanhamento = acompanhamento or Acompanhamento()
+    cronometro = cronometro or Cronometro()
+    saida = opcoes.get("saida_boletins", SAIDA_BOLETINS_PADRAO)
+    metodo_ranking = opcoes.get("metodo_ranking", METODO_RANKING_PADRAO)
+
+    acompanhamento.etapa("📖 Lendo arquivo Excel...", 10)
+    dados = ler_planilha(BytesIO(conteudo), cronometro)
+    acompanhamento.detalhe("⏱️ Leitura: " + " · ".join(
+        f"{etapa} {segundos:.2f}s" for etapa, segundos in cronometro.etapas.items()))
+
+    acompanhamento.etapa("✅ Validando estrutura do arquivo...", 20)
+    with cronometro.etapa("Validação"):
+        respostas, gabarito, informacoes = validar_planilha(dados)
+    for informacao in informacoes:
+        acompanhamento.informacao(informacao)
+
+    acompanhamento.etapa("🔄 Corrigindo respostas...", 40)
+    with cronometro.etapa("Correção"):
+        mapa_disciplinas = mapear_disciplinas(gabarito)
+
+        # Mesmas respostas de uma execução anterior? (só no ZIP simples: os outros formatos são sempre refeitos)
+        base = None
+        if cache is not None and saida == "zip":
+            chave_base = cache.chave(hash_respostas(respostas).encode(), **opcoes)
+            base = cache.carregar_base(chave_base)
+
+        if base:
+            registro_anterior, turma_anterior, zip_anterior = base
+            correcao, alteradas = recorrigir_gabarito(turma_anterior.correcao, respostas, gabarito)
+        else:
+            correcao = corrigir_matriz(respostas, gabarito)
+    if base:
+        acompanhamento.informacao(f"♻️ Respostas iguais às de uma correção anterior: {len(alteradas)} questão(ões) "
+                                  "do gabarito mudaram e só elas foram corrigidas de novo.")
+
+    acompanhamento.etapa("📈 Calculando ranking e médias por disciplina...", 50)
+    turma = montar_turma(respostas, correcao, mapa_disciplinas, metodo_ranking, cronometro)
+    acompanhamento.turma_pronta(turma)
+
+    if saida == SAIDA_SOB_DEMANDA:
+        # Só notas e ranking: cada boletim é gerado quando o aluno for aberto
+        if cache is not None:
+            cache.guardar(cache.chave(conteudo, **opcoes), turma, b"")
+        return turma
+
+    acompanhamento.etapa("📄 Gerando boletins individuais...", 70)
+    contexto = contexto_boletins(turma, logos, opcoes.get("formato_graficos", FORMATO_GRAFICOS_PADRAO))
+    tarefas = turma.tarefas()
+    total_alunos = len(tarefas)
+
+    # Boletins com conteúdo idêntico ao da execução anterior são copiados do ZIP antigo
+    assinatura_turma, assinaturas = assinar_boletins(turma)
+    reaproveitar = registro_anterior.reaproveitaveis(assinatura_turma, assinaturas) if base else {}
+    if base:
+        acompanhamento.informacao(
+            f"📄 {total_alunos - len(reaproveitar)} de {total_alunos} boletins precisam ser gerados de novo.")
+
+    avisos_por_aluno = {}
+
+    def boletim_pronto(i, resultado):
+        if resultado.indice in reaproveitar:
+            # Copiado do ZIP anterior: os avisos são os de quando foi gerado
+            resultado.avisos.extend(registro_anterior.avisos.get(resultado.indice, []))
+        if resultado.avisos:
+            avisos_por_aluno[resultado.indice] = list(resultado.avisos)
+        acompanhamento.boletim(i, total_alunos, resultado)
+    ao_gerar = contar_cpu_processos(cronometro, "Boletins", boletim_pronto)
+
+    with cronometro.etapa("Boletins"):
+        if saida == "zip":
+            entradas = gravar_zip(destino, contexto, tarefas, processos, ao_gerar,
+                                  zip_anterior=zip_anterior if base else None, reaproveitar=reaproveitar)
+        else:
+            gravar_boletins(destino, contexto, tarefas, saida, processos, ao_gerar,
+                            ao_concluir_sede=acompanhamento.sede_pronta)
+
+    if cache is not None:
+        with cronometro.etapa("Cache"):
+            cache.guardar(cache.chave(conteudo, **opcoes), turma, destino)
+            if saida == "zip":
+                cache.guardar_base(chave_base, cache.chave(conteudo, **opcoes),
+                                   RegistroBoletins(assinatura_turma, assinaturas, entradas, avisos_por_aluno))
+
+    return turma
@@ -0,0 +1,61 @@
+"""Ranking da turma calculado uma única vez
+
+As posições saem de uma ordenação vetorizada e ficam num vetor alinhado às
+linhas da correção, então o boletim de cada aluno consulta sua posição em
+O(1) em vez de varrer o ranking inteiro.
+"""
+
+import numpy as np
+
+# Critérios de desempate para notas iguais
+#   competicao: 1, 2, 2, 4  (padrão de concursos)
+#   densa:      1, 2, 2, 3
+#   sequencial: 1, 2, 3, 4  (empates desfeitos pela ordem da planilha)
+METODOS_RANKING = {
+    "competicao": "Competição (1, 2, 2, 4)",
+    "densa": "Densa (1, 2, 2, 3)",
+    "sequencial": "Sequencial (1, 2, 3, 4)",
+}
+METODO_RANKING_PADRAO = "competicao"
+
+
+def calcular_posicoes(percentual, metodo=METODO_RANKING_PADRAO):
+    """Retorna (ordem decrescente, posições na ordem, posições alinhadas aos alunos)"""
+    if metodo not in METODOS_RANKING:
+        raise ValueError(f"Critério de ranking desconhecido: {metodo}")
+
+    notas = np.asarray(percentual, dtype=float)
+    n_alunos = len(notas)
+    ordem = np.argsort(-notas, kind="stable")
+    ordenadas = notas[ordem]
+    sequencia = np.arange(1, n_alunos + 1)
+
+    # Primeiro aluno de cada grupo de notas iguais
+    novo_grupo = np.ones(n_alunos, dtype=bool)
+    novo_grupo[1:] = ordenadas[1:] != ordenadas[:-1]
+
+    if metodo == "competicao":
+        posicoes_ordenadas = np.maximum.accumulate(np.where(novo_grupo, sequencia, 0))
+    elif metodo == "densa":
+        posicoes_ordenadas = np.cumsum(novo_grupo)
+    else:
+        posicoes_ordenadas = sequencia
+
+    posicoes = np.empty(n_alunos, dtype=int)
+    posicoes[ordem] = posicoes_ordenadas
+    return ordem, posicoes_ordenadas, posicoes
+
+
+def montar_ranking(alunos, percentual, metodo=METODO_RANKING_PADRAO):
+    """Monta o ranking_df e o vetor de posições alinhado às linhas de `alunos`"""
+    ordem, posicoes_ordenadas, posicoes = calcular_posicoes(percentual, metodo)
+
+    # Sede e posição dentro da sede acompanham o aluno quando existem
+    colunas = [coluna for coluna in ("ID", "Nome", "Sede", "Posição na Sede") if coluna in alunos.columns]
+    ranking_df = alunos[colunas].iloc[ordem].reset_index(drop=True)
+    ranking_df["Percentual"] = np.asarray(percentual, dtype=float)[ordem]
+    ranking_df["Posição"] = posicoes_ordenadas
+    ranking_df["Nota (%)"] = (ranking_df["Percentual"] * 100).round(1)
+
+    return ranking_df, posicoes
+
@@ -0,0 +1,90 @@
+"""Resultados por sede (campus)
+
+Cada aluno recebe o código da sua sede e um único groupby sobre a matriz de
+notas (nota final, acertos e disciplinas feitas) dá as médias de todas as
+sedes. O ranking interno de cada sede usa o mesmo critério de empate do
+ranking geral.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from corretor.ranking import METODO_RANKING_PADRAO, calcular_posicoes
+
+SEM_SEDE = "Sem sede"
+
+
+def nome_sede(sede):
+    """Nome da sede usado em agrupamentos, pastas e marcadores"""
+    if sede is None or (isinstance(sede, float) and np.isnan(sede)) or str(sede).strip() == "":
+        return SEM_SEDE
+    return str(sede).strip()
+
+
+@dataclass
+class ResultadoSedes:
+    """Médias e ranking interno de cada sede"""
+    sedes: list                 # (K,) nomes, em ordem alfabética
+    codigos: np.ndarray         # (N,) sede de cada aluno
+    alunos: np.ndarray          # (K,) alunos por sede
+    medias: np.ndarray          # (K,) nota média em %, arredondada a 0,1
+    disciplinas: list           # (S,)
+    medias_disciplinas: np.ndarray  # (K, S) média por disciplina em %, arredondada a 0,1
+    posicoes: np.ndarray        # (N,) posição do aluno dentro da sua sede
+
+    def __len__(self):
+        return len(self.sedes)
+
+    def total_sede(self, i):
+        """Número de alunos da sede do aluno i"""
+        return int(self.alunos[self.codigos[i]])
+
+    def tabela(self):
+        """DataFrame com uma linha por sede: alunos, média geral e médias por disciplina"""
+        tabela = pd.DataFrame({"Sede": self.sedes, "Alunos": self.alunos, "Média (%)": self.medias})
+        for j, disciplina in enumerate(self.disciplinas):
+            tabela[disciplina] = self.medias_disciplinas[:, j]
+        return tabela
+
+
+def resultados_sedes(sedes_alunos, percentual, por_disciplina, metodo_ranking=METODO_RANKING_PADRAO):
+    """Agrega as notas por sede e calcula o ranking interno de cada uma
+
+    `sedes_alunos` traz a sede de cada linha da correção (ou None sem a coluna).
+    """
+    percentual = np.asarray(percentual, dtype=float)
+    n_alunos = len(percentual)
+    nomes = [nome_sede(sede) for sede in sedes_alunos] if sedes_alunos is not None else [SEM_SEDE] * n_alunos
+    codigos, sedes = pd.factorize(pd.Series(nomes, dtype=object), sort=True)
+
+    # Um groupby só: nota final, acertos por disciplina e disciplinas feitas (trilhas de língua)
+    acertos = por_disciplina.acertos
+    n_disciplinas = acertos.shape[1]
+    aplicaveis = (por_disciplina.aplicaveis if por_disciplina.aplicaveis is not None
+                  else np.ones_like(acertos, dtype=bool))
+    bloco = np.column_stack([percentual, acertos, aplicaveis]).astype(float)
+    somas = pd.DataFrame(bloco).groupby(codigos).sum().to_numpy()
+
+    alunos = np.bincount(codigos, minlength=len(sedes))
+    medias = np.round(100 * somas[:, 0] / np.maximum(alunos, 1), 1)
+    acertos_sedes = somas[:, 1:1 + n_disciplinas]
+    feitas = np.maximum(somas[:, 1 + n_disciplinas:], 1)
+    medias_disciplinas = np.round(100 * acertos_sedes / (feitas * por_disciplina.totais), 1)
+
+    # Ranking dentro de cada sede (poucas sedes: um calcular_posicoes por sede)
+    posicoes = np.zeros(n_alunos, dtype=int)
+    for k in range(len(sedes)):
+        linhas = np.flatnonzero(codigos == k)
+        _, _, posicoes[linhas] = calcular_posicoes(percentual[linhas], metodo_ranking)
+
+    return ResultadoSedes(
+        sedes=list(sedes),
+        codigos=codigos,
+        alunos=alunos,
+        medias=medias,
+        disciplinas=list(por_disciplina.disciplinas),
+        medias_disciplinas=medias_disciplinas,
+        posicoes=posicoes,
+    )
@@ -0,0 +1,170 @@
+"""Template Excel do simulado (abas RESPOSTAS, GABARITO e INSTRUÇÕES)
+
+O template é o mesmo para todo mundo: em produção ele é gerado uma vez, no
+build da imagem (`python -m corretor template`), e o app só lê os bytes. Sem
+o arquivo pronto, é montado no primeiro pedido e fica em memória. O openpyxl
+só é importado nesse caso.
+"""
+
+import os
+from functools import lru_cache
+from io import BytesIO
+
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NOME_TEMPLATE = "Template_Simulado_ACAFE_Fleming.xlsx"
+TEMPLATE_PRONTO = os.path.join(RAIZ_PROJETO, NOME_TEMPLATE)
+
+
+def montar_template():
+    """Cria template Excel com formatação ACAFE - VERSÃO COMPATÍVEL COM RENDER"""
+    import openpyxl
+    from openpyxl.styles import Alignment, Font, PatternFill
+
+    # Criar workbook
+    wb = openpyxl.Workbook()
+    
+    # Cores tema ACAFE
+    cor_verde_acafe = "2D5A3D"
+    cor_verde_claro = "E8F5F3"
+    cor_branco = "FFFFFF"
+    
+    # ===== ABA RESPOSTAS =====
+    ws_respostas = wb.active
+    ws_respostas.title = "RESPOSTAS"
+    
+    # Cabeçalhos da aba RESPOSTAS
+    headers_respostas = ["ID", "Nome", "Sede"] + [f"Questão {i:02d}" for i in range(1, 71)]
+    
+    # Aplicar cabeçalhos
+    for col, header in enumerate(headers_respostas, 1):
+        cell = ws_respostas.cell(row=1, column=col, value=header)
+        cell.fill = PatternFill(start_color=cor_verde_acafe, end_color=cor_verde_acafe, fill_type="solid")
+        cell.font = Font(color=cor_branco, bold=True)
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+    
+    # Dados de exemplo
+    exemplos_respostas = [
+        [1, "João Silva Santos", "CRICIÚMA"] + ["A"] * 70,
+        [2, "Maria Oliveira Costa", "TUBARÃO"] + ["B"] * 70,
+        [3, "Pedro Souza Lima", "ARARANGUÁ"] + ["C"] * 70
+    ]
+    
+    for row_idx, exemplo in enumerate(exemplos_respostas, 2):
+        for col_idx, valor in enumerate(exemplo, 1):
+            cell = ws_respostas.cell(row=row_idx, column=col_idx, value=valor)
+            if row_idx % 2 == 0:
+                cell.fill = PatternFill(start_color=cor_verde_claro, end_color=cor_verde_claro, fill_type="solid")
+    
+    # Ajustar largura das colunas
+    ws_respostas.column_dimensions['A'].width = 8   # ID
+    ws_respostas.column_dimensions['B'].width = 25  # Nome
+    ws_respostas.column_dimensions['C'].width = 15  # Sede
+    for col in range(4, 74):
+        ws_respostas.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 4
+    
+    # ===== ABA GABARITO =====
+    ws_gabarito = wb.create_sheet("GABARITO")
+    
+    # Cabeçalhos da aba GABARITO
+    headers_gabarito = ["Questão", "Resposta", "Disciplina"]
+    
+    for col, header in enumerate(headers_gabarito, 1):
+        cell = ws_gabarito.cell(row=1, column=col, value=header)
+        cell.fill = PatternFill(start_color=cor_verde_acafe, end_color=cor_verde_acafe, fill_type="solid")
+        cell.font = Font(color=cor_branco, bold=True)
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+    
+    # Exemplo de gabarito
+    disciplinas = ["Matemática", "Português", "História", "Geografia", "Biologia", "Física", "Química", "Inglês", "Espanhol"]
+    exemplos_gabarito = []
+    
+    for i in range(1, 71):
+        if i <= 56:
+            disciplina = disciplinas[(i-1) % 7]  # Distribui entre as primeiras 7 disciplinas
+        else:
+            # Questões 57-70 são de línguas (Inglês e Espanhol)
+            if i % 2 == 1:
+                disciplina = "Inglês"
+            else:
+                disciplina = "Espanhol"
+        
+        resposta = ["A", "B", "C", "D", "E"][(i-1) % 5]
+        exemplos_gabarito.append([i, resposta, disciplina])
+    
+    for row_idx, exemplo in enumerate(exemplos_gabarito, 2):
+        for col_idx, valor in enumerate(exemplo, 1):
+            cell = ws_gabarito.cell(row=row_idx, column=col_idx, value=valor)
+            if row_idx % 2 == 0:
+                cell.fill = PatternFill(start_color=cor_verde_claro, end_color=cor_verde_claro, fill_type="solid")
+    
+    # Ajustar largura das colunas
+    ws_gabarito.column_dimensions['A'].width = 12  # Questão
+    ws_gabarito.column_dimensions['B'].width = 12  # Resposta
+    ws_gabarito.column_dimensions['C'].width = 20  # Disciplina
+    
+    # ===== ABA INSTRUÇÕES =====
+    ws_instrucoes = wb.create_sheet("INSTRUÇÕES")
+    
+    instrucoes_texto = [
+        ["TEMPLATE SIMULADO ACAFE - COLÉGIO FLEMING", ""],
+        ["", ""],
+        ["INSTRUÇÕES DE USO:", ""],
+        ["", ""],
+        ["1. ABA RESPOSTAS:", ""],
+        ["   • Preencha o ID único de cada aluno", ""],
+        ["   • Insira o nome completo do aluno", ""],
+        ["   • Indique a sede (CRICIÚMA, TUBARÃO, etc.)", ""],
+        ["   • Preencha as respostas nas colunas Questão 01 a 70", ""],
+        ["   • Língua (opcional): Inglês ou Espanhol, quando as duas usam os mesmos números", ""],
+        ["   • Use apenas as letras: A, B, C, D, E", ""],
+        ["", ""],
+        ["2. ABA GABARITO:", ""],
+        ["   • Questão: Número da questão (1 a 70)", ""],
+        ["   • Resposta: Resposta correta (A, B, C, D, E)", ""],
+        ["   • Disciplina: Nome da matéria", ""],
+        ["   • Peso (opcional): Valor da questão na nota (padrão 1)", ""],
+        ["   • Anulada (opcional): 'Sim' para dar o acerto a todos", ""],
+        ["", ""],
+        ["3. QUESTÕES DE LÍNGUAS:", ""],
+        ["   • Questões 57-70 podem ser Inglês OU Espanhol", ""],
+        ["   • O sistema permite questões com mesmo número", ""],
+        ["   • para disciplinas diferentes", ""],
+        ["   • Cada aluno é corrigido só na língua da coluna Língua", ""],
+        ["   • (sem ela, na língua em que mais acertou)", ""],
+        ["", ""],
+        ["4. IMPORTANTE:", ""],
+        ["   • Mantenha a estrutura das abas", ""],
+        ["   • Não altere os cabeçalhos", ""],
+        ["   • Use apenas respostas válidas (A-E)", ""],
+        ["", ""],
+        ["DESENVOLVIDO PARA COLÉGIO FLEMING", ""],
+        ["Sistema de Correção ACAFE v4.0", ""]
+    ]
+    
+    for row_idx, (texto, _) in enumerate(instrucoes_texto, 1):
+        cell = ws_instrucoes.cell(row=row_idx, column=1, value=texto)
+        if "TEMPLATE" in texto or "INSTRUÇÕES" in texto or "DESENVOLVIDO" in texto:
+            cell.font = Font(bold=True, size=14, color=cor_verde_acafe)
+        elif texto.startswith(("1.", "2.", "3.", "4.")):
+            cell.font = Font(bold=True, color=cor_verde_acafe)
+        else:
+            cell.font = Font(color="333333")
+    
+    ws_instrucoes.column_dimensions['A'].width = 50
+    
+    # Salvar em bytes
+    buffer = BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=1)
+def template_excel():
+    """Bytes do template: o arquivo gerado no build ou, sem ele, montado agora"""
+    try:
+        with open(TEMPLATE_PRONTO, "rb") as arquivo:
+            return arquivo.read()
+    except FileNotFoundError:
+        return montar_template()
@@ -0,0 +1,496 @@
+"""Fila de trabalhos em segundo plano para o app
+
+A correção e os boletins de uma planilha rodam numa thread de um pool
+próprio, fora do script do Streamlit: mexer num widget, fechar a aba ou
+perder a conexão não interrompe mais a geração. O estado de cada trabalho
+fica num SQLite na pasta da fila e os arquivos em `<pasta>/<id>/`:
+
+    entrada.xlsx    planilha enviada
+    boletins        ZIP ou PDF final (só aparece quando termina)
+    turma.pickle    turma corrigida, para mostrar ranking e médias
+    analise_itens.xlsx  análise de itens, montada uma vez ao terminar
+    pdfs/*.pdf      boletins já prontos, um por aluno (só durante a geração)
+    sedes/*.zip     sedes já liberadas (entrega com pasta por sede, idem)
+
+Qualquer sessão acompanha um trabalho pelo id (o app o coloca na URL) e
+baixa o resultado depois de reconectar. Vários professores podem enfileirar
+planilhas ao mesmo tempo; cada trabalho ainda usa o pool de processos dos
+boletins. Trabalhos interrompidos por um reinício do servidor voltam à fila.
+
+Ao terminar, o tempo de parede, a CPU e a memória de cada etapa (e a soma
+de cada fase dos boletins) ficam na coluna `tempos`, e cada etapa vira uma
+linha de log em JSON com o id do trabalho.
+
+Os downloads saem do disco aos pedaços: durante a geração, cada boletim e
+cada sede pronta; no fim, o ZIP inteiro só se for pequeno, senão em partes,
+por sede ou por aluno, lidos do ZIP final uma entrada por vez.
+"""
+
+import json
+import math
+import os
+import pickle
+import shutil
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass, field
+
+from corretor.analise_itens import planilha_analise_itens
+from corretor.boletins import SAIDA_BOLETINS_PADRAO, SAIDA_SOB_DEMANDA
+from corretor.cache import pasta_temporaria_do_usuario, preparar_pasta_privada
+from corretor.cronometro import Cronometro, log_estruturado
+from corretor.logos import preparar_logos_pdf
+from corretor.pipeline import Acompanhamento, ErroPlanilha, pasta_sede, processar_envio, recortar_zip
+
+NA_FILA = "na_fila"
+PROCESSANDO = "processando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+ESTADOS = {
+    NA_FILA: "Na fila",
+    PROCESSANDO: "Processando",
+    CONCLUIDO: "Concluído",
+    ERRO: "Erro",
+}
+
+PASTA_TRABALHOS_PADRAO = pasta_temporaria_do_usuario("corretor-acafe-trabalhos")
+TRABALHADORES_PADRAO = 2
+DIAS_GUARDAR = 7
+INTERVALO_PROGRESSO = 0.5  # segundos entre gravações do andamento no banco
+LIMITE_DOWNLOAD_INTEIRO = 64 * 1024 * 1024  # acima disso o ZIP final só sai em partes
+BOLETINS_POR_PARTE = 200
+
+ARQUIVO_BANCO = "trabalhos.sqlite3"
+ARQUIVO_ENTRADA = "entrada.xlsx"
+ARQUIVO_BOLETINS = "boletins"
+ARQUIVO_TURMA = "turma.pickle"
+ARQUIVO_ANALISE_ITENS = "analise_itens.xlsx"
+PASTA_SEDES = "sedes"
+PASTA_PDFS = "pdfs"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabalhos (
+    id TEXT PRIMARY KEY,
+    chave TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    criado REAL NOT NULL,
+    atualizado REAL NOT NULL,
+    estado TEXT NOT NULL,
+    mensagem TEXT NOT NULL DEFAULT '',
+    progresso INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    feitos INTEGER NOT NULL DEFAULT 0,
+    parametros TEXT NOT NULL,
+    informacoes TEXT NOT NULL DEFAULT '[]',
+    avisos TEXT NOT NULL DEFAULT '[]',
+    erros TEXT NOT NULL DEFAULT '[]',
+    tempos TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS trabalhos_estado ON trabalhos (estado, criado);
+"""
+
+# Colunas acrescentadas depois da primeira versão do banco: (nome, definição)
+COLUNAS_NOVAS = (
+    ("tempos", "TEXT NOT NULL DEFAULT '{}'"),
+)
+
+
+@dataclass
+class Trabalho:
+    """Uma linha da fila"""
+    id: str
+    chave: str
+    nome: str
+    criado: float
+    atualizado: float
+    estado: str
+    mensagem: str = ""
+    progresso: int = 0
+    total: int = 0
+    feitos: int = 0
+    parametros: dict = field(default_factory=dict)
+    informacoes: list = field(default_factory=list)
+    avisos: list = field(default_factory=list)
+    erros: list = field(default_factory=list)
+    tempos: dict = field(default_factory=dict)   # {"etapas": {...}, "boletins": {...}}, ver Cronometro.como_dict
+
+    @property
+    def terminado(self):
+        return self.estado in (CONCLUIDO, ERRO)
+
+    @property
+    def opcoes(self):
+        return self.parametros.get("opcoes", {})
+
+    @property
+    def saida(self):
+        return self.opcoes.get("saida_boletins", SAIDA_BOLETINS_PADRAO)
+
+    @property
+    def em_zip(self):
+        """Boletins entregues como ZIP (um PDF por aluno)"""
+        return self.saida in ("zip", "zip_sedes")
+
+    @property
+    def sob_demanda(self):
+        """Só notas e ranking; os boletins são gerados ao abrir cada aluno"""
+        return self.saida == SAIDA_SOB_DEMANDA
+
+
+def _gravar_arquivo(destino, dados):
+    """Grava com troca no fim: quem lista a pasta nunca vê arquivo pela metade"""
+    with open(destino + ".tmp", "wb") as arquivo:
+        arquivo.write(dados)
+    os.replace(destino + ".tmp", destino)
+
+
+class _AndamentoNoBanco(Acompanhamento):
+    """Leva o andamento de `processar_envio` para a linha do trabalho, sem gravar a cada boletim"""
+
+    def __init__(self, fila, id_trabalho):
+        self.fila = fila
+        self.id = id_trabalho
+        self.pasta_sedes = os.path.join(fila.pasta_trabalho(id_trabalho), PASTA_SEDES)
+        self.pasta_pdfs = os.path.join(fila.pasta_trabalho(id_trabalho), PASTA_PDFS)
+        self.ultima_gravacao = 0.0
+        self.informacoes = []
+        self.avisos = []
+        self.tempos_boletins = Cronometro()
+
+    def etapa(self, mensagem, progresso):
+        self.fila._atualizar(self.id, mensagem=mensagem, progresso=progresso)
+
+    def informacao(self, texto):
+        self.informacoes.append(texto)
+        self.fila._atualizar(self.id, informacoes=json.dumps(self.informacoes))
+
+    def boletim(self, i, total, resultado):
+        self.avisos.extend(resultado.avisos)
+        self.tempos_boletins.somar(resultado.tempos)
+        if resultado.pdf:
+            # Cada boletim pode ser baixado assim que fica pronto
+            os.makedirs(self.pasta_pdfs, exist_ok=True)
+            _gravar_arquivo(os.path.join(self.pasta_pdfs, resultado.arquivo), resultado.pdf)
+        agora = time.monotonic()
+        if i + 1 < total and agora - self.ultima_gravacao < INTERVALO_PROGRESSO:
+            return
+        self.ultima_gravacao = agora
+        self.fila._atualizar(
+            self.id,
+            mensagem=f"📄 Boletim pronto: {resultado.nome} ({i + 1}/{total})",
+            progresso=int(70 + ((i + 1) / total) * 25),
+            total=total,
+            feitos=i + 1,
+            avisos=json.dumps(self.avisos),
+        )
+
+    def sede_pronta(self, sede, dados):
+        os.makedirs(self.pasta_sedes, exist_ok=True)
+        _gravar_arquivo(os.path.join(self.pasta_sedes, pasta_sede(sede) + ".zip"), dados)
+
+
+class FilaTrabalhos:
+    """Fila persistente (SQLite) com um pool de threads que executa os trabalhos"""
+
+    def __init__(self, pasta=None, trabalhadores=None, cache=None):
+        self.pasta = pasta or os.environ.get("CORRETOR_TRABALHOS_DIR") or PASTA_TRABALHOS_PADRAO
+        if trabalhadores is None:
+            trabalhadores = int(os.environ.get("CORRETOR_TRABALHADORES") or TRABALHADORES_PADRAO)
+        self.cache = cache
+        # turma.pickle é carregado desta pasta: só o usuário do app pode gravar nela
+        preparar_pasta_privada(self.pasta)
+        self.banco = os.path.join(self.pasta, ARQUIVO_BANCO)
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.executescript(ESQUEMA)
+            existentes = {linha["name"] for linha in conexao.execute("PRAGMA table_info(trabalhos)")}
+            for nome, definicao in COLUNAS_NOVAS:
+                if nome not in existentes:
+                    conexao.execute(f"ALTER TABLE trabalhos ADD COLUMN {nome} {definicao}")
+        self._trava = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, trabalhadores),
+                                            thread_name_prefix="corretor-trabalho")
+        self.limpar()
+        self.retomar()
+
+    # --------------------------
+    # BANCO
+    # --------------------------
+
+    def _conectar(self):
+        """Uma conexão por operação: threads do pool e sessões do Streamlit nunca dividem conexão"""
+        conexao = sqlite3.connect(self.banco, timeout=30)
+        conexao.row_factory = sqlite3.Row
+        return conexao
+
+    def _atualizar(self, id_trabalho, **campos):
+        campos["atualizado"] = time.time()
+        atribuicoes = ", ".join(f"{nome} = ?" for nome in campos)
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute(f"UPDATE trabalhos SET {atribuicoes} WHERE id = ?",
+                            [*campos.values(), id_trabalho])
+
+    @staticmethod
+    def _trabalho(linha):
+        dados = dict(linha)
+        for campo in ("parametros", "informacoes", "avisos", "erros", "tempos"):
+            dados[campo] = json.loads(dados[campo])
+        return Trabalho(**dados)
+
+    def pasta_trabalho(self, id_trabalho):
+        return os.path.join(self.pasta, id_trabalho)
+
+    # --------------------------
+    # CONSULTAS
+    # --------------------------
+
+    def obter(self, id_trabalho):
+        """Trabalho pelo id, ou None se não existir (ou já tiver sido limpo)"""
+        with closing(self._conectar()) as conexao:
+            linha = conexao.execute("SELECT * FROM trabalhos WHERE id = ?", (id_trabalho,)).fetchone()
+        return self._trabalho(linha) if linha else None
+
+    def listar(self, limite=10):
+        """Trabalhos mais recentes primeiro"""
+        with closing(self._conectar()) as conexao:
+            linhas = conexao.execute("SELECT * FROM trabalhos ORDER BY criado DESC LIMIT ?",
+                                     (limite,)).fetchall()
+        return [self._trabalho(linha) for linha in linhas]
+
+    def posicao_na_fila(self, id_trabalho):
+        """Quantos trabalhos na fila estão à frente deste (0 se já está rodando ou terminou)"""
+        trabalho = self.obter(id_trabalho)
+        if trabalho is None or trabalho.estado != NA_FILA:
+            return 0
+        with closing(self._conectar()) as conexao:
+            return conexao.execute("SELECT COUNT(*) FROM trabalhos WHERE estado = ? AND criado < ?",
+                                   (NA_FILA, trabalho.criado)).fetchone()[0]
+
+    def caminho_boletins(self, id_trabalho):
+        """Arquivo final dos boletins, ou None enquanto não estiver pronto"""
+        caminho = os.path.join(self.pasta_trabalho(id_trabalho), ARQUIVO_BOLETINS)
+        return caminho if os.path.exists(caminho) else None
+
+    def turma(self, id_trabalho):
+        """Turma corrigida de um trabalho concluído"""
+        with open(os.path.join(self.pasta_trabalho(id_trabalho), ARQUIVO_TURMA), "rb") as arquivo:
+            return pickle.load(arquivo)
+
+    def analise_itens(self, id_trabalho):
+        """Bytes da planilha de análise de itens de um trabalho concluído
+
+        Trabalhos de antes desta planilha existir a ganham na primeira leitura.
+        """
+        caminho = os.path.join(self.pasta_trabalho(id_trabalho), ARQUIVO_ANALISE_ITENS)
+        try:
+            with open(caminho, "rb") as arquivo:
+                return arquivo.read()
+        except FileNotFoundError:
+            return self._guardar_analise_itens(id_trabalho, self.turma(id_trabalho))
+
+    def _zip_final(self, id_trabalho):
+        """Caminho do ZIP final, ou None se ainda não terminou ou a entrega é o PDF único"""
+        trabalho = self.obter(id_trabalho)
+        if trabalho is None or trabalho.estado != CONCLUIDO or not trabalho.em_zip:
+            return None
+        return self.caminho_boletins(id_trabalho)
+
+    @staticmethod
+    def _listar(pasta, extensao):
+        """Nomes (sem extensão) dos arquivos prontos da pasta, em ordem alfabética"""
+        try:
+            nomes = os.listdir(pasta)
+        except FileNotFoundError:
+            return []
+        return sorted(nome[:-len(extensao)] for nome in nomes if nome.endswith(extensao))
+
+    def sedes_prontas(self, id_trabalho):
+        """Sedes que já podem ser baixadas (entrega com pasta por sede)"""
+        zip_final = self._zip_final(id_trabalho)
+        if zip_final is None:
+            return self._listar(os.path.join(self.pasta_trabalho(id_trabalho), PASTA_SEDES), ".zip")
+        with zipfile.ZipFile(zip_final) as zipf:
+            return sorted({nome.partition("/")[0] for nome in zipf.namelist() if "/" in nome})
+
+    def zip_sede(self, id_trabalho, sede):
+        """Bytes do ZIP só com os boletins de uma sede"""
+        zip_final = self._zip_final(id_trabalho)
+        if zip_final is None:
+            with open(os.path.join(self.pasta_trabalho(id_trabalho), PASTA_SEDES, sede + ".zip"), "rb") as arquivo:
+                return arquivo.read()
+        with zipfile.ZipFile(zip_final) as zipf:
+            nomes = [nome for nome in zipf.namelist() if nome.startswith(sede + "/")]
+        return recortar_zip(zip_final, nomes, sem_pasta=True)
+
+    def boletins_prontos(self, id_trabalho):
+        """Arquivos dos boletins que já podem ser baixados um a um"""
+        zip_final = self._zip_final(id_trabalho)
+        if zip_final is None:
+            return [nome + ".pdf" for nome in self._listar(
+                os.path.join(self.pasta_trabalho(id_trabalho), PASTA_PDFS), ".pdf")]
+        with zipfile.ZipFile(zip_final) as zipf:
+            return zipf.namelist()
+
+    def boletim(self, id_trabalho, arquivo):
+        """Bytes do PDF de um aluno: da pasta de prontos ou, no fim, do ZIP final"""
+        zip_final = self._zip_final(id_trabalho)
+        if zip_final is None:
+            with open(os.path.join(self.pasta_trabalho(id_trabalho), PASTA_PDFS, arquivo), "rb") as arquivo_pdf:
+                return arquivo_pdf.read()
+        with zipfile.ZipFile(zip_final) as zipf:
+            return zipf.read(arquivo)
+
+    def download_inteiro(self, id_trabalho):
+        """O arquivo final cabe num único download? (o PDF único sempre)"""
+        trabalho = self.obter(id_trabalho)
+        caminho = self.caminho_boletins(id_trabalho)
+        return caminho is not None and not trabalho.sob_demanda and (
+            not trabalho.em_zip or os.path.getsize(caminho) <= LIMITE_DOWNLOAD_INTEIRO)
+
+    def partes(self, id_trabalho):
+        """Quantas partes de até BOLETINS_POR_PARTE boletins o ZIP final tem"""
+        return math.ceil(len(self.boletins_prontos(id_trabalho)) / BOLETINS_POR_PARTE)
+
+    def parte(self, id_trabalho, k):
+        """Bytes da parte k (a partir de 0) do ZIP final"""
+        nomes = self.boletins_prontos(id_trabalho)[k * BOLETINS_POR_PARTE:(k + 1) * BOLETINS_POR_PARTE]
+        return recortar_zip(self._zip_final(id_trabalho), nomes)
+
+    # --------------------------
+    # ENVIO E EXECUÇÃO
+    # --------------------------
+
+    def enviar(self, conteudo, nome, opcoes, caminhos_logos=None, processos=1, chave=None):
+        """Enfileira uma planilha e devolve o id do trabalho
+
+        A mesma planilha com as mesmas opções ainda na fila ou rodando não é
+        enfileirada de novo: devolve o trabalho que já existe. Se ela já está
+        no cache, o trabalho nasce concluído, sem passar pelo pool.
+        """
+        chave = chave or (self.cache.chave(conteudo, **opcoes) if self.cache is not None
+                          else uuid.uuid4().hex)
+        with self._trava:
+            with closing(self._conectar()) as conexao:
+                linha = conexao.execute(
+                    "SELECT id FROM trabalhos WHERE chave = ? AND estado IN (?, ?) ORDER BY criado DESC",
+                    (chave, NA_FILA, PROCESSANDO)).fetchone()
+            if linha:
+                return linha["id"]
+
+            id_trabalho = uuid.uuid4().hex[:12]
+            pasta = self.pasta_trabalho(id_trabalho)
+            os.makedirs(pasta)
+            with open(os.path.join(pasta, ARQUIVO_ENTRADA), "wb") as arquivo:
+                arquivo.write(conteudo)
+
+            # Já processada com as mesmas opções: o trabalho nasce concluído, com cópia do cache
+            turma = (self.cache.copiar(chave, os.path.join(pasta, ARQUIVO_BOLETINS))
+                     if self.cache is not None else None)
+            if turma is not None:
+                self._guardar_turma(id_trabalho, turma)
+                self._guardar_analise_itens(id_trabalho, turma)
+
+            if turma is not None:
+                estado = (CONCLUIDO, "♻️ Planilha já processada: resultados recuperados do cache", 100,
+                          turma.total_alunos, turma.total_alunos)
+            else:
+                estado = (NA_FILA, "⏳ Na fila", 0, 0, 0)
+
+            parametros = {"opcoes": opcoes, "logos": caminhos_logos or {}, "processos": int(processos)}
+            agora = time.time()
+            with closing(self._conectar()) as conexao, conexao:
+                conexao.execute(
+                    "INSERT INTO trabalhos (id, chave, nome, criado, atualizado, estado, mensagem, progresso, "
+                    "total, feitos, parametros) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (id_trabalho, chave, nome, agora, agora, *estado, json.dumps(parametros)))
+
+        if turma is None:
+            self._executor.submit(self._executar, id_trabalho)
+        return id_trabalho
+
+    def _guardar_turma(self, id_trabalho, turma):
+        with open(os.path.join(self.pasta_trabalho(id_trabalho), ARQUIVO_TURMA), "wb") as arquivo:
+            pickle.dump(turma, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _guardar_analise_itens(self, id_trabalho, turma):
+        dados = planilha_analise_itens(turma.itens)
+        _gravar_arquivo(os.path.join(self.pasta_trabalho(id_trabalho), ARQUIVO_ANALISE_ITENS), dados)
+        return dados
+
+    def exportar(self, id_trabalho, saida):
+        """Enfileira a planilha de um trabalho de novo, com outra entrega (ex.: todos os boletins)"""
+        trabalho = self.obter(id_trabalho)
+        with open(os.path.join(self.pasta_trabalho(id_trabalho), ARQUIVO_ENTRADA), "rb") as arquivo:
+            conteudo = arquivo.read()
+        return self.enviar(conteudo, trabalho.nome, {**trabalho.opcoes, "saida_boletins": saida},
+                           trabalho.parametros.get("logos"), trabalho.parametros.get("processos", 1))
+
+    def retomar(self):
+        """Recoloca no pool os trabalhos que estavam na fila ou rodando quando o servidor parou"""
+        with closing(self._conectar()) as conexao, conexao:
+            linhas = conexao.execute("SELECT id FROM trabalhos WHERE estado IN (?, ?) ORDER BY criado",
+                                     (NA_FILA, PROCESSANDO)).fetchall()
+            conexao.execute("UPDATE trabalhos SET estado = ?, progresso = 0, mensagem = ? WHERE estado = ?",
+                            (NA_FILA, "⏳ Na fila (retomado após reinício)", PROCESSANDO))
+        for linha in linhas:
+            self._executor.submit(self._executar, linha["id"])
+
+    def limpar(self, dias=DIAS_GUARDAR):
+        """Apaga trabalhos terminados há mais de `dias` dias, com seus arquivos"""
+        limite = time.time() - dias * 24 * 3600
+        with closing(self._conectar()) as conexao, conexao:
+            linhas = conexao.execute("SELECT id FROM trabalhos WHERE estado IN (?, ?) AND atualizado < ?",
+                                     (CONCLUIDO, ERRO, limite)).fetchall()
+            conexao.executemany("DELETE FROM trabalhos WHERE id = ?", [(linha["id"],) for linha in linhas])
+        for linha in linhas:
+            shutil.rmtree(self.pasta_trabalho(linha["id"]), ignore_errors=True)
+
+    def _executar(self, id_trabalho):
+        """Roda um trabalho até o fim; erros ficam registrados na linha, nunca sobem para o pool"""
+        trabalho = self.obter(id_trabalho)
+        if trabalho is None or trabalho.estado != NA_FILA:
+            return
+        self._atualizar(id_trabalho, estado=PROCESSANDO, mensagem="📖 Iniciando...", progresso=5)
+        pasta = self.pasta_trabalho(id_trabalho)
+        andamento = _AndamentoNoBanco(self, id_trabalho)
+        cronometro = Cronometro(rotulos={"trabalho": id_trabalho})
+        log_estruturado("inicio", trabalho=id_trabalho, nome=trabalho.nome, **trabalho.opcoes)
+        try:
+            with open(os.path.join(pasta, ARQUIVO_ENTRADA), "rb") as arquivo:
+                conteudo = arquivo.read()
+            with cronometro.etapa("Logos"):
+                logos = preparar_logos_pdf(trabalho.parametros.get("logos", {}))
+
+            # Boletins num temporário: `boletins` só aparece completo
+            destino = os.path.join(pasta, ARQUIVO_BOLETINS)
+            with open(destino + ".tmp", "w+b") as arquivo_saida:
+                turma = processar_envio(conteudo, arquivo_saida, trabalho.opcoes, logos,
+                                        cache=self.cache, processos=trabalho.parametros.get("processos", 1),
+                                        acompanhamento=andamento, cronometro=cronometro)
+            self._guardar_turma(id_trabalho, turma)
+            with cronometro.etapa("Planilha de itens"):
+                self._guardar_analise_itens(id_trabalho, turma)
+            os.replace(destino + ".tmp", destino)
+        except ErroPlanilha as e:
+            self._atualizar(id_trabalho, estado=ERRO, mensagem=e.titulo, erros=json.dumps(e.erros))
+            log_estruturado("erro", trabalho=id_trabalho, mensagem=e.titulo, total_s=round(cronometro.total, 4))
+        except Exception as e:
+            self._atualizar(id_trabalho, estado=ERRO, mensagem=f"❌ Erro durante o processamento: {e}",
+                            erros=json.dumps([traceback.format_exc()]))
+            log_estruturado("erro", trabalho=id_trabalho, mensagem=str(e), total_s=round(cronometro.total, 4))
+        else:
+            # Prontos avulsos e sedes saem do ZIP final daqui em diante
+            for pasta_parcial in (PASTA_PDFS, PASTA_SEDES):
+                shutil.rmtree(os.path.join(pasta, pasta_parcial), ignore_errors=True)
+            tempos = {"etapas": cronometro.como_dict(), "boletins": andamento.tempos_boletins.como_dict()}
+            self._atualizar(id_trabalho, estado=CONCLUIDO, mensagem="✅ Processamento concluído!",
+                            progresso=100, total=turma.total_alunos, feitos=turma.total_alunos,
+                            avisos=json.dumps(andamento.avisos), tempos=json.dumps(tempos))
+            log_estruturado("concluido", trabalho=id_trabalho, alunos=turma.total_alunos,
+                            total_s=round(cronometro.total, 4), boletins=andamento.tempos_boletins.como_dict())
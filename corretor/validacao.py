@@ -0,0 +1,138 @@
+"""Validação da planilha do simulado (abas RESPOSTAS e GABARITO)"""
+
+import numpy as np
+import pandas as pd
+
+from corretor.correcao import (
+    COLUNA_ANULADA,
+    COLUNA_PESO,
+    COLUNAS_LINGUA,
+    LINGUAS_ESTRANGEIRAS,
+    converter_pesos,
+    marcar_anuladas,
+    trilhas_gabarito,
+)
+
+
+def validar_arquivo_excel(dados):
+    """Valida se o arquivo Excel tem a estrutura esperada"""
+    erros = []
+
+    # Verificar se as abas existem
+    if "RESPOSTAS" not in dados:
+        erros.append("❌ Aba 'RESPOSTAS' não encontrada no arquivo")
+    if "GABARITO" not in dados:
+        erros.append("❌ Aba 'GABARITO' não encontrada no arquivo")
+
+    if erros:
+        return False, erros
+
+    respostas = dados["RESPOSTAS"]
+    gabarito = dados["GABARITO"]
+
+    # Verificar colunas obrigatórias na aba RESPOSTAS
+    colunas_obrigatorias_respostas = ["ID", "Nome"]
+    for col in colunas_obrigatorias_respostas:
+        if col not in respostas.columns:
+            erros.append(f"❌ Coluna '{col}' não encontrada na aba RESPOSTAS")
+
+    # Verificar colunas obrigatórias na aba GABARITO
+    colunas_obrigatorias_gabarito = ["Questão", "Resposta", "Disciplina"]
+    for col in colunas_obrigatorias_gabarito:
+        if col not in gabarito.columns:
+            erros.append(f"❌ Coluna '{col}' não encontrada na aba GABARITO")
+
+    # Verificar se há dados
+    if len(respostas) == 0:
+        erros.append("❌ Aba RESPOSTAS está vazia")
+    if len(gabarito) == 0:
+        erros.append("❌ Aba GABARITO está vazia")
+
+    return len(erros) == 0, erros
+
+
+def validar_dados_gabarito(gabarito):
+    """Valida os dados do gabarito"""
+    erros = []
+
+    # Verificar questões duplicadas APENAS dentro da mesma disciplina
+    for disciplina in gabarito['Disciplina'].unique():
+        if pd.isna(disciplina):
+            continue
+
+        gabarito_disciplina = gabarito[gabarito['Disciplina'] == disciplina]
+        questoes_duplicadas = gabarito_disciplina[gabarito_disciplina.duplicated(subset=['Questão'], keep=False)]
+
+        if len(questoes_duplicadas) > 0:
+            questoes_dup = questoes_duplicadas['Questão'].unique().tolist()
+            erros.append(f"❌ Questões duplicadas em {disciplina}: {questoes_dup}")
+
+    # Mesmo número em disciplinas diferentes só vale entre as línguas (cada aluno faz uma)
+    disciplinas_questao = gabarito.dropna(subset=['Questão', 'Disciplina']).groupby('Questão')['Disciplina'].unique()
+    conflitos = [questao for questao, disciplinas in disciplinas_questao.items()
+                 if len(disciplinas) > 1 and not set(disciplinas) <= set(LINGUAS_ESTRANGEIRAS)]
+    if conflitos:
+        erros.append(f"❌ Questões repetidas em disciplinas diferentes (só Inglês/Espanhol podem repetir): {conflitos}")
+
+    # Verificar se há valores nulos
+    if gabarito['Questão'].isnull().any():
+        erros.append("❌ Há questões com número vazio no gabarito")
+    # Questão anulada pode ficar sem resposta: todos recebem o acerto
+    anuladas = (marcar_anuladas(gabarito[COLUNA_ANULADA]) if COLUNA_ANULADA in gabarito.columns
+                else np.zeros(len(gabarito), dtype=bool))
+    if (gabarito['Resposta'].isnull() & ~anuladas).any():
+        erros.append("❌ Há questões sem resposta no gabarito")
+    if gabarito['Disciplina'].isnull().any():
+        erros.append("❌ Há questões sem disciplina no gabarito")
+
+    # Coluna opcional de pesos: números não negativos, com algum ponto em jogo
+    if COLUNA_PESO in gabarito.columns:
+        pesos = converter_pesos(gabarito[COLUNA_PESO])
+        invalidos = gabarito.loc[np.isnan(pesos) | (pesos < 0), 'Questão'].tolist()
+        if invalidos:
+            erros.append(f"❌ Peso inválido (use números maiores ou iguais a zero) nas questões: {invalidos}")
+        elif pesos.sum() <= 0:
+            erros.append("❌ A soma dos pesos do gabarito é zero")
+
+    return len(erros) == 0, erros
+
+
+def avisos_leitura(dados):
+    """O que a leitura deixou de fora (corretor.leitura): linhas vazias no meio e células sem cabeçalho"""
+    avisos = []
+    for aba, tabela in dados.items():
+        vazias = tabela.attrs.get("linhas_vazias")
+        if vazias:
+            avisos.append(f"⚠️ Linhas vazias no meio da aba {aba} foram ignoradas: {vazias}. "
+                          "Confira se nenhum bloco ficou fora do lugar.")
+        fora = tabela.attrs.get("linhas_fora_do_cabecalho")
+        if fora:
+            avisos.append(f"⚠️ Na aba {aba}, as linhas {fora} têm valores à direita da última coluna com "
+                          "cabeçalho; esses valores foram ignorados.")
+    return avisos
+
+
+def informacoes_gabarito(gabarito):
+    """Mensagens informativas sobre o gabarito (não impedem a correção)"""
+    informacoes = []
+
+    # Verificar questões de línguas estrangeiras
+    questoes_linguas = gabarito[gabarito['Disciplina'].isin(LINGUAS_ESTRANGEIRAS)]
+
+    if len(questoes_linguas) > 0:
+        informacoes.append(f"ℹ️ Detectadas {len(questoes_linguas)} questões de línguas estrangeiras. Questões com mesmo número são permitidas para Inglês/Espanhol.")
+
+    trilhas = trilhas_gabarito(gabarito)
+    if trilhas:
+        informacoes.append(f"ℹ️ {' e '.join(trilhas)} usam os mesmos números: cada aluno é corrigido só na língua "
+                           f"informada na coluna '{COLUNAS_LINGUA[0]}' da aba RESPOSTAS (sem ela, na língua em que mais acertou).")
+
+    if COLUNA_ANULADA in gabarito.columns:
+        anuladas = gabarito.loc[marcar_anuladas(gabarito[COLUNA_ANULADA]), 'Questão'].tolist()
+        if anuladas:
+            informacoes.append(f"ℹ️ Questões anuladas (acerto para todos): {anuladas}")
+
+    if COLUNA_PESO in gabarito.columns and np.any(converter_pesos(gabarito[COLUNA_PESO]) != 1):
+        informacoes.append("ℹ️ Nota ponderada pela coluna Peso: a nota é a fração dos pontos possíveis.")
+
+    return informacoes